@@ -17,6 +17,8 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 VOICE_NOTES_DIR = os.path.join(BASE_DIR, "voice_notes")
 TRANSCRIPTS_DIR = os.path.join(BASE_DIR, "transcriptions")
 EXAMPLES_AUDIO_DIR = os.path.join(BASE_DIR, "examples_audio")
+# Max parallel TTS requests when synthesizing option example clips.
+EXAMPLES_TTS_CONCURRENCY = int(os.getenv("EXAMPLES_TTS_CONCURRENCY", "8"))
 
 # Scenario/scoring defaults (override via env vars if desired)
 DEFAULT_SUCCESS_POINTS = int(os.getenv("DEFAULT_SUCCESS_POINTS", "10"))
@@ -50,6 +52,8 @@ OPENAI_TITLE_MODEL = os.getenv("OPENAI_TITLE_MODEL", "gpt-4o-mini")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_NARRATIVE_MODEL = os.getenv("OPENAI_NARRATIVE_MODEL", "gpt-4o")
 OPENAI_TTS_MODEL = os.getenv("OPENAI_TTS_MODEL", "gpt-4o-mini-tts")
+# Option hints race Gemini against OpenAI; OpenAI starts after this many seconds.
+OPTIONS_HEDGE_DELAY_S = float(os.getenv("OPTIONS_HEDGE_DELAY_S", "0.8"))
 
 def collect_google_api_keys() -> list[str]:
     keys = []
@@ -141,6 +145,7 @@ REQUIRE_AUTH_FOR_STREAM = _env_flag("REQUIRE_AUTH_FOR_STREAM", default=False)
 STREAM_MAX_CHUNK_BYTES = int(os.getenv("STREAM_MAX_CHUNK_BYTES", "262144"))  # 256 KiB
 STREAM_MAX_BUFFER_BYTES = int(os.getenv("STREAM_MAX_BUFFER_BYTES", "2000000"))  # ~2 MB rolling buffer
 STREAM_MAX_SESSION_BYTES = int(os.getenv("STREAM_MAX_SESSION_BYTES", "8000000"))  # ~8 MB total per session
+STREAM_TRANSCRIBE_WORKERS = int(os.getenv("STREAM_TRANSCRIBE_WORKERS", "8"))  # threads shared by all sessions
 
 # Video ingest caps (ffmpeg/yt-dlp).
 VIDEO_MAX_SECONDS = int(os.getenv("VIDEO_MAX_SECONDS", "300"))  # 5 minutes
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, Iterable, Iterator, Optional
+
+try:  # orjson is optional; it parses multi-KB LLM replies several times faster
+    import orjson as _orjson
+except ImportError:  # pragma: no cover - depends on environment
+    _orjson = None
+
+
+def loads(raw: str | bytes) -> Any:
+    """Parse JSON text with orjson when installed, else the stdlib parser."""
+    if _orjson is not None:
+        return _orjson.loads(raw)
+    return json.loads(raw)
+
+
+# Outside strings the scanner only cares about brackets and opening quotes; a
+# string body (escapes included) is then consumed in one C-level match
+_ARRAY_STRUCT_RE = re.compile(r'[\[\]"]')
+_STRING_TAIL_RE = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+
+
+def find_json_array(text: str, objects_only: bool = False) -> Optional[str]:
+    """Return the first balanced top-level JSON array in `text`, or None.
+
+    Single linear pass that tracks bracket depth and skips JSON strings, so
+    brackets inside strings and prose around the array are ignored. The
+    regexes jump straight between structural characters.
+
+    With `objects_only`, arrays that do not open with an object (e.g. the
+    "[3]" in "Here are [3] scenarios:") are passed over.
+    """
+    if not text:
+        return None
+    start = text.find("[")
+    while start >= 0 and objects_only and not _opens_object(text, start):
+        start = text.find("[", start + 1)
+    if start < 0:
+        return None
+    depth = 0
+    pos = start
+    while True:
+        m = _ARRAY_STRUCT_RE.search(text, pos)
+        if m is None:
+            return None
+        i = m.start()
+        c = text[i]
+        if c == '"':
+            tail = _STRING_TAIL_RE.match(text, i + 1)
+            if tail is None:
+                return None
+            pos = tail.end()
+            continue
+        depth += 1 if c == "[" else -1
+        if depth == 0:
+            return text[start:i + 1]
+        pos = i + 1
+
+
+def _opens_object(text: str, start: int) -> bool:
+    """True when the array at `start` has an object as its first element."""
+    return text[start + 1:].lstrip().startswith("{")
+
+
+def iter_json_array_items(
+    chunks: Iterable[str], objects_only: bool = False, strict: bool = False
+) -> Iterator[Any]:
+    """Yield each element of the first JSON array in a stream of text chunks.
+
+    Elements are parsed as soon as their closing delimiter arrives, so callers
+    can start work before the whole reply has been generated. Elements that
+    fail to parse are skipped; iteration stops when the array closes.
+
+    With `objects_only`, an array whose first element is not an object is
+    abandoned and scanning continues with the next "[".
+
+    With `strict`, a malformed element or a stream that ends before the array
+    closes raises ValueError instead, for callers that must not act on a
+    partial list.
+    """
+    depth = 0
+    in_str = False
+    esc = False
+    opening = False  # inside "[" but before its first non-space character
+    item: list[str] = []
+    for chunk in chunks:
+        for c in chunk:
+            if depth == 0:
+                if c == "[":
+                    depth = 1
+                    opening = objects_only
+                continue
+            if opening:
+                if c.isspace():
+                    continue
+                opening = False
+                if c != "{":
+                    # Not an array of objects; a "[" here may open the real one
+                    depth = 1 if c == "[" else 0
+                    opening = depth == 1
+                    continue
+            if in_str:
+                item.append(c)
+                if esc:
+                    esc = False
+                elif c == "\\":
+                    esc = True
+                elif c == '"':
+                    in_str = False
+                continue
+            if c == '"':
+                in_str = True
+            elif c in "[{":
+                depth += 1
+            elif c in "]}":
+                depth -= 1
+                if depth == 0:
+                    yield from _parse_item(item, strict)
+                    return
+            elif c == "," and depth == 1:
+                yield from _parse_item(item, strict)
+                item = []
+                continue
+            item.append(c)
+    if strict and depth:
+        raise ValueError("JSON array was not closed")
+
+
+def _parse_item(chars: list[str], strict: bool = False) -> Iterator[Any]:
+    text = "".join(chars).strip()
+    if not text:
+        return
+    try:
+        value = loads(text)
+    except Exception:
+        if strict:
+            raise ValueError(f"malformed JSON array element: {text[:80]!r}") from None
+        return
+    yield value
@@ -9,9 +9,12 @@ and easier to scan.
 from __future__ import annotations
 
 import io
+import json
+import random
+import time
 from base64 import b64encode
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 import logging
 from langchain_google_genai import ChatGoogleGenerativeAI
@@ -19,6 +22,7 @@ from langchain_core.messages import HumanMessage
 from langchain_openai import ChatOpenAI
 
 import config
+import llm_json
 
 # Initialize module logger early (before any usage)
 logger = logging.getLogger("narrative.providers")
@@ -48,6 +52,19 @@ def is_rate_limit_error(e: Exception) -> bool:
     )
 
 
+def is_transient_error(e: Exception) -> bool:
+    """Errors worth a quick retry on the same provider (timeouts, dropped connections, 503s)."""
+    if isinstance(e, (TimeoutError, ConnectionError)):
+        return True
+    s = str(e).lower()
+    return (
+        "503" in s
+        or "unavailable" in s
+        or "timed out" in s
+        or "deadline exceeded" in s
+    )
+
+
 def key_label_from_index(index: int, keys: Optional[List[str]] = None) -> str:
     keys = keys if keys is not None else GOOGLE_KEYS
     try:
@@ -216,11 +233,24 @@ def transcribe_audio(
     raise RuntimeError("No transcription providers succeeded.")
 
 
-def invoke_google(messages: List[HumanMessage], model: str | None = None) -> Tuple[object, int]:
+def invoke_google(
+    messages: List[HumanMessage],
+    model: str | None = None,
+    *,
+    response_mime_type: str | None = None,
+    response_schema: Optional[Dict[str, Any]] = None,
+) -> Tuple[object, int]:
     """Try Gemini clients in order (no internal retries). Returns (response, key_index).
 
     If `model` is provided, use a transient set of clients for that model.
+    `response_mime_type="application/json"` (optionally with a JSON Schema in
+    `response_schema`) asks Gemini for constrained JSON output.
     """
+    call_kwargs: Dict[str, Any] = {"max_retries": 0}
+    if response_mime_type:
+        call_kwargs["response_mime_type"] = response_mime_type
+    if response_schema:
+        call_kwargs["response_json_schema"] = response_schema
     last_err: Optional[Exception] = None
     llms: List[ChatGoogleGenerativeAI]
     if model and model != config.GOOGLE_MODEL:
@@ -231,7 +261,7 @@ def invoke_google(messages: List[HumanMessage], model: str | None = None) -> Tup
     for idx, llm in enumerate(llms):
         try:
             # Disable internal retries by overriding keyword
-            resp = llm.invoke(messages, max_retries=0)
+            resp = llm.invoke(messages, **call_kwargs)
             logger.info("[invoke_google] OK key_index=%d/%d", idx, len(llms))
             return resp, idx
         except Exception as e:
@@ -245,6 +275,87 @@ def invoke_google(messages: List[HumanMessage], model: str | None = None) -> Tup
     raise RuntimeError("No Google Gemini API keys configured.")
 
 
+# Programming errors surface instead of being retried or hidden behind a fallback
+_NON_PROVIDER_ERRORS = (TypeError, AttributeError, NameError)
+
+
+def invoke_with_fallback(
+    messages: List[HumanMessage],
+    *,
+    retries: int = 2,
+    model: str | None = None,
+    **google_kwargs: Any,
+) -> str:
+    """Gemini first, OpenAI second; returns the reply text.
+
+    Transient Gemini errors get up to `retries` attempts with jittered
+    exponential backoff (0.5s base, 4s cap). Anything else switches to
+    OpenAI right away.
+    """
+    started = time.monotonic()
+    for attempt in range(max(1, retries)):
+        try:
+            response, _ = invoke_google(messages, model, **google_kwargs)
+            return str(getattr(response, "content", response))
+        except _NON_PROVIDER_ERRORS:
+            raise
+        except Exception as e:
+            if attempt + 1 < retries and is_transient_error(e):
+                time.sleep(min(4.0, 0.5 * 2 ** attempt) * random.uniform(0.5, 1.0))
+                continue
+            logger.warning(
+                "[invoke_with_fallback] Gemini failed after %.0f ms (%s); switching to OpenAI",
+                (time.monotonic() - started) * 1000,
+                e,
+            )
+            break
+    return openai_chat(messages)
+
+
+def _chunk_text(chunk: object) -> str:
+    """Text of a streamed message chunk (content may be a string or a list of parts)."""
+    content = getattr(chunk, "content", chunk)
+    if isinstance(content, list):
+        return "".join(
+            part.get("text", "") if isinstance(part, dict) else str(part) for part in content
+        )
+    return str(content or "")
+
+
+def invoke_google_stream(messages: List[HumanMessage], model: str | None = None) -> Tuple[Iterator[str], int]:
+    """Streaming variant of `invoke_google`. Returns (text_chunks, key_index).
+
+    Keys rotate until one yields its first chunk; errors after that surface
+    while iterating.
+    """
+    last_err: Optional[Exception] = None
+    llms: List[ChatGoogleGenerativeAI]
+    if model and model != config.GOOGLE_MODEL:
+        llms = [ChatGoogleGenerativeAI(model=model, api_key=k) for k in GOOGLE_KEYS]
+    else:
+        llms = GOOGLE_LLMS
+    for idx, llm in enumerate(llms):
+        try:
+            stream = iter(llm.stream(messages, max_retries=0))
+            first = next(stream, None)
+        except Exception as e:
+            last_err = e
+            logger.warning("Gemini stream failed on key_index=%s: %s", idx, str(e))
+            continue
+        logger.info("[invoke_google_stream] OK key_index=%d/%d", idx, len(llms))
+
+        def _texts(first=first, stream=stream) -> Iterator[str]:
+            if first is not None:
+                yield _chunk_text(first)
+            for chunk in stream:
+                yield _chunk_text(chunk)
+
+        return _texts(), idx
+    if last_err:
+        raise last_err
+    raise RuntimeError("No Google Gemini API keys configured.")
+
+
 def title_with_openai(text: str) -> str:
     """Generate a short title via OpenAI (LangChain)."""
     if not config.OPENAI_API_KEY:
@@ -270,6 +381,15 @@ def openai_chat(messages: list[HumanMessage], model: str | None = None, temperat
     return str(getattr(resp, "content", resp))
 
 
+def openai_chat_stream(messages: list[HumanMessage], model: str | None = None, temperature: float = 0.2) -> Iterator[str]:
+    """Streaming variant of `openai_chat` yielding content text chunks."""
+    if not config.OPENAI_API_KEY:
+        raise RuntimeError("OpenAI fallback not configured.")
+    use_model = model or config.OPENAI_NARRATIVE_MODEL
+    llm = ChatOpenAI(model=use_model, api_key=config.OPENAI_API_KEY, temperature=temperature)
+    return (_chunk_text(chunk) for chunk in llm.stream(messages))
+
+
 def normalize_title_output(raw: str) -> str:
     """Coerce LLM output into a single, clean title line.
 
@@ -447,6 +567,34 @@ def translate_text(text: str, to_language: str, from_language: str | None = None
     return str(getattr(resp, "content", resp)).strip().strip('"').strip("'")
 
 
+def translate_batch(texts: List[str], to_language: str, from_language: str | None = None) -> List[str]:
+    """Translate several short phrases with a single OpenAI chat call.
+
+    Returns translations in input order. Falls back to per-phrase
+    `translate_text` when the reply is not a JSON array of matching length.
+    """
+    if not texts:
+        return []
+    if len(texts) > 1 and config.OPENAI_API_KEY:
+        try:
+            llm = ChatOpenAI(model=config.OPENAI_TITLE_MODEL, api_key=config.OPENAI_API_KEY, temperature=0.0)
+            prompt = (
+                (f"Translate each phrase in this JSON array from {from_language} to {to_language}:\n" if from_language else f"Translate each phrase in this JSON array into {to_language}:\n")
+                + json.dumps(list(texts), ensure_ascii=False)
+                + "\nReturn only a JSON array of the translations in the same order, no notes."
+            )
+            resp = llm.invoke(prompt)
+            raw = str(getattr(resp, "content", resp)).strip()
+            # Tolerates ```json fences and prose around the array
+            data = llm_json.loads(llm_json.find_json_array(raw) or raw)
+            if isinstance(data, list) and len(data) == len(texts):
+                return [str(t).strip().strip('"').strip("'") for t in data]
+            logger.warning("Batch translation returned %s items for %s phrases", len(data) if isinstance(data, list) else "no", len(texts))
+        except Exception as e:
+            logger.warning("Batch translation failed, translating one by one: %s", e)
+    return [translate_text(t, to_language=to_language, from_language=from_language) for t in texts]
+
+
 def romanize(text: str, language: str) -> str:
     """Return a simple pronunciation/romanization line for the target language.
 
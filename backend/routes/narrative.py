@@ -2,6 +2,7 @@
 Narrative interaction endpoints for game dialogue processing.
 """
 
+import asyncio
 import json
 from typing import Optional
 from fastapi import APIRouter, File, UploadFile, Form, Response
@@ -237,7 +238,9 @@ async def get_speaking_options(
     Query: scenario_id (int), n_per_option (int, default 3), lang (optional target language), stage (examples|hints)
     """
     try:
-        data = generate_option_suggestions(
+        # Blocking provider calls and clip writes; keep them off the event loop
+        data = await asyncio.to_thread(
+            generate_option_suggestions,
             scenario_id,
             n_per_option,
             target_language=lang or None,
@@ -48,8 +48,7 @@ async def api_story_to_panels(request: Request):
         art_style = ArtStyle.MANHWA
 
     try:
-        sequence = await asyncio.to_thread(
-            story_to_panels.adapt_story_to_panels,
+        sequence = await story_to_panels.aadapt_story_to_panels(
             narrative,
             title=title,
             art_style=art_style,
@@ -83,8 +82,7 @@ async def api_scenario_to_panels(scenario_id: int, request: Request):
         art_style = ArtStyle.MANHWA
 
     try:
-        sequence = await asyncio.to_thread(
-            story_to_panels.adapt_scenario_to_panels,
+        sequence = await story_to_panels.aadapt_scenario_to_panels(
             scenario,
             art_style=art_style,
         )
@@ -403,8 +401,7 @@ async def api_dialogue_to_panels(story_id: str, dialogue_key: str, request: Requ
             pass
 
     try:
-        sequence = await asyncio.to_thread(
-            story_to_panels.adapt_dialogue_to_panels,
+        sequence = await story_to_panels.aadapt_dialogue_to_panels(
             dialogue_key,
             dialogue_lines,
             story_context=story_context,
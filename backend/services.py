@@ -14,6 +14,7 @@ from services import (
     list_scenario_versions,
     save_scenarios_version,
     activate_scenario_version,
+    scenarios_version,
 
     # Interaction processing
     process_interaction,
@@ -6,6 +6,7 @@ from .scenarios import (
     list_scenario_versions,
     save_scenarios_version,
     activate_scenario_version,
+    scenarios_version,
 )
 from .interaction import process_interaction, imitate_say
 from .transcription import transcribe_and_save
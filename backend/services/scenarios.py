@@ -13,6 +13,9 @@ scenarios_path = os.path.join(os.path.dirname(__file__), '..', 'scenarios.json')
 with open(scenarios_path, 'r') as f:
     scenarios_data = json.load(f)
 
+# Bumped whenever scenarios_data is replaced so derived caches can key on it
+_scenarios_version = 0
+
 SCENARIO_VERSIONS_DIR = os.path.join(os.path.dirname(__file__), '..', 'scenario_versions')
 
 
@@ -29,13 +32,19 @@ def list_scenarios() -> list:
     return scenarios_data
 
 
+def scenarios_version() -> int:
+    """Return a counter that changes every time scenarios are reloaded."""
+    return _scenarios_version
+
+
 def reload_scenarios(new_list: list) -> None:
     """Persist to file and update in-memory data."""
-    global scenarios_data
+    global scenarios_data, _scenarios_version
     try:
         with open(scenarios_path, 'w') as f:
             json.dump(new_list, f, ensure_ascii=False, indent=2)
         scenarios_data = new_list
+        _scenarios_version += 1
     except Exception as e:
         raise e
 
@@ -60,11 +69,9 @@ def save_scenarios_version(label: Optional[str] = None) -> str:
 def list_scenario_versions() -> list[dict]:
     """List all saved scenario versions."""
     ensure_versions_dir()
-    out = []
-    for f in sorted(os.listdir(SCENARIO_VERSIONS_DIR)):
-        if f.endswith('.json'):
-            out.append({"filename": f})
-    return out
+    with os.scandir(SCENARIO_VERSIONS_DIR) as it:
+        entries = sorted((e for e in it if e.name.endswith('.json')), key=lambda e: e.name)
+        return [{"filename": e.name, "mtime": e.stat().st_mtime} for e in entries]
 
 
 def activate_scenario_version(filename: str) -> None:
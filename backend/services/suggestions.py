@@ -3,14 +3,19 @@ Scenario option suggestion generation.
 """
 from __future__ import annotations
 
+import hashlib
 import os
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import lru_cache
 from typing import List, Optional
 from langchain_core.messages import HumanMessage
 import config
 import providers
 import voice_select
 import usage_log as usage
-from .scenarios import get_scenario_by_id
+import llm_json
+from .scenarios import get_scenario_by_id, scenarios_version
 
 
 def _scenario_context_text(s: dict) -> str:
@@ -28,31 +33,131 @@ def _scenario_context_text(s: dict) -> str:
     return "\n".join(parts)
 
 
-def generate_option_suggestions(
-    scenario_id: int,
-    n_per_option: int = 3,
-    target_language: Optional[str] = None,
-    native_language: Optional[str] = None,
-    stage: str = "examples",
-) -> dict:
-    """Generate example utterances for each option in the given scenario.
+def _clean_phrase(value) -> str:
+    return (value or "").strip().strip('"').strip("'")
 
-    Returns JSON:
-    {
-      "question": "What do you say?",
-      "options": [
-         {"option_text": "Yes", "examples": [...], "next_scenario": 2},
-         {"option_text": "No",  "examples": [...], "next_scenario": 3}
-      ]
-    }
+
+def _ask_gemini(prompt: str) -> tuple[str, Optional[int]]:
+    resp, key_index = providers.invoke_google([HumanMessage(content=[{"type": "text", "text": prompt}])])
+    return str(getattr(resp, "content", resp)), key_index
+
+
+def _ask_openai(prompt: str) -> tuple[str, Optional[int]]:
+    return providers.openai_chat([HumanMessage(content=prompt)]), None
+
+
+def _is_options_json(raw: str) -> bool:
+    try:
+        data = llm_json.loads(raw)
+    except Exception:
+        return False
+    return isinstance(data, dict) and "options" in data
+
+
+def _parse_suggestions(raw: str, n_opts: int) -> Optional[list]:
+    """Parse the LLM reply into per-option groups, falling back to line splitting."""
+    try:
+        data = llm_json.loads(raw)
+        return data.get("options") or []
+    except Exception:
+        lines = [l.strip("- *\t ") for l in raw.splitlines() if l.strip()]
+        if lines:
+            per = max(1, len(lines) // max(1, n_opts))
+            return [lines[i*per:(i+1)*per] for i in range(n_opts)]
+    return None
+
+
+def _race_providers(prompt: str) -> tuple[str, str, Optional[int]]:
+    """Start Gemini, add OpenAI after OPTIONS_HEDGE_DELAY_S, return the first well-formed reply.
+
+    Returns (provider, raw_text, key_index). If neither reply is valid JSON the
+    first successful raw reply is returned; if both fail the last error is raised.
     """
-    scenario = get_scenario_by_id(scenario_id)
-    if not scenario:
-        return {"question": "", "options": []}
+    pool = ThreadPoolExecutor(max_workers=2)
+    futures = {pool.submit(_ask_gemini, prompt): "gemini"}
+    pending = set(futures)
+    hedged = False
+    fallback: Optional[tuple[str, str, Optional[int]]] = None
+    last_err: Optional[Exception] = None
+    try:
+        while pending:
+            done, pending = wait(
+                pending,
+                timeout=None if hedged else config.OPTIONS_HEDGE_DELAY_S,
+                return_when=FIRST_COMPLETED,
+            )
+            for fut in done:
+                try:
+                    raw, key_index = fut.result()
+                except Exception as e:
+                    last_err = e
+                    continue
+                if _is_options_json(raw):
+                    return futures[fut], raw, key_index
+                if fallback is None:
+                    fallback = (futures[fut], raw, key_index)
+            if not hedged:
+                hedged = True
+                fut = pool.submit(_ask_openai, prompt)
+                futures[fut] = "openai"
+                pending.add(fut)
+    finally:
+        # The losing request cannot be interrupted; let it finish in the background
+        pool.shutdown(wait=False, cancel_futures=True)
+    if fallback is not None:
+        return fallback
+    if last_err:
+        raise last_err
+    raise RuntimeError("No suggestion providers succeeded.")
+
+
+def _example_clip_name(target_txt: str, voice: Optional[str], fmt: str = "mp3") -> str:
+    """Content-addressed clip filename so identical phrases share one synthesis.
+
+    The phrase is case-folded and whitespace-collapsed first, so "Yes!" and
+    "yes!" in different options (or requests) map to the same clip.
+    """
+    phrase_key = " ".join(target_txt.casefold().split())
+    digest = hashlib.sha1(f"{voice or ''}\x00{fmt}\x00{phrase_key}".encode("utf-8")).hexdigest()[:16]
+    return f"ex-{digest}.{fmt}"
+
 
+def _synthesize_example(job: tuple[str, str, str]) -> Optional[str]:
+    """Synthesize one example clip and return its public path (None on failure)."""
+    target_txt, voice, fname = job
+    try:
+        audio_bytes = providers.tts_with_openai(target_txt, voice=voice, fmt="mp3")
+        # The clip name is a permanent cache hit, so it must never hold a partial write
+        fd, tmp_path = tempfile.mkstemp(dir=config.EXAMPLES_AUDIO_DIR, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as wf:
+                wf.write(audio_bytes)
+            os.replace(tmp_path, os.path.join(config.EXAMPLES_AUDIO_DIR, fname))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return f"/examples/{fname}"
+    except Exception:
+        return None
+
+
+@lru_cache(maxsize=512)
+def _build_prompt(
+    scenario_id: int,
+    n: int,
+    target_language: Optional[str],
+    native_language: Optional[str],
+    stage: str,
+    version: int,
+) -> tuple[str, str]:
+    """Return (question, prompt) for a scenario.
+
+    `version` is `scenarios_version()` so cached prompts drop out when the
+    scenario set is reloaded.
+    """
+    scenario = get_scenario_by_id(scenario_id) or {}
     opts = scenario.get("options") or []
     context_txt = _scenario_context_text(scenario)
-    n = max(1, int(n_per_option or 3))
 
     question = "What do you say to the kind man?"
     if scenario.get("question"):
@@ -74,7 +179,7 @@ def generate_option_suggestions(
     else:
         sys += " Use the same language and register as the scene suggests."
 
-    if (stage or "examples").lower() == "hints":
+    if stage == "hints":
         sys += " Provide hints or stems instead of full sentences when possible."
 
     user = (
@@ -90,23 +195,69 @@ def generate_option_suggestions(
         )
     )
 
+    return question, sys + "\n\n" + user
+
+
+def generate_option_suggestions(
+    scenario_id: int,
+    n_per_option: int = 3,
+    target_language: Optional[str] = None,
+    native_language: Optional[str] = None,
+    stage: str = "examples",
+) -> dict:
+    """Generate example utterances for each option in the given scenario.
+
+    Returns JSON:
+    {
+      "question": "What do you say?",
+      "options": [
+         {"option_text": "Yes", "examples": [...], "next_scenario": 2},
+         {"option_text": "No",  "examples": [...], "next_scenario": 3}
+      ]
+    }
+    """
+    scenario = get_scenario_by_id(scenario_id)
+    if not scenario:
+        return {"question": "", "options": []}
+
+    opts = scenario.get("options") or []
+    n = max(1, int(n_per_option or 3))
+    question, prompt = _build_prompt(
+        scenario_id, n, target_language, native_language, (stage or "examples").lower(), scenarios_version()
+    )
+    if not any((o.get("text") or "").strip() for o in opts):
+        # Nothing to suggest for; skip the provider round-trip
+        try:
+            usage.log_usage(event="options", provider="none", model="none", key_label="none", status="skipped")
+        except Exception:
+            pass
+        return {
+            "question": question,
+            "options": [
+                {"option_text": o.get("text", ""), "examples": [], "next_scenario": o.get("next_scenario")}
+                for o in opts
+            ],
+        }
+
     suggestions_any: list | None = None
     suggestions: list[list[dict]] = []
 
-    try:
-        # Try Gemini first
-        resp, key_index = providers.invoke_google([HumanMessage(content=[{"type": "text", "text": sys + "\n\n" + user}])])
-        raw = str(getattr(resp, "content", resp))
+    if (stage or "examples").lower() == "hints" and config.OPENAI_API_KEY:
+        # Interactive path: hedge Gemini with a delayed OpenAI request
+        provider_name, raw, key_index = _race_providers(prompt)
+    else:
         try:
-            import json
-            data = json.loads(raw)
-            suggestions_any = data.get("options") or []
+            # Try Gemini first
+            raw, key_index = _ask_gemini(prompt)
+            provider_name = "gemini"
         except Exception:
-            lines = [l.strip("- *\t ") for l in raw.splitlines() if l.strip()]
-            if lines:
-                per = max(1, len(lines) // max(1, len(opts)))
-                suggestions_any = [lines[i*per:(i+1)*per] for i in range(len(opts))]
-        try:
+            # Fallback to OpenAI
+            raw, key_index = _ask_openai(prompt)
+            provider_name = "openai"
+
+    suggestions_any = _parse_suggestions(raw, len(opts))
+    try:
+        if provider_name == "gemini":
             usage.log_usage(
                 event="options",
                 provider="gemini",
@@ -114,21 +265,7 @@ def generate_option_suggestions(
                 key_label=providers.key_label_from_index(key_index or 0),
                 status="success",
             )
-        except Exception:
-            pass
-    except Exception:
-        # Fallback to OpenAI
-        raw = providers.openai_chat([HumanMessage(content=sys + "\n\n" + user)])
-        try:
-            import json
-            data = json.loads(raw)
-            suggestions_any = data.get("options") or []
-        except Exception:
-            lines = [l.strip("- *\t ") for l in raw.splitlines() if l.strip()]
-            if lines:
-                per = max(1, len(lines) // max(1, len(opts)))
-                suggestions_any = [lines[i*per:(i+1)*per] for i in range(len(opts))]
-        try:
+        else:
             usage.log_usage(
                 event="options",
                 provider="openai",
@@ -136,8 +273,8 @@ def generate_option_suggestions(
                 key_label=usage.OPENAI_LABEL,
                 status="success",
             )
-        except Exception:
-            pass
+    except Exception:
+        pass
 
     # Coerce suggestions into [[{native, target}, ...], ...] form
     def _coerce_pair_list(value) -> list[list[dict]]:
@@ -163,30 +300,59 @@ def generate_option_suggestions(
 
     suggestions = _coerce_pair_list(suggestions_any or [])
 
+    # Fill missing sides with one batched translation per direction
+    translated: dict[tuple[int, int], str] = {}
+    if native_language and target_language:
+        to_target: list[tuple[int, int, str]] = []
+        to_native: list[tuple[int, int, str]] = []
+        for i, group in enumerate(suggestions[:len(opts)]):
+            for idx, pair in enumerate(group):
+                native_txt = _clean_phrase(pair.get("native"))
+                target_txt = _clean_phrase(pair.get("target"))
+                if native_txt and not target_txt:
+                    to_target.append((i, idx, native_txt))
+                elif target_txt and not native_txt:
+                    to_native.append((i, idx, target_txt))
+        for jobs, to_lang, from_lang in (
+            (to_target, target_language, native_language),
+            (to_native, native_language, target_language),
+        ):
+            if not jobs:
+                continue
+            texts = [t for _i, _idx, t in jobs]
+            try:
+                results = providers.translate_batch(texts, to_language=to_lang, from_language=from_lang)
+            except Exception:
+                results = texts
+            for (i, idx, _t), result in zip(jobs, results):
+                translated[(i, idx)] = result
+
+    # One directory snapshot instead of a stat() per candidate clip
+    existing_audio: set[str] = set()
+    try:
+        with os.scandir(config.EXAMPLES_AUDIO_DIR) as it:
+            existing_audio = {e.name for e in it if e.is_file()}
+    except FileNotFoundError:
+        os.makedirs(config.EXAMPLES_AUDIO_DIR, exist_ok=True)
+
     out = {"question": question, "options": []}
+    tts_jobs: dict[str, tuple[str, str, str]] = {}
+    pending_audio: list[tuple[int, int, str]] = []
     for i, o in enumerate(opts):
         group = suggestions[i] if i < len(suggestions) and isinstance(suggestions[i], list) else []
         seen = set()
         items = []
 
         for idx, pair in enumerate(group):
-            native_txt = (pair.get("native") or "").strip().strip('"').strip("'")
-            target_txt = (pair.get("target") or "").strip().strip('"').strip("'")
-            key = target_txt.lower()
-
-            # Translate missing sides if languages are provided
-            if (not target_txt) and native_language and target_language and native_txt:
-                try:
-                    target_txt = providers.translate_text(native_txt, to_language=target_language, from_language=native_language)
-                except Exception:
-                    target_txt = native_txt
-                key = target_txt.lower()
+            native_txt = _clean_phrase(pair.get("native"))
+            target_txt = _clean_phrase(pair.get("target"))
 
-            if (not native_txt) and native_language and target_language and target_txt:
-                try:
-                    native_txt = providers.translate_text(target_txt, to_language=native_language, from_language=target_language)
-                except Exception:
-                    native_txt = target_txt
+            # Missing sides were translated in batch above
+            if not target_txt and native_txt:
+                target_txt = translated.get((i, idx), "")
+            elif not native_txt and target_txt:
+                native_txt = translated.get((i, idx), "")
+            key = target_txt.lower()
 
             if not target_txt or key in seen:
                 continue
@@ -195,7 +361,6 @@ def generate_option_suggestions(
             audio_rel = None
             selected_voice = None
             try:
-                os.makedirs(config.EXAMPLES_AUDIO_DIR, exist_ok=True)
                 example_dict = {"native": native_txt, "target": target_txt}
                 selected_voice = voice_select.select_voice(
                     scenario=scenario,
@@ -203,13 +368,14 @@ def generate_option_suggestions(
                     example=example_dict,
                     role="npc",
                 )
-                fname = f"scenario-{scenario_id}-opt{i}-ex{len(items)}.mp3"
-                fpath = os.path.join(config.EXAMPLES_AUDIO_DIR, fname)
-                if not os.path.exists(fpath):
-                    audio_bytes = providers.tts_with_openai(target_txt, voice=selected_voice, fmt="mp3")
-                    with open(fpath, "wb") as wf:
-                        wf.write(audio_bytes)
-                audio_rel = f"/examples/{fname}"
+                fname = _example_clip_name(target_txt, selected_voice)
+                if fname in existing_audio:
+                    audio_rel = f"/examples/{fname}"
+                else:
+                    # Synthesized below in one concurrent batch
+                    if fname not in tts_jobs:
+                        tts_jobs[fname] = (target_txt, selected_voice, fname)
+                    pending_audio.append((i, len(items), fname))
             except Exception:
                 audio_rel = None
 
@@ -223,4 +389,11 @@ def generate_option_suggestions(
             "next_scenario": o.get("next_scenario"),
         })
 
+    if tts_jobs:
+        workers = max(1, min(config.EXAMPLES_TTS_CONCURRENCY, len(tts_jobs)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = dict(zip(tts_jobs, pool.map(_synthesize_example, tts_jobs.values())))
+        for i, ex_idx, fname in pending_audio:
+            out["options"][i]["examples"][ex_idx]["audio"] = results.get(fname)
+
     return out
@@ -4,6 +4,7 @@ Audio transcription utilities.
 
 import os
 import asyncio
+from pathlib import Path
 from langchain_core.messages import HumanMessage
 import config
 import providers
@@ -13,14 +14,28 @@ import usage_log as usage
 
 async def transcribe_and_save(wav_path: str):
     """Transcribes and titles an audio file, saving the results."""
+    # Usage logging is disk bookkeeping; run it off the critical path and settle at the end
+    pending_logs: list[asyncio.Task] = []
+
+    def _log_usage(**kwargs) -> None:
+        pending_logs.append(asyncio.create_task(asyncio.to_thread(usage.log_usage, **kwargs)))
+
+    try:
+        await _transcribe_and_save(wav_path, _log_usage)
+    finally:
+        if pending_logs:
+            await asyncio.gather(*pending_logs, return_exceptions=True)
+
+
+async def _transcribe_and_save(wav_path: str, log_usage) -> None:
+    """Body of transcribe_and_save; `log_usage` schedules a usage record."""
     base_filename = os.path.basename(wav_path)
     ext = os.path.splitext(base_filename)[1].lower().lstrip('.') or 'wav'
     print(f"Starting transcription process for {base_filename}...")
 
     try:
         # Read audio bytes
-        with open(wav_path, "rb") as af:
-            audio_bytes = af.read()
+        audio_bytes = await asyncio.to_thread(Path(wav_path).read_bytes)
 
         # Transcribe with provider rotation & fallback
         print(f"Transcribing {base_filename} from local file bytes...")
@@ -45,7 +60,7 @@ async def transcribe_and_save(wav_path: str):
         # Log usage
         if result.provider == "gemini":
             key_index = int(result.meta.get("key_index", 0) or 0)
-            usage.log_usage(
+            log_usage(
                 event="transcribe",
                 provider="gemini",
                 model=result.model,
@@ -53,7 +68,7 @@ async def transcribe_and_save(wav_path: str):
                 status="success",
             )
         elif result.provider == "openai":
-            usage.log_usage(
+            log_usage(
                 event="transcribe",
                 provider="openai",
                 model=result.model,
@@ -95,7 +110,7 @@ async def transcribe_and_save(wav_path: str):
                     continue
 
             if gemini_ok:
-                usage.log_usage(
+                log_usage(
                     event="title",
                     provider="gemini",
                     model=config.GOOGLE_MODEL,
@@ -109,7 +124,7 @@ async def transcribe_and_save(wav_path: str):
             try:
                 print(f"Falling back to OpenAI title for {base_filename}: {e}")
                 title_text = providers.title_with_openai(transcribed_text)
-                usage.log_usage(
+                log_usage(
                     event="title",
                     provider="openai",
                     model=config.OPENAI_TITLE_MODEL,
@@ -122,11 +137,11 @@ async def transcribe_and_save(wav_path: str):
         print(f"Successfully generated title for {base_filename}.")
 
         payload = note_store.build_note_payload(base_filename, title_text, transcribed_text)
-        note_store.save_note_json(os.path.splitext(base_filename)[0], payload)
+        await asyncio.to_thread(note_store.save_note_json, os.path.splitext(base_filename)[0], payload)
         print(f"Successfully saved transcription and title for {base_filename}.")
 
     except Exception as e:
         print(f"Error during transcription/titling for {wav_path}: {e}")
         if os.path.exists(wav_path):
             payload = note_store.build_note_payload(base_filename, "Title generation failed.", "Transcription failed.")
-            note_store.save_note_json(os.path.splitext(base_filename)[0], payload)
+            await asyncio.to_thread(note_store.save_note_json, os.path.splitext(base_filename)[0], payload)
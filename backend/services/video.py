@@ -3,34 +3,125 @@ Video and transcript-based scenario generation.
 """
 from __future__ import annotations
 
-import os
 import re
 from typing import Optional
+import shutil
 import sys
+import threading
 import subprocess
-import tempfile
 import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from langchain_core.messages import HumanMessage
 import config
 import providers
 import usage_log as usage
+import llm_json
 
 
+_YT_PREFIXES = (
+    "https://www.youtube.com/",
+    "https://youtube.com/",
+    "https://youtu.be/",
+    "http://www.youtube.com/",
+    "http://youtube.com/",
+    "http://youtu.be/",
+)
+
+
+@lru_cache(maxsize=256)
 def _is_youtube_url(url: str) -> bool:
     """Check if URL is a YouTube link."""
     if not isinstance(url, str):
         return False
-    u = url.strip().lower()
-    return (
-        u.startswith("https://www.youtube.com/")
-        or u.startswith("https://youtube.com/")
-        or u.startswith("https://youtu.be/")
-    )
+    return url.strip().lower().startswith(_YT_PREFIXES)
+
+
+_PIPE_SIZE_BYTES = 1 << 20
+
+# Prefer a standalone yt-dlp binary over `python -m yt_dlp` to skip interpreter startup
+_YTDLP_BIN = shutil.which("yt-dlp")
+
+
+def _ytdlp_command() -> list[str]:
+    return [_YTDLP_BIN] if _YTDLP_BIN else [sys.executable, "-m", "yt_dlp"]
+
 
+def _ytdlp_available() -> bool:
+    return bool(_YTDLP_BIN) or importlib.util.find_spec("yt_dlp") is not None
+
+# Speech-grade Opus is ~10x smaller than 16 kHz PCM WAV; both transcribers accept Ogg/Opus
+_AUDIO_FILE_EXT = "ogg"
+_AUDIO_MIME_TYPE = "audio/ogg"
+
+
+# Drop every pause of 1 s or more below -35 dBFS so silence is not uploaded or transcribed
+_SILENCE_TRIM_FILTER = "silenceremove=stop_periods=-1:stop_duration=1:stop_threshold=-35dB"
+
+
+def _ffmpeg_output_args(sample_rate: int, trim_silence: bool = False) -> list[str]:
+    """Mono Opus-in-Ogg written to stdout, optionally with long silences removed."""
+    args = ["-vn", "-ac", "1", "-ar", str(sample_rate)]
+    if trim_silence:
+        args += ["-af", _SILENCE_TRIM_FILTER]
+    return args + ["-c:a", "libopus", "-b:a", "24k", "-f", "ogg", "pipe:1"]
+
+
+def _enlarge_pipe(fileobj) -> None:
+    """Grow a Linux pipe buffer (default 64 KiB) so the writer blocks less often."""
+    try:
+        import fcntl
+        fcntl.fcntl(fileobj.fileno(), getattr(fcntl, "F_SETPIPE_SZ", 1031), _PIPE_SIZE_BYTES)
+    except (ImportError, OSError, AttributeError, ValueError):
+        pass
 
-def _ffmpeg_extract_audio_from_youtube(url: str, out_wav_path: str, sample_rate: int = 16000) -> None:
-    """Extract audio using yt-dlp piped into ffmpeg."""
-    if importlib.util.find_spec("yt_dlp") is None:
+
+_STDERR_TAIL_BYTES = 4096
+
+
+class _StderrTail:
+    """Drain a subprocess stderr pipe in the background, keeping only the last `limit` bytes.
+
+    Only the tail of ffmpeg/yt-dlp stderr is ever reported, and draining it
+    continuously also stops a chatty child from blocking on a full pipe.
+    """
+
+    def __init__(self, stream, limit: int = _STDERR_TAIL_BYTES):
+        self._buf = bytearray()
+        self._limit = limit
+        self._thread = threading.Thread(target=self._drain, args=(stream,), daemon=True)
+        self._thread.start()
+
+    def _drain(self, stream) -> None:
+        try:
+            for chunk in iter(lambda: stream.read(4096), b""):
+                self._buf += chunk
+                if len(self._buf) > self._limit:
+                    del self._buf[:-self._limit]
+        except (OSError, ValueError):
+            pass
+
+    def value(self, timeout: Optional[float] = None) -> bytes:
+        self._thread.join(timeout)
+        return bytes(self._buf)
+
+
+def _run_ffmpeg(cmd: list[str], stdin=subprocess.DEVNULL) -> bytes:
+    """Run ffmpeg and return its stdout; raises CalledProcessError carrying the stderr tail."""
+    proc = subprocess.Popen(cmd, stdin=stdin, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    tail = _StderrTail(proc.stderr)
+    out = proc.stdout.read()
+    proc.stdout.close()
+    returncode = proc.wait()
+    err = tail.value()
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd, output=out, stderr=err)
+    return out
+
+
+def _ffmpeg_extract_audio_from_youtube(url: str, sample_rate: int = 16000) -> bytes:
+    """Extract audio using yt-dlp piped into ffmpeg; returns Ogg/Opus bytes from ffmpeg's stdout."""
+    if not _ytdlp_available():
         raise RuntimeError("yt_dlp_not_installed (install with: pip install yt-dlp)")
 
     # Cap downloads to reduce abuse/cost
@@ -45,7 +136,7 @@ def _ffmpeg_extract_audio_from_youtube(url: str, out_wav_path: str, sample_rate:
         max_size_arg = f"{max_mib}M"
 
     ytdlp_cmd = [
-        sys.executable, "-m", "yt_dlp",
+        *_ytdlp_command(),
         "--no-playlist", "--no-progress",
         *(["--max-filesize", max_size_arg] if max_size_arg else []),
         "-f", "bestaudio/best",
@@ -61,35 +152,36 @@ def _ffmpeg_extract_audio_from_youtube(url: str, out_wav_path: str, sample_rate:
     ffmpeg_cmd = ["ffmpeg", "-y", "-i", "pipe:0"]
     if max_seconds > 0:
         ffmpeg_cmd += ["-t", str(max_seconds)]
-    ffmpeg_cmd += ["-vn", "-ac", "1", "-ar", str(sample_rate), out_wav_path]
+    ffmpeg_cmd += _ffmpeg_output_args(sample_rate, trim_silence=True)
 
-    proc = subprocess.Popen(ytdlp_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    proc = subprocess.Popen(ytdlp_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, close_fds=True)
     assert proc.stdout is not None
+    ytdlp_tail = _StderrTail(proc.stderr)
+    # ffmpeg reads the pipe fd directly; a larger buffer means fewer stalls between bursts
+    _enlarge_pipe(proc.stdout)
 
     try:
-        subprocess.run(
-            ffmpeg_cmd,
-            stdin=proc.stdout,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.PIPE,
-            check=True,
-        )
+        audio = _run_ffmpeg(ffmpeg_cmd, stdin=proc.stdout)
     finally:
         try:
             proc.stdout.close()
         except Exception:
             pass
-        _, ytdlp_err = proc.communicate(timeout=60)
+        proc.wait(timeout=60)
+        ytdlp_err = ytdlp_tail.value(timeout=5)
         if proc.returncode not in (0, None):
-            snippet = (ytdlp_err or b"")[:400].decode("utf-8", errors="replace").strip()
+            snippet = ytdlp_err[-400:].decode("utf-8", errors="replace").strip()
             raise RuntimeError(f"yt_dlp_failed: {snippet or 'unknown_error'}")
+    return audio
+
 
+def _ffmpeg_extract_audio(url: str, sample_rate: int = 16000) -> bytes:
+    """Use ffmpeg to extract mono Opus audio from a video URL or file path.
 
-def _ffmpeg_extract_audio(url: str, out_wav_path: str, sample_rate: int = 16000) -> None:
-    """Use ffmpeg to extract mono WAV audio from a video URL or file path."""
+    The audio is streamed to stdout and returned as bytes; nothing touches disk.
+    """
     if isinstance(url, str) and _is_youtube_url(url):
-        _ffmpeg_extract_audio_from_youtube(url, out_wav_path, sample_rate=sample_rate)
-        return
+        return _ffmpeg_extract_audio_from_youtube(url, sample_rate=sample_rate)
 
     try:
         max_seconds = int(getattr(config, "VIDEO_MAX_SECONDS", 300) or 0)
@@ -99,46 +191,87 @@ def _ffmpeg_extract_audio(url: str, out_wav_path: str, sample_rate: int = 16000)
     cmd = ["ffmpeg", "-y", "-i", url]
     if max_seconds > 0:
         cmd += ["-t", str(max_seconds)]
-    cmd += ["-vn", "-ac", "1", "-ar", str(sample_rate), out_wav_path]
+    cmd += _ffmpeg_output_args(sample_rate, trim_silence=True)
 
     try:
-        subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=True)
-        return
+        return _run_ffmpeg(cmd)
     except subprocess.CalledProcessError as e:
         url_str = str(url or "")
         can_try_ytdlp = url_str.startswith("http://") or url_str.startswith("https://")
-        if can_try_ytdlp and importlib.util.find_spec("yt_dlp") is not None:
-            _ffmpeg_extract_audio_from_youtube(url_str, out_wav_path, sample_rate=sample_rate)
-            return
-        snippet = ((e.stderr or b"")[:400]).decode("utf-8", errors="replace").strip()
+        if can_try_ytdlp and _ytdlp_available():
+            return _ffmpeg_extract_audio_from_youtube(url_str, sample_rate=sample_rate)
+        snippet = ((e.stderr or b"")[-400:]).decode("utf-8", errors="replace").strip()
         raise RuntimeError(f"ffmpeg_failed: {snippet or 'unknown_error'}") from e
 
 
-def _transcribe_audio_bytes(audio_bytes: bytes, lang_hint: Optional[str] = None) -> str:
-    """Transcribe bytes via Gemini, with OpenAI fallback."""
-    try:
-        instruction = "Transcribe this audio recording in the language you hear. Do not translate."
-        if lang_hint:
-            hint = lang_hint.strip()
-            lower = hint.lower()
-            if "japanese" in lower or lower == "ja":
-                instruction = (
-                    "Transcribe this audio recording. "
-                    "If the speaker uses Japanese, write it in Japanese script without romanizing. "
-                    "If another language is spoken, transcribe using that language's typical writing system. "
-                    "Do not translate."
-                )
-            else:
-                instruction = (
-                    "Transcribe this audio recording. "
-                    f"The expected language is {hint}, but always keep the language that is actually spoken. "
-                    "Do not translate."
-                )
+# Long clips are cut near silences into ~30 s pieces and transcribed in parallel
+_CHUNK_SECONDS = 30.0
+_CHUNK_MIN_TOTAL_SECONDS = 60.0
+_CHUNK_CONCURRENCY = 4
+_SILENCE_RE = re.compile(r"silence_(start|end): (-?\d+(?:\.\d+)?)")
+_TIME_RE = re.compile(r"time=(\d+):(\d+):(\d+(?:\.\d+)?)")
+
+
+def _probe_silences(audio_bytes: bytes) -> tuple[float, list[float]]:
+    """Return (duration_seconds, silence_midpoints) using ffmpeg's silencedetect filter."""
+    proc = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-i", "pipe:0", "-af", "silencedetect=noise=-35dB:d=0.4", "-f", "null", "-"],
+        input=audio_bytes,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        check=True,
+    )
+    err = proc.stderr.decode("utf-8", errors="replace")
+    times = _TIME_RE.findall(err)
+    duration = 0.0
+    if times:
+        h, m, sec = times[-1]
+        duration = int(h) * 3600 + int(m) * 60 + float(sec)
+    midpoints: list[float] = []
+    start: Optional[float] = None
+    for kind, value in _SILENCE_RE.findall(err):
+        if kind == "start":
+            start = max(0.0, float(value))
+        elif start is not None:
+            midpoints.append((start + float(value)) / 2)
+            start = None
+    return duration, midpoints
+
+
+def _chunk_ranges(duration: float, silences: list[float]) -> list[tuple[float, Optional[float]]]:
+    """Split [0, duration] into ~_CHUNK_SECONDS ranges, cutting at the nearest silence."""
+    if duration < _CHUNK_MIN_TOTAL_SECONDS:
+        return [(0.0, None)]
+    cuts: list[float] = []
+    last = 0.0
+    while duration - last > _CHUNK_SECONDS * 1.5:
+        ideal = last + _CHUNK_SECONDS
+        window = [m for m in silences if last + _CHUNK_SECONDS / 2 <= m <= last + _CHUNK_SECONDS * 1.5]
+        cut = min(window, key=lambda m: abs(m - ideal)) if window else ideal
+        cuts.append(cut)
+        last = cut
+    edges: list[Optional[float]] = [0.0, *cuts, None]
+    return [(float(edges[i]), edges[i + 1]) for i in range(len(edges) - 1)]
+
+
+def _cut_audio(audio_bytes: bytes, start: float, end: Optional[float]) -> bytes:
+    cmd = ["ffmpeg", "-hide_banner", "-i", "pipe:0", "-ss", f"{start:.3f}"]
+    if end is not None:
+        cmd += ["-to", f"{end:.3f}"]
+    cmd += _ffmpeg_output_args(16000)
+    return subprocess.run(cmd, input=audio_bytes, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True).stdout
 
+
+def _transcribe_once(audio_bytes: bytes, instruction: str, lang_hint: Optional[str], strict: bool = False) -> str:
+    """One provider transcription call with usage logging.
+
+    Returns "" on failure, or re-raises the provider error when `strict`.
+    """
+    try:
         result = providers.transcribe_audio(
             audio_bytes,
-            file_ext="wav",
-            mime_type="audio/wav",
+            file_ext=_AUDIO_FILE_EXT,
+            mime_type=_AUDIO_MIME_TYPE,
             instructions=instruction,
             language_hint=lang_hint,
             context=providers.CONTEXT_NOTES,
@@ -167,9 +300,59 @@ def _transcribe_audio_bytes(audio_bytes: bytes, lang_hint: Optional[str] = None)
 
         return result.text
     except Exception:
+        if strict:
+            raise
         return ""
 
 
+def _transcribe_audio_bytes(audio_bytes: bytes, lang_hint: Optional[str] = None) -> str:
+    """Transcribe bytes via Gemini, with OpenAI fallback.
+
+    Clips of a minute or more are split near silences and the pieces are
+    transcribed concurrently, then joined in order. If any piece fails, the
+    whole clip is transcribed in one call instead, so the transcript never
+    has a silent hole in it.
+    """
+    instruction = "Transcribe this audio recording in the language you hear. Do not translate."
+    if lang_hint:
+        hint = lang_hint.strip()
+        lower = hint.lower()
+        if "japanese" in lower or lower == "ja":
+            instruction = (
+                "Transcribe this audio recording. "
+                "If the speaker uses Japanese, write it in Japanese script without romanizing. "
+                "If another language is spoken, transcribe using that language's typical writing system. "
+                "Do not translate."
+            )
+        else:
+            instruction = (
+                "Transcribe this audio recording. "
+                f"The expected language is {hint}, but always keep the language that is actually spoken. "
+                "Do not translate."
+            )
+
+    try:
+        ranges = _chunk_ranges(*_probe_silences(audio_bytes))
+    except Exception:
+        ranges = [(0.0, None)]
+    if len(ranges) <= 1:
+        return _transcribe_once(audio_bytes, instruction, lang_hint)
+
+    def _transcribe_range(bounds: tuple[float, Optional[float]]) -> str:
+        return _transcribe_once(_cut_audio(audio_bytes, *bounds), instruction, lang_hint, strict=True)
+
+    try:
+        with ThreadPoolExecutor(max_workers=min(_CHUNK_CONCURRENCY, len(ranges))) as pool:
+            texts = list(pool.map(_transcribe_range, ranges))
+    except Exception:
+        # A failed cut or provider call would drop that chunk's words; redo the clip whole
+        return _transcribe_once(audio_bytes, instruction, lang_hint)
+    return " ".join(t.strip() for t in texts if t and t.strip())
+
+
+_MIN_TRANSCRIPT_CHARS = 20
+
+
 def generate_scenarios_from_transcript(
     transcript: str,
     target_language: str = "Japanese",
@@ -177,6 +360,20 @@ def generate_scenarios_from_transcript(
     usage_event: str = "scenario_compile",
 ) -> list:
     """Use an LLM to turn a transcript into a short branching scenario list."""
+    if not transcript or len(transcript.strip()) < _MIN_TRANSCRIPT_CHARS:
+        # Too little text to build scenes from; callers fall back to deterministic scenarios
+        try:
+            usage.log_usage(
+                event=str(usage_event or "scenario_compile"),
+                provider="none",
+                model="none",
+                key_label="none",
+                status="skipped",
+            )
+        except Exception:
+            pass
+        return []
+
     prompt = (
         "You are a language learning scenario designer. Given this dialogue transcript, "
         "produce a compact branching scenario for beginners in JSON array format.\n\n"
@@ -200,15 +397,29 @@ def generate_scenarios_from_transcript(
     model_used = None
     key_index = None
 
+    # Stream the reply and parse each scenario as soon as its object closes
+    text_parts: list[str] = []
+
+    def _collect(chunks):
+        for chunk in chunks:
+            text_parts.append(chunk)
+            yield chunk
+
     try:
-        resp, key_index = providers.invoke_google([HumanMessage(content=[{"type": "text", "text": prompt}])])
+        chunks, key_index = providers.invoke_google_stream([HumanMessage(content=[{"type": "text", "text": prompt}])])
         provider_used = "gemini"
         model_used = config.GOOGLE_MODEL
-        text = str(getattr(resp, "content", resp))
+        scenarios = list(llm_json.iter_json_array_items(_collect(chunks), objects_only=True, strict=True))
     except Exception:
         provider_used = "openai"
         model_used = config.OPENAI_NARRATIVE_MODEL
-        text = providers.openai_chat([HumanMessage(content=prompt)])
+        text_parts.clear()
+        chunks = providers.openai_chat_stream([HumanMessage(content=prompt)])
+        try:
+            scenarios = list(llm_json.iter_json_array_items(_collect(chunks), objects_only=True, strict=True))
+        except ValueError:
+            # A skipped scene would leave other scenes' next_scenario pointing nowhere
+            scenarios = []
 
     try:
         usage.log_usage(
@@ -221,12 +432,14 @@ def generate_scenarios_from_transcript(
     except Exception:
         pass
 
-    # Attempt to extract JSON array
+    if scenarios:
+        return scenarios
+
+    # Attempt to extract JSON array from the full reply
+    text = "".join(text_parts)
     try:
-        m = re.search(r"\[.*\]", text, flags=re.S)
-        arr = m.group(0) if m else text
-        import json
-        data = json.loads(arr)
+        arr = llm_json.find_json_array(text, objects_only=True) or text
+        data = llm_json.loads(arr)
         if isinstance(data, list):
             return data
     except Exception:
@@ -236,12 +449,7 @@ def generate_scenarios_from_transcript(
 
 def generate_scenarios_from_video(url: str, target_language: str = "Japanese", max_scenes: int = 5) -> list:
     """Pipeline: ffmpeg audio extract -> transcribe -> LLM structure -> scenarios list."""
-    with tempfile.TemporaryDirectory() as td:
-        wav_path = os.path.join(td, "audio.wav")
-        _ffmpeg_extract_audio(url, wav_path)
-        with open(wav_path, "rb") as f:
-            audio_bytes = f.read()
-
+    audio_bytes = _ffmpeg_extract_audio(url)
     transcript = _transcribe_audio_bytes(audio_bytes, lang_hint=target_language)
     return generate_scenarios_from_transcript(
         transcript,
@@ -8,6 +8,30 @@ from scenario_normalize import normalize_scenarios
 from services import generate_scenarios_from_transcript
 
 
+# (mode, lives, reward_points) for scenes 1 and 2, then every later scene
+_SCENE_PROFILES = [("beginner", 3, 10), ("advanced", 2, 15)]
+_LATER_SCENE_PROFILE = ("beginner", 2, 15)
+_YES_KEYWORDS = ("yes", "yeah", "sure")
+_NO_KEYWORDS = ("no", "nope", "nah")
+
+
+def _yes_no_options(next_scenario: int) -> list[dict]:
+    return [
+        {
+            "text": "Yes",
+            "next_scenario": next_scenario,
+            "keywords": list(_YES_KEYWORDS),
+            "examples": [{"native": "Yes.", "target": "Yes.", "pronunciation": ""}],
+        },
+        {
+            "text": "No",
+            "next_scenario": next_scenario,
+            "keywords": list(_NO_KEYWORDS),
+            "examples": [{"native": "No.", "target": "No.", "pronunciation": ""}],
+        },
+    ]
+
+
 def fallback_scenarios_from_text(
     text: str,
     target_language: str,
@@ -20,37 +44,22 @@ def fallback_scenarios_from_text(
         seed = "A stranger approaches you."
     lang = normalize_target_language(target_language)
     n = max(1, min(int(max_scenes or 6), 12))
-    scenarios: list[dict] = []
-    for idx in range(1, n + 1):
-        line = cleaned[idx - 1] if idx - 1 < len(cleaned) else seed
-        scenarios.append(
-            {
-                "id": idx,
-                "language": lang,
-                "mode": "beginner" if idx == 1 else ("advanced" if idx == 2 else "beginner"),
-                "lives": 3 if idx == 1 else 2,
-                "reward_points": 10 if idx == 1 else 15,
-                "description": "What do you say?",
-                "character_dialogue_en": line,
-                "character_dialogue_jp": "",
-                "options": [
-                    {
-                        "text": "Yes",
-                        "next_scenario": idx + 1 if idx < n else None,
-                        "keywords": ["yes", "yeah", "sure"],
-                        "examples": [{"native": "Yes.", "target": "Yes.", "pronunciation": ""}],
-                    },
-                    {
-                        "text": "No",
-                        "next_scenario": idx + 1 if idx < n else None,
-                        "keywords": ["no", "nope", "nah"],
-                        "examples": [{"native": "No.", "target": "No.", "pronunciation": ""}],
-                    },
-                ]
-                if idx < n
-                else [],
-            }
-        )
+    lines = [cleaned[i] if i < len(cleaned) else seed for i in range(n)]
+    profiles = _SCENE_PROFILES[:n] + [_LATER_SCENE_PROFILE] * max(0, n - len(_SCENE_PROFILES))
+    scenarios: list[dict] = [
+        {
+            "id": idx,
+            "language": lang,
+            "mode": mode,
+            "lives": lives,
+            "reward_points": reward_points,
+            "description": "What do you say?",
+            "character_dialogue_en": line,
+            "character_dialogue_jp": "",
+            "options": _yes_no_options(idx + 1) if idx < n else [],
+        }
+        for idx, line, (mode, lives, reward_points) in zip(range(1, n + 1), lines, profiles)
+    ]
     if lang.lower() == "japanese":
         # Populate a minimal JP line in the first scene so UI heuristics can pick it up even without explicit override.
         scenarios[0]["character_dialogue_jp"] = "時間を止めてもいい。どうする？"
@@ -8,12 +8,13 @@ Ensures character consistency by:
 """
 
 import asyncio
+from functools import lru_cache
 from image_gen_google import generate_image
 from story_manifest import (
     SHOGUN_CHARACTERS,
     SHOGUN_LOCATIONS,
     SHOGUN_PANELS,
-    get_panel_references,
+    panel_reference_candidates,
     get_panel_character_descriptions,
     PanelSpec,
 )
@@ -30,35 +31,90 @@ import os
 
 PANEL_DIR = os.path.join(os.path.dirname(__file__), "..", "image_cache", "panels")
 
+# Image generation is network-bound; keep a handful of requests in flight
+PANEL_CONCURRENCY = 4
+
+# Style and constraint blocks keyed by (is_holographic, is_time_freeze)
+_STYLE_TABLE = {
+    (True, True): f"{BASE_STYLE}\n{HOLOGRAPHIC_STYLE}",
+    (True, False): f"{BASE_STYLE}\n{HOLOGRAPHIC_STYLE}",
+    (False, True): f"{BASE_STYLE}\n{TIME_FREEZE_STYLE}",
+    (False, False): f"{BASE_STYLE}\n{CINEMATIC_STYLE}",
+}
+_CONSTRAINT_TABLE = {
+    (True, True): UNIVERSAL_CONSTRAINTS + HOLOGRAPHIC_CONSTRAINTS,
+    (True, False): UNIVERSAL_CONSTRAINTS + HOLOGRAPHIC_CONSTRAINTS,
+    (False, True): UNIVERSAL_CONSTRAINTS + HISTORICAL_CONSTRAINTS + HOLOGRAPHIC_CONSTRAINTS,
+    (False, False): UNIVERSAL_CONSTRAINTS + HISTORICAL_CONSTRAINTS,
+}
+
+# INTERPRETATION line per panel mood
+_MOOD_INTERPRETATIONS = {
+    "contemplative": "Convey quiet reflection, solitude, peace in stillness.",
+    "warm": "Convey warmth, connection, comfort despite circumstances.",
+    "tense": "Convey tension, stakes rising, pivotal moment.",
+    "disoriented": "Convey confusion, vulnerability, waking to danger.",
+    "threatening": "Convey threat, survival instinct, danger approaching.",
+    "terror": "Convey raw fear, fight or flight, moment of truth.",
+    "tense_hope": "Convey desperate hope, words as survival, tension breaking.",
+    "judgment": "Convey being evaluated, fate in another's hands.",
+    "hopeful": "Convey relief, connection made, first success.",
+    "cautious_hope": "Convey guarded optimism, journey beginning, trust forming.",
+}
+
+_PROMPT_TEMPLATE = """WORK SURFACE: {work_surface}
+
+LAYOUT: {layout}
+
+COMPONENTS:
+{components}
+
+STYLE: {style}
+
+CONSTRAINTS:
+{constraints}
+
+SOURCE MATERIAL:
+{source}
+
+INTERPRETATION:
+{interpretation}"""
+
 
 def build_manifest_prompt(panel: PanelSpec) -> str:
     """Build a constraint-based prompt from panel spec."""
-
-    # Determine aspect ratio based on panel type
-    aspect_map = {
-        "establishing": ("wide", "16:9"),
-        "pov": ("wide", "16:9"),
-        "dialogue": ("square", "1:1"),
-        "emotional": ("square", "1:1"),
-        "action": ("tall", "9:16"),
-        "time_freeze": ("tall", "9:16"),
-    }
-    aspect_name, aspect_ratio = aspect_map.get(panel.panel_type, ("square", "1:1"))
+    panel_type = panel.panel_type
+    holographic = bool(panel.is_holographic)
+    time_freeze = bool(panel.is_time_freeze)
+    location_id = panel.location
+
+    # Aspect ratio and LAYOUT based on panel type
+    match panel_type:
+        case "establishing":
+            aspect_name, aspect_ratio = "wide", "16:9"
+            layout = "Wide establishing shot, POV perspective. Environment focus."
+        case "pov":
+            aspect_name, aspect_ratio = "wide", "16:9"
+            layout = "First-person POV shot. The viewer IS the protagonist looking at the scene."
+        case "dialogue":
+            aspect_name, aspect_ratio = "square", "1:1"
+            layout = "Medium shot, POV perspective. Focus on character(s) facing the viewer."
+        case "emotional":
+            aspect_name, aspect_ratio = "square", "1:1"
+            layout = "Close-up shot. Intense focus on facial expression and emotion."
+        case "action":
+            aspect_name, aspect_ratio = "tall", "9:16"
+            layout = "Dynamic action shot, POV. Movement and energy. The action comes toward the viewer."
+        case "time_freeze":
+            aspect_name, aspect_ratio = "tall", "9:16"
+            layout = "Time freeze moment. Frozen world (blue tint) with Bimbo as only color/motion."
+        case _:
+            aspect_name, aspect_ratio = "square", "1:1"
+            layout = "Standard composition."
 
     # WORK SURFACE
     work_surface = f"Create a single manhwa panel. {aspect_ratio} aspect ratio, {aspect_name} composition."
 
-    # LAYOUT based on panel type
-    layout_map = {
-        "establishing": "Wide establishing shot, POV perspective. Environment focus.",
-        "pov": "First-person POV shot. The viewer IS the protagonist looking at the scene.",
-        "dialogue": "Medium shot, POV perspective. Focus on character(s) facing the viewer.",
-        "emotional": "Close-up shot. Intense focus on facial expression and emotion.",
-        "action": "Dynamic action shot, POV. Movement and energy. The action comes toward the viewer.",
-        "time_freeze": "Time freeze moment. Frozen world (blue tint) with Bimbo as only color/motion.",
-    }
-    layout = layout_map.get(panel.panel_type, "Standard composition.")
-
     # COMPONENTS - characters with full descriptions
     components = []
     char_descriptions = get_panel_character_descriptions(panel, SHOGUN_CHARACTERS)
@@ -66,88 +122,93 @@ def build_manifest_prompt(panel: PanelSpec) -> str:
         components.append(char_descriptions)
 
     # Add location
-    if panel.location:
-        loc = SHOGUN_LOCATIONS.get(panel.location)
+    if location_id:
+        loc = SHOGUN_LOCATIONS.get(location_id)
         if loc:
             components.append(f"• Location: {loc.description}")
 
     components_str = "\n".join(components) if components else "• Scene as described"
 
     # STYLE
-    if panel.is_holographic:
-        style = f"{BASE_STYLE}\n{HOLOGRAPHIC_STYLE}"
-    elif panel.is_time_freeze:
-        style = f"{BASE_STYLE}\n{TIME_FREEZE_STYLE}"
-    else:
-        style = f"{BASE_STYLE}\n{CINEMATIC_STYLE}"
+    style = _STYLE_TABLE[holographic, time_freeze]
 
     # CONSTRAINTS
-    constraints = UNIVERSAL_CONSTRAINTS
-    if not panel.is_holographic:
-        constraints += HISTORICAL_CONSTRAINTS
-    if panel.is_holographic or panel.is_time_freeze:
-        constraints += HOLOGRAPHIC_CONSTRAINTS
+    constraints = _CONSTRAINT_TABLE[holographic, time_freeze]
 
     # SOURCE MATERIAL
     source = panel.description
     if panel.additional_notes:
-        source += f"\n\n{panel.additional_notes}"
+        source = f"{source}\n\n{panel.additional_notes}"
 
     # INTERPRETATION
-    mood_interpretations = {
-        "contemplative": "Convey quiet reflection, solitude, peace in stillness.",
-        "warm": "Convey warmth, connection, comfort despite circumstances.",
-        "tense": "Convey tension, stakes rising, pivotal moment.",
-        "disoriented": "Convey confusion, vulnerability, waking to danger.",
-        "threatening": "Convey threat, survival instinct, danger approaching.",
-        "terror": "Convey raw fear, fight or flight, moment of truth.",
-        "tense_hope": "Convey desperate hope, words as survival, tension breaking.",
-        "judgment": "Convey being evaluated, fate in another's hands.",
-        "hopeful": "Convey relief, connection made, first success.",
-        "cautious_hope": "Convey guarded optimism, journey beginning, trust forming.",
-    }
-    interpretation = mood_interpretations.get(panel.mood, "Convey the scene naturally.")
+    interpretation = _MOOD_INTERPRETATIONS.get(panel.mood, "Convey the scene naturally.")
+
+    return _PROMPT_TEMPLATE.format(
+        work_surface=work_surface,
+        layout=layout,
+        components=components_str,
+        style=style,
+        constraints=constraints,
+        source=source,
+        interpretation=interpretation,
+    )
 
-    # Assemble prompt
-    prompt = f"""WORK SURFACE: {work_surface}
 
-LAYOUT: {layout}
+PANEL_BY_ID: dict[str, PanelSpec] = {p.id: p for p in SHOGUN_PANELS}
 
-COMPONENTS:
-{components_str}
 
-STYLE: {style}
+# Prompts and output paths only depend on the static manifest, so build them once
+_PANEL_PLANS: dict[tuple[str, str], tuple[str, str]] = {}
 
-CONSTRAINTS:
-{constraints}
 
-SOURCE MATERIAL:
-{source}
+def panel_plan(panel: PanelSpec) -> tuple[str, str]:
+    """Return the cached (prompt, output_path) for a panel."""
+    key = (panel.chapter, panel.id)
+    plan = _PANEL_PLANS.get(key)
+    if plan is None:
+        output_path = os.path.join(PANEL_DIR, panel.chapter, f"{panel.id}.png")
+        plan = _PANEL_PLANS[key] = (build_manifest_prompt(panel), output_path)
+    return plan
 
-INTERPRETATION:
-{interpretation}"""
 
-    return prompt
+@lru_cache(maxsize=None)
+def _reference_candidates(panel: PanelSpec) -> tuple[str, ...]:
+    return panel_reference_candidates(panel, SHOGUN_CHARACTERS, SHOGUN_LOCATIONS)
 
 
-async def generate_panel_from_manifest(panel: PanelSpec, force: bool = False) -> dict:
-    """Generate a panel using the manifest system."""
+def panel_references(panel: PanelSpec) -> list[str]:
+    """Reference images for a panel that exist right now."""
+    return [p for p in _reference_candidates(panel) if os.path.exists(p)]
+
+
+# Panel filenames already on disk, scanned once per chapter directory
+_EXISTING_PANELS: dict[str, set[str]] = {}
+
+
+def _existing_panels(chapter: str) -> set[str]:
+    existing = _EXISTING_PANELS.get(chapter)
+    if existing is None:
+        chapter_dir = os.path.join(PANEL_DIR, chapter)
+        os.makedirs(chapter_dir, exist_ok=True)
+        with os.scandir(chapter_dir) as entries:
+            existing = _EXISTING_PANELS[chapter] = {e.name for e in entries if e.is_file()}
+    return existing
 
-    # Get all reference images for this panel
-    references = get_panel_references(panel, SHOGUN_CHARACTERS, SHOGUN_LOCATIONS)
 
-    # Build prompt
-    prompt = build_manifest_prompt(panel)
+async def generate_panel_from_manifest(panel: PanelSpec, force: bool = False) -> dict:
+    """Generate a panel using the manifest system."""
 
-    # Output path
-    chapter_dir = os.path.join(PANEL_DIR, panel.chapter)
-    os.makedirs(chapter_dir, exist_ok=True)
-    output_path = os.path.join(chapter_dir, f"{panel.id}.png")
+    prompt, output_path = panel_plan(panel)
+    existing = _existing_panels(panel.chapter)
+    filename = f"{panel.id}.png"
 
     # Check cache
-    if not force and os.path.exists(output_path):
+    if not force and filename in existing:
         return {"panel_id": panel.id, "path": output_path, "cached": True}
 
+    # References are looked up per run since they appear as refs get generated
+    references = panel_references(panel)
+
     # Generate
     result = await generate_image(
         prompt=prompt,
@@ -156,6 +217,7 @@ async def generate_panel_from_manifest(panel: PanelSpec, force: bool = False) ->
         force=force,
     )
 
+    existing.add(filename)
     return {
         "panel_id": panel.id,
         "path": result["path"],
@@ -165,42 +227,49 @@ async def generate_panel_from_manifest(panel: PanelSpec, force: bool = False) ->
 
 
 async def generate_all_panels(force: bool = False):
-    """Generate all panels from the manifest."""
-
-    results = []
+    """Generate all panels from the manifest, yielding each result as it finishes."""
+
+    sem = asyncio.Semaphore(PANEL_CONCURRENCY)
+
+    async def _one(panel: PanelSpec) -> dict:
+        async with sem:
+            try:
+                result = await generate_panel_from_manifest(panel, force)
+            except Exception as e:
+                print(f"{panel.id} -> ERROR: {e}")
+                return {"panel_id": panel.id, "error": str(e)}
+        cached_str = "(cached)" if result.get("cached") else ""
+        print(f"{panel.id} -> {result['path']} {cached_str}")
+        print(f"  Characters: {list(panel.characters)}")
+        print(f"  References: {result.get('references_used', 0)} images")
+        return result
 
-    for panel in SHOGUN_PANELS:
-        refs = get_panel_references(panel, SHOGUN_CHARACTERS, SHOGUN_LOCATIONS)
-        print(f"Generating {panel.id}...")
-        print(f"  Characters: {panel.characters}")
-        print(f"  References: {len(refs)} images")
+    for finished in asyncio.as_completed([_one(p) for p in SHOGUN_PANELS]):
+        yield await finished
 
-        try:
-            result = await generate_panel_from_manifest(panel, force)
-            results.append(result)
-            cached_str = "(cached)" if result.get("cached") else ""
-            print(f"  -> {result['path']} {cached_str}")
-        except Exception as e:
-            print(f"  -> ERROR: {e}")
-            results.append({"panel_id": panel.id, "error": str(e)})
 
-    return results
+async def run_all_panels(force: bool = False) -> int:
+    """Generate all panels and return how many succeeded."""
+    success = 0
+    async for result in generate_all_panels(force):
+        success += "error" not in result
+    return success
 
 
 async def generate_single_panel(panel_id: str, force: bool = False):
     """Generate a single panel by ID."""
 
-    panel = next((p for p in SHOGUN_PANELS if p.id == panel_id), None)
+    panel = PANEL_BY_ID.get(panel_id)
     if not panel:
         print(f"Panel not found: {panel_id}")
         return None
 
-    refs = get_panel_references(panel, SHOGUN_CHARACTERS, SHOGUN_LOCATIONS)
-    prompt = build_manifest_prompt(panel)
+    refs = panel_references(panel)
+    prompt, _ = panel_plan(panel)
 
     print(f"Generating {panel_id}...")
-    print(f"Characters: {panel.characters}")
-    print(f"References: {[os.path.basename(r) for r in refs]}")
+    print(f"Characters: {list(panel.characters)}")
+    print(f"References: {[r.rsplit(os.sep, 1)[-1] for r in refs]}")
     print(f"\nPrompt preview:\n{prompt[:600]}...")
 
     try:
@@ -219,15 +288,16 @@ async def generate_single_panel(panel_id: str, force: bool = False):
 if __name__ == "__main__":
     import sys
 
-    force = "--force" in sys.argv
-    args = [a for a in sys.argv[1:] if a != "--force"]
-
-    if args:
-        # Generate single panel
-        panel_id = args[0]
-        asyncio.run(generate_single_panel(panel_id, force))
-    else:
-        # Generate all panels
-        results = asyncio.run(generate_all_panels(force))
-        success = len([r for r in results if "error" not in r])
-        print(f"\nGenerated {success}/{len(SHOGUN_PANELS)} panels")
+    args = sys.argv[1:]
+    force = "--force" in args
+    if force:
+        args = [a for a in args if a != "--force"]
+
+    match args:
+        case [panel_id, *_]:
+            # Generate single panel
+            asyncio.run(generate_single_panel(panel_id, force))
+        case _:
+            # Generate all panels
+            success = asyncio.run(run_all_panels(force))
+            print(f"\nGenerated {success}/{len(SHOGUN_PANELS)} panels")
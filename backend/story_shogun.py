@@ -6,14 +6,32 @@ Bimbo (AI companion) can freeze time to teach vocabulary.
 """
 
 import os
+import sys
 import asyncio
-from story_manifest import Character, Location, PanelSpec, get_panel_references
-from image_gen_google import generate_character_ref, generate_location_ref
+import io
+from collections import Counter
+from pathlib import Path
+from story_types import (
+    Character,
+    Location,
+    PanelSpec,
+    existing_paths,
+    generate_references as _generate_references,
+    missing_references,
+    print_reference_report,
+)
 
 # Paths
-IMAGE_CACHE_DIR = os.path.join(os.path.dirname(__file__), "..", "image_cache")
-CHARACTER_REF_DIR = os.path.join(IMAGE_CACHE_DIR, "characters")
-LOCATION_REF_DIR = os.path.join(IMAGE_CACHE_DIR, "locations")
+_IMAGE_CACHE = Path(__file__).resolve().parent.parent / "image_cache"
+IMAGE_CACHE_DIR = str(_IMAGE_CACHE)
+CHARACTER_REF_DIR = str(_IMAGE_CACHE / "characters")
+LOCATION_REF_DIR = str(_IMAGE_CACHE / "locations")
+# Reference paths below are plain prefix + filename
+_CHAR_PREFIX = CHARACTER_REF_DIR + os.sep
+_LOC_PREFIX = LOCATION_REF_DIR + os.sep
+
+# Shared by beach_dawn and village_path, so both hold the same string object
+_BEACH_DAWN_PNG = sys.intern(f"{_LOC_PREFIX}beach_dawn.png")
 
 
 # ============================================================
@@ -24,6 +42,9 @@ STORY_ID = "shogun_test"
 STORY_TITLE = "The Weight of Words"
 STORY_SUBTITLE = "Shogun Era, Japan 1600"
 
+# Image generation is network-bound; keep a few requests in flight
+GENERATION_CONCURRENCY = 4
+
 
 # ============================================================
 # CHARACTERS
@@ -31,81 +52,81 @@ STORY_SUBTITLE = "Shogun Era, Japan 1600"
 
 CHARACTERS = {
     # === MAIN CHARACTERS ===
-    "bimbo": Character(
+    "bimbo": Character.make(
         id="bimbo",
         name="Bimbo",
         description="Young woman AI hologram. Long straight hair with purple-to-cyan gradient (purple at roots, cyan at tips). Warm friendly expression. Soft holographic glow emanating from her form. Floating particles trail behind her. Manhwa style with large expressive eyes.",
-        reference_path=os.path.join(CHARACTER_REF_DIR, "bimbo.png"),
+        reference_path=f"{_CHAR_PREFIX}bimbo.png",
         variants={
-            "teaching": os.path.join(CHARACTER_REF_DIR, "bimbo_teaching.png"),
-            "casual": os.path.join(CHARACTER_REF_DIR, "bimbo_casual.png"),
-            "danger": os.path.join(CHARACTER_REF_DIR, "bimbo_danger.png"),
+            "teaching": f"{_CHAR_PREFIX}bimbo_teaching.png",
+            "casual": f"{_CHAR_PREFIX}bimbo_casual.png",
+            "danger": f"{_CHAR_PREFIX}bimbo_danger.png",
         }
     ),
 
-    "hana": Character(
+    "hana": Character.make(
         id="hana",
         name="Hana",
         description="Elderly Japanese village woman, 60s. Deeply weathered face with prominent wrinkles around eyes and mouth. Gray hair pulled back tightly in a simple bun. Sharp intelligent eyes that miss nothing. Thin lips, strong jaw. Simple brown peasant clothes. Carries herself with quiet authority despite humble appearance.",
-        reference_path=os.path.join(CHARACTER_REF_DIR, "hana.png"),
+        reference_path=f"{_CHAR_PREFIX}hana.png",
     ),
 
     # === RECURRING UNNAMED CHARACTERS ===
-    "farmer_hostile": Character(
+    "farmer_hostile": Character.make(
         id="farmer_hostile",
         name="Hostile Farmer",
         description="Japanese farmer, 40s, the threat. Muscular from labor. Angry suspicious expression, teeth bared. Carries farming hoe as weapon. Simple roughspun clothes, bare feet. Tanned weathered skin. Short cropped black hair. He is the one who almost kills you.",
-        reference_path=os.path.join(CHARACTER_REF_DIR, "farmer_hostile.png"),
+        reference_path=f"{_CHAR_PREFIX}farmer_hostile.png",
     ),
 
-    "farmer_young": Character(
+    "farmer_young": Character.make(
         id="farmer_young",
         name="Young Farmer",
         description="Young Japanese farmer, early 20s. Less aggressive than the hostile farmer, more curious than angry. Slim build. Simple peasant clothes. Black hair tied back. Uncertain expression - follows the group but hesitant about violence.",
-        reference_path=os.path.join(CHARACTER_REF_DIR, "farmer_young.png"),
+        reference_path=f"{_CHAR_PREFIX}farmer_young.png",
     ),
 
-    "farmer_old": Character(
+    "farmer_old": Character.make(
         id="farmer_old",
         name="Old Farmer",
         description="Older Japanese farmer, 50s. Weathered but not as harsh as Hana. Cautious expression. Carries a wooden staff. Gray-streaked hair. Worn clothes patched many times. Hangs back from confrontation.",
-        reference_path=os.path.join(CHARACTER_REF_DIR, "farmer_old.png"),
+        reference_path=f"{_CHAR_PREFIX}farmer_old.png",
     ),
 
     # === CHARACTERS FOR LATER CHAPTERS ===
-    "mariko": Character(
+    "mariko": Character.make(
         id="mariko",
         name="Mariko",
         description="Elegant Japanese noblewoman. Refined features, composed expression. Elaborate kimono with subtle patterns. Hair pinned with ornaments. Graceful bearing. She speaks softly but commands attention. Sengoku period nobility.",
-        reference_path=os.path.join(CHARACTER_REF_DIR, "mariko.png"),
+        reference_path=f"{_CHAR_PREFIX}mariko.png",
     ),
 
-    "samurai": Character(
+    "samurai": Character.make(
         id="samurai",
         name="Samurai (Hostile)",
         description="Japanese samurai warrior. Stern threatening expression. Traditional armor or formal samurai attire. Hand near sword. Authority and danger. Sengoku period.",
-        reference_path=os.path.join(CHARACTER_REF_DIR, "samurai_hostile.png"),
+        reference_path=f"{_CHAR_PREFIX}samurai_hostile.png",
     ),
 
-    "eikou": Character(
+    "eikou": Character.make(
         id="eikou",
         name="Eikou",
         description="Buddhist monk. Shaved head, calm wise expression. Simple monk robes. Weathered but peaceful face. Sengoku period.",
-        reference_path=os.path.join(CHARACTER_REF_DIR, "eikou.png"),
+        reference_path=f"{_CHAR_PREFIX}eikou.png",
     ),
 
-    "takeshi": Character(
+    "takeshi": Character.make(
         id="takeshi",
         name="Takeshi",
         description="Young samurai, more refined than hostile samurai. Intelligent eyes, measured expression. Formal attire. Sengoku period.",
-        reference_path=os.path.join(CHARACTER_REF_DIR, "takeshi.png"),
+        reference_path=f"{_CHAR_PREFIX}takeshi.png",
     ),
 
-    "kenji": Character(
+    "kenji": Character.make(
         id="kenji",
         name="Kenji",
         description="Young Japanese farmer. Wary but curious expression. Simple work clothes. Muscular from farm labor. Sengoku period.",
-        reference_path=os.path.join(CHARACTER_REF_DIR, "kenji.png"),
+        reference_path=f"{_CHAR_PREFIX}kenji.png",
     ),
 }
 
@@ -119,70 +140,77 @@ LOCATIONS = {
         id="ship_observation",
         name="Spaceship Observation Deck",
         description="Spaceship observation deck. Wide curved window showing infinite stars and void of space. Purple and cyan ambient lighting. Minimalist futuristic furniture. Contemplative atmosphere.",
-        reference_path=os.path.join(LOCATION_REF_DIR, "ship_observation.png"),
+        reference_path=f"{_LOC_PREFIX}ship_observation.png",
     ),
 
     "beach_dawn": Location(
         id="beach_dawn",
         name="Japanese Beach at Dawn",
         description="Japanese beach at dawn after a storm. Bruised sky with purple and amber colors. Waves washing on sand. Shipwreck debris scattered. Mountains visible in distance. Dangerous beautiful atmosphere.",
-        reference_path=os.path.join(LOCATION_REF_DIR, "beach_dawn.png"),
+        reference_path=_BEACH_DAWN_PNG,
+    ),
+
+    "village_path": Location(
+        id="village_path",
+        name="Path to Village",
+        description="Sandy path leading from beach toward small Japanese fishing village. Thatched roof buildings visible in distance. Dawn light. Mountains behind village.",
+        reference_path=_BEACH_DAWN_PNG,  # Reuse beach for now
     ),
 
     "village_day": Location(
         id="village_day",
         name="Japanese Village",
         description="Small Japanese village, Sengoku period. Cluster of wooden buildings around muddy central path. Smoke from cook fires. Farmers at work.",
-        reference_path=os.path.join(LOCATION_REF_DIR, "village_day.png"),
+        reference_path=f"{_LOC_PREFIX}village_day.png",
     ),
 
     "village_samurai": Location(
         id="village_samurai",
         name="Village with Samurai",
         description="Japanese village with tension. Samurai have arrived. Villagers clearing path, fearful. Atmosphere of danger and oppression.",
-        reference_path=os.path.join(LOCATION_REF_DIR, "village_samurai.png"),
+        reference_path=f"{_LOC_PREFIX}village_samurai.png",
     ),
 
     "forest_road": Location(
         id="forest_road",
         name="Forest Road",
         description="Forest road in feudal Japan. Cedar trees thick on both sides. Mountain path with switchbacks. Rain and mist.",
-        reference_path=os.path.join(LOCATION_REF_DIR, "forest_road.png"),
+        reference_path=f"{_LOC_PREFIX}forest_road.png",
     ),
 
     "castle_exterior": Location(
         id="castle_exterior",
         name="Castle Exterior",
         description="Japanese castle on a hill above a river. Gray stone walls rising from mist. Solid and permanent. Statement of power.",
-        reference_path=os.path.join(LOCATION_REF_DIR, "castle_exterior.png"),
+        reference_path=f"{_LOC_PREFIX}castle_exterior.png",
     ),
 
     "castle_interior": Location(
         id="castle_interior",
         name="Castle Interior",
         description="Interior of Japanese castle, tatami room. Sliding paper screens (shoji). Minimal furnishing. Window overlooking valley.",
-        reference_path=os.path.join(LOCATION_REF_DIR, "castle_interior.png"),
+        reference_path=f"{_LOC_PREFIX}castle_interior.png",
     ),
 
     "garden_koi": Location(
         id="garden_koi",
         name="Koi Garden",
         description="Small Japanese garden within castle grounds. Koi pond with gold and white fish. Arranged rocks, bent pine tree. Autumn colors.",
-        reference_path=os.path.join(LOCATION_REF_DIR, "garden_koi.png"),
+        reference_path=f"{_LOC_PREFIX}garden_koi.png",
     ),
 
     "temple_exterior": Location(
         id="temple_exterior",
         name="Mountain Temple",
         description="Small Buddhist temple in the mountains. Weathered wooden building with mossy roof. Bell in wooden frame. Surrounded by forest and mist.",
-        reference_path=os.path.join(LOCATION_REF_DIR, "temple_exterior.png"),
+        reference_path=f"{_LOC_PREFIX}temple_exterior.png",
     ),
 
     "sekigahara_sunset": Location(
         id="sekigahara_sunset",
         name="Sekigahara Battlefield",
         description="Sekigahara battlefield, months after the battle. Wide valley between mountains. Trampled grass recovering. Remnants of war. Sunset light.",
-        reference_path=os.path.join(LOCATION_REF_DIR, "sekigahara_sunset.png"),
+        reference_path=f"{_LOC_PREFIX}sekigahara_sunset.png",
     ),
 }
 
@@ -337,91 +365,82 @@ PANELS = [
         panel_type="establishing",
         description="POV following Hana. She walks ahead up the sandy path toward the village, glancing back and gesturing for you to follow. Village visible in distance. Dawn light warming the scene.",
         characters=["hana"],
-        location="beach_dawn",
+        location="village_path",
         speaker="hana",
         mood="cautious_hope",
         additional_notes="Hana ahead on path, looking back at us. We are following her into the unknown.",
     ),
 ]
 
+# Chapter column, so summaries scan strings rather than whole PanelSpecs
+PANEL_CHAPTERS = [p.chapter for p in PANELS]
+
 
 # ============================================================
 # UTILITY FUNCTIONS
 # ============================================================
 
-def check_missing():
-    """Check which references need to be generated."""
-    missing = {"characters": [], "locations": []}
+# Reference paths found on disk, scanned once until refresh_presence()
+_present: set[str] | None = None
 
-    for char_id, char in CHARACTERS.items():
-        if not char.reference_path or not os.path.exists(char.reference_path):
-            missing["characters"].append(char_id)
 
-    for loc_id, loc in LOCATIONS.items():
-        if not loc.reference_path or not os.path.exists(loc.reference_path):
-            missing["locations"].append(loc_id)
+def _present_refs() -> set[str]:
+    """Reference paths that already exist, one directory listing per folder."""
+    global _present
+    if _present is None:
+        _present = existing_paths(
+            [c.reference_path for c in CHARACTERS.values()]
+            + [loc.reference_path for loc in LOCATIONS.values()]
+        )
+    return _present
 
-    return missing
+
+def refresh_presence() -> None:
+    """Forget the cached reference scan, e.g. after generating references."""
+    global _present
+    _present = None
+
+
+def check_missing():
+    """Check which references are missing or were made from an older description."""
+    return missing_references(CHARACTERS, LOCATIONS, _present_refs())
 
 
 def print_summary():
     """Print story summary."""
-    print(f"\n{'='*50}")
-    print(f"STORY: {STORY_TITLE}")
-    print(f"ID: {STORY_ID}")
-    print(f"{'='*50}")
-    print(f"\nCharacters: {len(CHARACTERS)}")
+    buf = io.StringIO()
+    print(f"\n{'='*50}", file=buf)
+    print(f"STORY: {STORY_TITLE}", file=buf)
+    print(f"ID: {STORY_ID}", file=buf)
+    print(f"{'='*50}", file=buf)
+    present = _present_refs()
+    print(f"\nCharacters: {len(CHARACTERS)}", file=buf)
     for cid, char in CHARACTERS.items():
-        has_ref = "✓" if char.reference_path and os.path.exists(char.reference_path) else "✗"
-        print(f"  [{has_ref}] {cid}: {char.name}")
+        has_ref = "✓" if char.reference_path in present else "✗"
+        print(f"  [{has_ref}] {cid}: {char.name}", file=buf)
 
-    print(f"\nLocations: {len(LOCATIONS)}")
+    print(f"\nLocations: {len(LOCATIONS)}", file=buf)
     for lid, loc in LOCATIONS.items():
-        has_ref = "✓" if loc.reference_path and os.path.exists(loc.reference_path) else "✗"
-        print(f"  [{has_ref}] {lid}: {loc.name}")
-
-    print(f"\nPanels: {len(PANELS)}")
-    chapters = {}
-    for p in PANELS:
-        chapters[p.chapter] = chapters.get(p.chapter, 0) + 1
-    for ch, count in chapters.items():
-        print(f"  {ch}: {count} panels")
-
+        has_ref = "✓" if loc.reference_path in present else "✗"
+        print(f"  [{has_ref}] {lid}: {loc.name}", file=buf)
 
-async def generate_references(force=False):
-    """Generate missing character and location references."""
-    missing = check_missing()
+    print(f"\nPanels: {len(PANELS)}", file=buf)
+    for ch, count in Counter(PANEL_CHAPTERS).items():
+        print(f"  {ch}: {count} panels", file=buf)
+    sys.stdout.write(buf.getvalue())
 
-    for char_id in missing["characters"]:
-        char = CHARACTERS[char_id]
-        prompt = f"""Manhwa/Korean webtoon style character portrait.
 
-{char.description}
+async def generate_references(force=False) -> list[dict]:
+    """Generate missing character and location references, a few at a time.
 
-Portrait shot, shoulders up, facing camera.
-Clean background. Professional character design reference quality.
-Expressive manhwa style, clean linework, soft cel-shading.
-
-NO TEXT IN IMAGE."""
-
-        print(f"Generating character: {char_id}...")
-        result = await generate_character_ref(char_id, prompt, force=force)
-        print(f"  -> {result['path']}")
-
-    for loc_id in missing["locations"]:
-        loc = LOCATIONS[loc_id]
-        prompt = f"""Manhwa/Korean webtoon style environment.
-
-{loc.description}
-
-Wide establishing shot. Rich detail.
-Clean manhwa aesthetic, soft lighting.
-
-NO TEXT IN IMAGE."""
-
-        print(f"Generating location: {loc_id}...")
-        result = await generate_location_ref(loc_id, prompt, force=force)
-        print(f"  -> {result['path']}")
+    Returns one {"kind", "id", "path"} or {"kind", "id", "error"} dict per reference.
+    """
+    try:
+        return await _generate_references(
+            CHARACTERS, LOCATIONS, check_missing(), force, GENERATION_CONCURRENCY
+        )
+    finally:
+        refresh_presence()
 
 
 # ============================================================
@@ -429,9 +448,6 @@ NO TEXT IN IMAGE."""
 # ============================================================
 
 if __name__ == "__main__":
-    import sys
-    from story_panels_test import generate_all_panels
-
     if len(sys.argv) < 2:
         print_summary()
         print("\nUsage:")
@@ -441,33 +457,25 @@ if __name__ == "__main__":
         print("  python story_shogun.py all      - Generate everything")
         sys.exit(0)
 
-    cmd = sys.argv[1]
-    force = "--force" in sys.argv
-
-    if cmd == "check":
-        missing = check_missing()
-        print("Missing references:")
-        print(f"  Characters: {missing['characters']}")
-        print(f"  Locations: {missing['locations']}")
-
-    elif cmd == "generate":
-        asyncio.run(generate_references(force))
-
-    elif cmd == "panels":
-        # Update the manifest with our data
-        import story_manifest
-        story_manifest.SHOGUN_CHARACTERS = CHARACTERS
-        story_manifest.SHOGUN_LOCATIONS = LOCATIONS
-        story_manifest.SHOGUN_PANELS = PANELS
-        asyncio.run(generate_all_panels(force))
-
-    elif cmd == "all":
-        asyncio.run(generate_references(force))
-        import story_manifest
-        story_manifest.SHOGUN_CHARACTERS = CHARACTERS
-        story_manifest.SHOGUN_LOCATIONS = LOCATIONS
-        story_manifest.SHOGUN_PANELS = PANELS
-        asyncio.run(generate_all_panels(force))
-
-    else:
-        print(f"Unknown command: {cmd}")
+    cmd, *rest = sys.argv[1:]
+    force = "--force" in rest
+
+    match cmd:
+        case "check":
+            missing = check_missing()
+            print("Missing references:")
+            print(f"  Characters: {missing['characters']}")
+            print(f"  Locations: {missing['locations']}")
+
+        case "generate":
+            print_reference_report(asyncio.run(generate_references(force)))
+
+        case "panels" | "all":
+            from story_panels_test import run_all_panels
+
+            if cmd == "all":
+                print_reference_report(asyncio.run(generate_references(force)))
+            asyncio.run(run_all_panels(force))
+
+        case _:
+            print(f"Unknown command: {cmd}")
@@ -16,13 +16,22 @@ WORKFLOW:
 
 import os
 import asyncio
+import io
+import sys
+from collections import Counter
 from dataclasses import dataclass, field
 from typing import Optional
 
 # Import from the core system
-from story_manifest import Character, Location, PanelSpec, get_panel_references
-from story_panels_test import build_manifest_prompt, generate_panel_from_manifest
-from image_gen_google import generate_character_ref, generate_location_ref
+from story_types import (
+    Character,
+    Location,
+    PanelSpec,
+    existing_paths,
+    generate_references as _generate_references,
+    missing_references,
+    print_reference_report,
+)
 
 # Paths
 IMAGE_CACHE_DIR = os.path.join(os.path.dirname(__file__), "..", "image_cache")
@@ -39,6 +48,9 @@ STORY_ID = "template"  # Change this! Used for panel folders
 STORY_TITLE = "Story Title"
 STORY_SUBTITLE = "Setting and Era"
 
+# Image generation is network-bound; keep a few requests in flight
+GENERATION_CONCURRENCY = 4
+
 
 # ============================================================
 # CHARACTERS
@@ -60,7 +72,7 @@ STORY_SUBTITLE = "Setting and Era"
 
 CHARACTERS = {
     # Example main character
-    "protagonist_companion": Character(
+    "protagonist_companion": Character.make(
         id="protagonist_companion",
         name="Character Name",
         description="""Detailed visual description here.
@@ -72,7 +84,7 @@ What makes them recognizable across panels.""",
     ),
 
     # Example recurring side character
-    "village_elder": Character(
+    "village_elder": Character.make(
         id="village_elder",
         name="Elder",
         description="""Detailed visual description here.""",
@@ -80,7 +92,7 @@ What makes them recognizable across panels.""",
     ),
 
     # You can reuse characters from other stories by importing them:
-    # from story_shogun import SHOGUN_CHARACTERS
+    # from story_shogun import CHARACTERS as SHOGUN_CHARACTERS
     # "bimbo": SHOGUN_CHARACTERS["bimbo"],  # Reuse Bimbo
 }
 
@@ -156,109 +168,96 @@ They face the viewer directly. Describe their expression.""",
     # Add more panels...
 ]
 
+# Chapter column, so summaries scan strings rather than whole PanelSpecs
+PANEL_CHAPTERS = [p.chapter for p in PANELS]
+
 
 # ============================================================
 # GENERATION FUNCTIONS
 # ============================================================
 
-def check_missing():
-    """Check which references need to be generated."""
-    missing = {"characters": [], "locations": []}
-
-    for char_id, char in CHARACTERS.items():
-        if not char.reference_path or not os.path.exists(char.reference_path):
-            missing["characters"].append(char_id)
-
-    for loc_id, loc in LOCATIONS.items():
-        if not loc.reference_path or not os.path.exists(loc.reference_path):
-            missing["locations"].append(loc_id)
-
-    return missing
-
+# Reference paths found on disk, scanned once until refresh_presence()
+_present: set[str] | None = None
 
-async def generate_references(force=False):
-    """Generate missing character and location references."""
 
-    missing = check_missing()
+def _present_refs() -> set[str]:
+    """Reference paths that already exist, one directory listing per folder."""
+    global _present
+    if _present is None:
+        _present = existing_paths(
+            [c.reference_path for c in CHARACTERS.values()]
+            + [loc.reference_path for loc in LOCATIONS.values()]
+        )
+    return _present
 
-    # Generate characters
-    for char_id in missing["characters"]:
-        char = CHARACTERS[char_id]
-        prompt = f"""Manhwa/Korean webtoon style character portrait.
 
-{char.description}
+def refresh_presence() -> None:
+    """Forget the cached reference scan, e.g. after generating references."""
+    global _present
+    _present = None
 
-Portrait shot, shoulders up, facing camera.
-Clean background. Professional character design reference quality.
-Expressive manhwa style, clean linework, soft cel-shading.
 
-NO TEXT IN IMAGE."""
-
-        print(f"Generating character: {char_id}...")
-        result = await generate_character_ref(char_id, prompt, force=force)
-        print(f"  -> {result['path']}")
-
-    # Generate locations
-    for loc_id in missing["locations"]:
-        loc = LOCATIONS[loc_id]
-        prompt = f"""Manhwa/Korean webtoon style environment.
-
-{loc.description}
+def check_missing():
+    """Check which references are missing or were made from an older description."""
+    return missing_references(CHARACTERS, LOCATIONS, _present_refs())
 
-Wide establishing shot. Rich detail.
-Clean manhwa aesthetic, soft lighting.
 
-NO TEXT IN IMAGE."""
+async def generate_references(force=False) -> list[dict]:
+    """Generate missing character and location references, a few at a time.
 
-        print(f"Generating location: {loc_id}...")
-        result = await generate_location_ref(loc_id, prompt, force=force)
-        print(f"  -> {result['path']}")
+    Returns one {"kind", "id", "path"} or {"kind", "id", "error"} dict per reference.
+    """
+    try:
+        return await _generate_references(
+            CHARACTERS, LOCATIONS, check_missing(), force, GENERATION_CONCURRENCY
+        )
+    finally:
+        refresh_presence()
 
 
 async def generate_panels(force=False):
-    """Generate all story panels."""
-
-    results = []
+    """Generate all story panels, a few at a time."""
+    from story_panels_test import generate_panel_from_manifest
 
-    for panel in PANELS:
-        refs = get_panel_references(panel, CHARACTERS, LOCATIONS)
-        print(f"Generating {panel.id}...")
-        print(f"  Characters: {panel.characters}")
-        print(f"  References: {len(refs)} images")
+    sem = asyncio.Semaphore(GENERATION_CONCURRENCY)
 
-        try:
-            result = await generate_panel_from_manifest(panel, force)
-            results.append(result)
-            print(f"  -> {result['path']}")
-        except Exception as e:
-            print(f"  -> ERROR: {e}")
-            results.append({"panel_id": panel.id, "error": str(e)})
+    async def _one(panel):
+        async with sem:
+            try:
+                result = await generate_panel_from_manifest(panel, force)
+            except Exception as e:
+                print(f"{panel.id} -> ERROR: {e}")
+                return {"panel_id": panel.id, "error": str(e)}
+        print(f"{panel.id} -> {result['path']}")
+        print(f"  Characters: {list(panel.characters)}")
+        print(f"  References: {result.get('references_used', 0)} images")
+        return result
 
-    return results
+    return list(await asyncio.gather(*(_one(p) for p in PANELS)))
 
 
 def print_summary():
     """Print story summary."""
-    print(f"\n{'='*50}")
-    print(f"STORY: {STORY_TITLE}")
-    print(f"ID: {STORY_ID}")
-    print(f"{'='*50}")
-    print(f"\nCharacters: {len(CHARACTERS)}")
+    buf = io.StringIO()
+    print(f"\n{'='*50}", file=buf)
+    print(f"STORY: {STORY_TITLE}", file=buf)
+    print(f"ID: {STORY_ID}", file=buf)
+    print(f"{'='*50}", file=buf)
+    present = _present_refs()
+    print(f"\nCharacters: {len(CHARACTERS)}", file=buf)
     for cid, char in CHARACTERS.items():
-        has_ref = "✓" if char.reference_path and os.path.exists(char.reference_path) else "✗"
-        print(f"  [{has_ref}] {cid}: {char.name}")
+        has_ref = "✓" if char.reference_path in present else "✗"
+        print(f"  [{has_ref}] {cid}: {char.name}", file=buf)
 
-    print(f"\nLocations: {len(LOCATIONS)}")
+    print(f"\nLocations: {len(LOCATIONS)}", file=buf)
     for lid, loc in LOCATIONS.items():
-        has_ref = "✓" if loc.reference_path and os.path.exists(loc.reference_path) else "✗"
-        print(f"  [{has_ref}] {lid}: {loc.name}")
+        has_ref = "✓" if loc.reference_path in present else "✗"
+        print(f"  [{has_ref}] {lid}: {loc.name}", file=buf)
 
-    print(f"\nPanels: {len(PANELS)}")
-    chapters = {}
-    for p in PANELS:
-        chapters[p.chapter] = chapters.get(p.chapter, 0) + 1
-    for ch, count in chapters.items():
-        print(f"  {ch}: {count} panels")
+    print(f"\nPanels: {len(PANELS)}", file=buf)
+    for ch, count in Counter(PANEL_CHAPTERS).items():
+        print(f"  {ch}: {count} panels", file=buf)
+    sys.stdout.write(buf.getvalue())
 
 
 # ============================================================
@@ -266,8 +265,6 @@ def print_summary():
 # ============================================================
 
 if __name__ == "__main__":
-    import sys
-
     if len(sys.argv) < 2:
         print_summary()
         print("\nUsage:")
@@ -287,13 +284,13 @@ if __name__ == "__main__":
         print(f"  Locations: {missing['locations']}")
 
     elif cmd == "generate":
-        asyncio.run(generate_references(force))
+        print_reference_report(asyncio.run(generate_references(force)))
 
     elif cmd == "panels":
         asyncio.run(generate_panels(force))
 
     elif cmd == "all":
-        asyncio.run(generate_references(force))
+        print_reference_report(asyncio.run(generate_references(force)))
         asyncio.run(generate_panels(force))
 
     else:
@@ -9,47 +9,100 @@ Uses LLM to analyze narrative and generate appropriate panel descriptions.
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import json
-import re
-from typing import Optional, List
-from dataclasses import asdict
+import threading
+import time
+import weakref
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, List, Tuple
+from dataclasses import asdict, dataclass, field
 
-from langchain_core.messages import HumanMessage
+from langchain_core.messages import HumanMessage, SystemMessage
 
 import config
+import llm_json
 import providers
+from story_voices import SHOGUN_CHARACTERS
 from visual_styles import (
     Panel, VisualSequence, ArtStyle, PanelType,
     VisualEffect, Mood, build_image_prompt
 )
 
-
-def adapt_story_to_panels(
-    narrative: str,
-    *,
-    title: str = "Scene",
-    art_style: ArtStyle = ArtStyle.MANHWA,
-    target_language: str = "Japanese",
-    max_panels: int = 12,
-    include_dialogue: bool = True,
-) -> VisualSequence:
-    """Convert a narrative text into a visual panel sequence.
-
-    Args:
-        narrative: The story text, transcript, or scene description
-        title: Title for this sequence
-        art_style: Default art style for panels
-        target_language: The language being learned (for dialogue)
-        max_panels: Maximum number of panels to generate
-        include_dialogue: Whether to extract/generate dialogue
-
-    Returns:
-        VisualSequence with panels ready for image generation
-    """
-    prompt = f"""You are a manga/webtoon storyboard artist. Convert this narrative into a visual panel sequence.
-
-NARRATIVE:
-{narrative}
+# Value -> member maps so parsing LLM output is a dict lookup, not Enum() + except
+_PANEL_TYPE_MAP = {m.value: m for m in PanelType}
+_MOOD_MAP = {m.value: m for m in Mood}
+_EFFECT_MAP = {m.value: m for m in VisualEffect}
+
+# Fallback panel mood per speaker, derived from the voice manifest's default
+# sentiment so story_voices stays the one place character affect is defined
+_SENTIMENT_MOOD = {
+    "stern": Mood.TENSE,
+    "suspicious": Mood.COLD,
+    "thoughtful": Mood.PEACEFUL,
+    "encouraging": Mood.HOPEFUL,
+    "mysterious": Mood.MYSTERIOUS,
+    "warm": Mood.WARM,
+}
+_SPEAKER_FALLBACK_MOOD = {
+    cid: _SENTIMENT_MOOD.get(c.default_sentiment, Mood.WARM)
+    for cid, c in SHOGUN_CHARACTERS.items()
+}
+_SPEAKER_FALLBACK_MOOD["narration"] = Mood.MYSTERIOUS
+
+# JSON Schemas for Gemini's constrained JSON mode, so replies decode directly
+_NULLABLE_STR = {"type": ["string", "null"]}
+_PANEL_COMMON_PROPS = {
+    "id": {"type": "string"},
+    "type": {"type": "string", "enum": list(_PANEL_TYPE_MAP)},
+    "scene_description": {"type": "string"},
+    "mood": {"type": "string", "enum": list(_MOOD_MAP)},
+    "effects": {"type": "array", "items": {"type": "string", "enum": list(_EFFECT_MAP)}},
+    "character_expression": _NULLABLE_STR,
+    "duration_ms": {"type": "integer"},
+}
+PANEL_ARRAY_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            **_PANEL_COMMON_PROPS,
+            "dialogue": _NULLABLE_STR,
+            "dialogue_translation": _NULLABLE_STR,
+            "speaker": _NULLABLE_STR,
+        },
+        "required": ["id", "type", "scene_description", "mood"],
+    },
+}
+DIALOGUE_PANEL_ARRAY_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            **_PANEL_COMMON_PROPS,
+            "dialogue_indices": {"type": "array", "items": {"type": "integer"}},
+            "speaker_focus": _NULLABLE_STR,
+        },
+        "required": ["id", "type", "scene_description", "mood"],
+    },
+}
+_DIALOGUE_BATCH_SCHEMA = {"type": "object", "additionalProperties": DIALOGUE_PANEL_ARRAY_SCHEMA}
+
+
+def _parse_effects(raw_effects) -> list[VisualEffect]:
+    return [
+        _EFFECT_MAP[e]
+        for e in (str(x).lower().replace(" ", "_") for x in raw_effects)
+        if e in _EFFECT_MAP
+    ]
+
+
+# Static instructions go out as the system message so they form a byte-identical
+# prefix on every call (provider-side prompt caching keys on that prefix). Anything
+# that varies per request - panel limits, language, the narrative - belongs in
+# the user payload that follows.
+_STORY_SYSTEM_PROMPT = """You are a manga/webtoon storyboard artist. Convert the narrative you are given into a visual panel sequence.
 
 OUTPUT FORMAT:
 Return a JSON array of panels. Each panel should have:
@@ -58,14 +111,14 @@ Return a JSON array of panels. Each panel should have:
 - "scene_description": detailed visual description for image generation (30-50 words)
 - "mood": one of "warm", "cold", "tense", "peaceful", "mysterious", "dramatic", "hopeful"
 - "effects": array of effects like "speed_lines", "impact_burst", "vignette", "rain", "frozen", "particles"
-- "dialogue": the spoken line (in {target_language} if applicable), or null
+- "dialogue": the spoken line (in the target language if applicable), or null
 - "dialogue_translation": English translation if dialogue is in another language, or null
 - "speaker": who is speaking ("narrator", "bimbo", "npc", "player"), or null
 - "character_expression": emotion shown ("angry", "surprised", "suspicious", "warm", "scared"), or null
 - "duration_ms": how long to show (1000-5000, shorter for action, longer for dialogue)
 
 GUIDELINES:
-- Create {max_panels} or fewer panels
+- Stay within the panel limit given with the narrative
 - Start with establishing shots, then move to details
 - Use "impact" type for dramatic moments (blade, revelation)
 - Use "wide" for establishing shots and environment
@@ -79,33 +132,355 @@ GUIDELINES:
 
 Return ONLY valid JSON array, no markdown, no explanation."""
 
+_TRANSCRIPT_SYSTEM_PROMPT = """You are a manga/webtoon storyboard artist. Convert the dialogue transcript you are given into visual panels.
+
+Create a visual sequence that:
+1. Shows the setting and characters
+2. Captures key emotional moments
+3. Visualizes the dialogue flow
+4. Uses panel variety (wide for setting, impact for key moments)
+
+OUTPUT: Return ONLY a JSON array of panels with these fields:
+- "id", "type", "scene_description", "mood", "effects", "dialogue", "dialogue_translation", "speaker", "character_expression", "duration_ms"
+
+Stay within the panel limit given with the transcript. No markdown, just JSON."""
+
+_SCENARIO_SYSTEM_PROMPT = """Convert the language learning scenario you are given into manga/webtoon panels.
+
+Create 3-5 panels that:
+1. Establish the setting (wide shot)
+2. Show the NPC speaking
+3. Create tension/engagement for the player's response
+
+OUTPUT: JSON array of panels with: id, type, scene_description, mood, effects, dialogue, dialogue_translation, speaker, character_expression, duration_ms
+
+No markdown, just JSON."""
+
+_AESTHETIC_GUIDES = {
+    "holographic": """Aesthetic: HOLOGRAPHIC (Tutorial/Future Setting)
+- Blue/purple color palette, futuristic feel
+- Soft glows, particle effects, clean lines
+- Safe, simulation-like atmosphere
+- Bimbo appears as a friendly glowing orb""",
+    "cinematic": """Aesthetic: CINEMATIC (Main Story/Historical)
+- Earth tones, dramatic lighting, film grain feel
+- High tension, real stakes
+- Characters are solid, no holographic shimmer
+- Use vignette and rain effects for drama""",
+}
+
+_DIALOGUE_SYSTEM_PROMPT = """You are a visual storytelling expert. Convert the dialogue sequence you are given into manga/webtoon panel descriptions.
+
+{aesthetic_guide}
+
+Generate panel descriptions for the dialogue. Consider:
+1. Not every line needs its own panel - group related lines
+2. Add establishing shots before dialogue starts
+3. Create close-ups for emotional moments
+4. Transition panels for scene changes
+5. Match mood to speaker sentiment
+
+OUTPUT: Return a JSON array of panels with:
+- "id": unique identifier
+- "type": "full" | "wide" | "tall" | "impact" | "transition"
+- "scene_description": 30-50 word visual description for image generation
+- "mood": "warm" | "cold" | "tense" | "peaceful" | "mysterious" | "dramatic" | "hopeful"
+- "effects": array of "speed_lines" | "impact_burst" | "vignette" | "rain" | "frozen" | "particles"
+- "dialogue_indices": which dialogue line numbers (1-indexed) this panel covers
+- "speaker_focus": which speaker is featured (or "environment" for establishing)
+- "character_expression": emotion shown if character visible
+- "duration_ms": display time (2000-5000, longer for dialogue)
+
+Generate 3-8 panels. Return ONLY valid JSON, no markdown."""
+
+
+@lru_cache(maxsize=None)
+def _dialogue_system_prompt(aesthetic: str) -> str:
+    """Static dialogue-storyboard instructions for one aesthetic (built once)."""
+    guide = _AESTHETIC_GUIDES["holographic" if aesthetic == "holographic" else "cinematic"]
+    return _DIALOGUE_SYSTEM_PROMPT.format(aesthetic_guide=guide)
+
+
+# Replies are cached in-process by prompt digest so replaying the same scene
+# (bulk replays, the same scenario requested twice) skips the LLM round-trip.
+RESPONSE_CACHE_TTL_S = 3600.0
+RESPONSE_CACHE_MAX = 256
+_response_cache: dict[str, tuple[float, str]] = {}
+_response_cache_lock = threading.Lock()
+
+
+def _stable_id(text: str) -> str:
+    """48-bit content digest for sequence ids; unlike hash(), stable across processes."""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=6).hexdigest()
+
+
+def _cache_key(system_prompt: str, payload: str) -> str:
+    return hashlib.sha256(f"{system_prompt}\0{payload}".encode("utf-8")).hexdigest()
+
+
+def _cached_reply(key: str) -> Optional[str]:
+    with _response_cache_lock:
+        hit = _response_cache.get(key)
+        if hit is None:
+            return None
+        stored_at, raw = hit
+        if time.monotonic() - stored_at > RESPONSE_CACHE_TTL_S:
+            del _response_cache[key]
+            return None
+        return raw
+
+
+def _store_reply(key: str, raw: str) -> None:
+    with _response_cache_lock:
+        _response_cache.pop(key, None)
+        while len(_response_cache) >= RESPONSE_CACHE_MAX:
+            # Dicts keep insertion order, so the first key is the oldest entry
+            del _response_cache[next(iter(_response_cache))]
+        _response_cache[key] = (time.monotonic(), raw)
+
+
+def clear_response_cache() -> None:
+    """Drop all cached LLM replies."""
+    with _response_cache_lock:
+        _response_cache.clear()
+
+
+_DIALOGUE_BATCH_SUFFIX = """
+
+BATCH MODE: The request contains several dialogue sequences, each under its own DIALOGUE KEY header, with line numbers starting at 1 per sequence. Return ONE JSON object mapping every dialogue key to its JSON array of panels, e.g. {"key_a": [...], "key_b": [...]}. Return ONLY valid JSON, no markdown."""
+
+
+@lru_cache(maxsize=None)
+def _dialogue_batch_system_prompt(aesthetic: str) -> str:
+    """Static instructions for `adapt_dialogues_batch` (single-sequence prompt plus batch rules)."""
+    return _dialogue_system_prompt(aesthetic) + _DIALOGUE_BATCH_SUFFIX
+
+
+def _complete(system_prompt: str, payload: str, schema: dict, *, cache: bool = True) -> str:
+    """Send static instructions plus the per-request payload; Gemini first, then OpenAI.
+
+    Gemini runs in JSON mode constrained by `schema`; the OpenAI fallback
+    relies on the prompt and the tolerant parsers below.
+    """
+    key = _cache_key(system_prompt, payload) if cache else None
+    if key is not None:
+        raw = _cached_reply(key)
+        if raw is not None:
+            return raw
+    messages = [SystemMessage(content=system_prompt), HumanMessage(content=payload)]
+    raw = providers.invoke_with_fallback(
+        messages, response_mime_type="application/json", response_schema=schema
+    )
+    # Replies without a JSON array parse to the fallback panels; don't pin those
+    if key is not None and "[" in raw:
+        _store_reply(key, raw)
+    return raw
+
+
+@dataclass(frozen=True, slots=True)
+class _AdapterSpec:
+    """What differs between storyboard adapters; `_run` does the rest.
+
+    Each callable receives the adapter's keyword arguments and ignores the
+    ones it doesn't need.
+    """
+    system_prompt: Callable[..., str]
+    payload: Callable[..., str]
+    parse: Callable[..., List[Panel]]  # (raw, art_style, **args)
+    seq_id: Callable[..., str]
+    title: Callable[..., str]
+    schema: dict = field(default_factory=lambda: PANEL_ARRAY_SCHEMA)
+
+
+def _run(spec: _AdapterSpec, *, art_style: ArtStyle, cache: bool = True, **args: Any) -> VisualSequence:
+    """Prompt, call the LLM (cached, with fallback), parse and wrap as a sequence."""
+    raw = _complete(spec.system_prompt(**args), spec.payload(**args), spec.schema, cache=cache)
+    return VisualSequence(
+        id=spec.seq_id(**args),
+        title=spec.title(**args),
+        panels=spec.parse(raw, art_style, **args),
+        default_style=art_style,
+    )
+
+
+def _aesthetic_style(aesthetic: str) -> ArtStyle:
+    return ArtStyle.MANHWA if aesthetic == "holographic" else ArtStyle.DRAMATIC
+
+
+def _dialogue_title(dialogue_key: str) -> str:
+    return dialogue_key.replace("_", " ").title()
+
+
+def _story_payload(narrative: str, target_language: str, max_panels: int, **_: Any) -> str:
+    return f"""Create {max_panels} or fewer panels.
+Target language for dialogue: {target_language}
+
+NARRATIVE:
+{narrative}"""
+
+
+def _transcript_payload(transcript: str, speaker_map: Optional[dict], max_panels: int, **_: Any) -> str:
+    speaker_info = ""
+    if speaker_map:
+        speaker_info = f"\nSpeaker mapping: {json.dumps(speaker_map)}"
+
+    return f"""Maximum {max_panels} panels.
+
+TRANSCRIPT:
+{transcript}
+{speaker_info}"""
+
+
+def _scenario_payload(scenario: dict, include_options: bool, **_: Any) -> str:
+    options = scenario.get("options", []) if include_options else []
+    return f"""SCENARIO:
+Setting: {scenario.get("setting", "")}
+Description: {scenario.get("description", "")}
+NPC says (Japanese): {scenario.get("character_dialogue_jp", "")}
+NPC says (English): {scenario.get("character_dialogue_en", "")}
+Player options: {json.dumps([o.get('text', '') for o in options])}"""
+
+
+def _dialogue_payload(
+    dialogue_key: str,
+    dialogue_lines: List[dict],
+    story_context: str,
+    existing_panels: Optional[dict],
+    **_: Any,
+) -> str:
+    return f"""DIALOGUE KEY: {dialogue_key}
+
+STORY CONTEXT:
+{story_context}
+
+DIALOGUE LINES:
+{_format_dialogue_lines(dialogue_lines)}
+{_format_existing_panels(existing_panels)}"""
+
+
+_STORY_SPEC = _AdapterSpec(
+    system_prompt=lambda **_: _STORY_SYSTEM_PROMPT,
+    payload=_story_payload,
+    parse=lambda raw, style, **_: _parse_panels_json(raw, style),
+    seq_id=lambda narrative, **_: f"seq_{_stable_id(narrative)}",
+    title=lambda title, **_: title,
+)
+_TRANSCRIPT_SPEC = _AdapterSpec(
+    system_prompt=lambda **_: _TRANSCRIPT_SYSTEM_PROMPT,
+    payload=_transcript_payload,
+    parse=lambda raw, style, **_: _parse_panels_json(raw, style),
+    seq_id=lambda transcript, **_: f"transcript_{_stable_id(transcript)}",
+    title=lambda **_: "Dialogue Scene",
+)
+_SCENARIO_SPEC = _AdapterSpec(
+    system_prompt=lambda **_: _SCENARIO_SYSTEM_PROMPT,
+    payload=_scenario_payload,
+    parse=lambda raw, style, **_: _parse_panels_json(raw, style),
+    seq_id=lambda scenario, **_: f"scenario_{scenario.get('id', 0)}",
+    title=lambda scenario, **_: (scenario.get("description") or "")[:50] or "Scene",
+)
+_DIALOGUE_SPEC = _AdapterSpec(
+    system_prompt=lambda aesthetic, **_: _dialogue_system_prompt(aesthetic),
+    payload=_dialogue_payload,
+    parse=lambda raw, style, dialogue_lines, **_: _parse_dialogue_panels_json(raw, style, dialogue_lines),
+    seq_id=lambda dialogue_key, **_: f"dialogue_{dialogue_key}",
+    title=lambda dialogue_key, **_: _dialogue_title(dialogue_key),
+    schema=DIALOGUE_PANEL_ARRAY_SCHEMA,
+)
+
+
+def _stream_reply(system_prompt: str, payload: str) -> Iterator[str]:
+    """Reply text chunks from Gemini's stream, or OpenAI's if Gemini can't start one."""
+    messages = [SystemMessage(content=system_prompt), HumanMessage(content=payload)]
     try:
-        # Try Gemini first
-        response, _ = providers.invoke_google([
-            HumanMessage(content=[{"type": "text", "text": prompt}])
-        ])
-        raw = str(getattr(response, "content", response))
+        chunks, _ = providers.invoke_google_stream(messages)
     except Exception:
-        # Fallback to OpenAI
-        raw = providers.openai_chat([HumanMessage(content=prompt)])
+        chunks = providers.openai_chat_stream(messages)
+    return chunks
 
-    # Parse JSON response
-    panels = _parse_panels_json(raw, art_style)
 
+def stream_panels(
+    narrative: str,
+    *,
+    art_style: ArtStyle = ArtStyle.MANHWA,
+    target_language: str = "Japanese",
+    max_panels: int = 12,
+) -> Iterator[Panel]:
+    """Yield panels for a narrative as the LLM streams them.
+
+    Each Panel is yielded as soon as its JSON object closes, so image
+    generation for the first panels can start while later ones are still
+    being written. Streamed replies bypass the response cache.
+    """
+    payload = _story_payload(narrative, target_language, max_panels)
+    yield from _parse_panels_stream(_stream_reply(_STORY_SYSTEM_PROMPT, payload), art_style)
+
+
+def collect_panels(
+    narrative: str,
+    *,
+    title: str = "Scene",
+    art_style: ArtStyle = ArtStyle.MANHWA,
+    target_language: str = "Japanese",
+    max_panels: int = 12,
+) -> VisualSequence:
+    """Buffered `stream_panels`; same result shape as `adapt_story_to_panels`."""
+    panels = list(stream_panels(
+        narrative,
+        art_style=art_style,
+        target_language=target_language,
+        max_panels=max_panels,
+    ))
     return VisualSequence(
-        id=f"seq_{hash(narrative) % 10000:04d}",
+        id=f"seq_{_stable_id(narrative)}",
         title=title,
-        panels=panels,
+        panels=panels or [_fallback_panel(art_style)],
         default_style=art_style,
     )
 
 
+def adapt_story_to_panels(
+    narrative: str,
+    *,
+    title: str = "Scene",
+    art_style: ArtStyle = ArtStyle.MANHWA,
+    target_language: str = "Japanese",
+    max_panels: int = 12,
+    include_dialogue: bool = True,
+    cache: bool = True,
+) -> VisualSequence:
+    """Convert a narrative text into a visual panel sequence.
+
+    Args:
+        narrative: The story text, transcript, or scene description
+        title: Title for this sequence
+        art_style: Default art style for panels
+        target_language: The language being learned (for dialogue)
+        max_panels: Maximum number of panels to generate
+        include_dialogue: Whether to extract/generate dialogue
+        cache: Reuse a recent reply for an identical request
+
+    Returns:
+        VisualSequence with panels ready for image generation
+    """
+    return _run(
+        _STORY_SPEC,
+        art_style=art_style,
+        cache=cache,
+        narrative=narrative,
+        title=title,
+        target_language=target_language,
+        max_panels=max_panels,
+    )
+
+
 def adapt_transcript_to_panels(
     transcript: str,
     *,
     speaker_map: Optional[dict] = None,
     art_style: ArtStyle = ArtStyle.MANHWA,
     max_panels: int = 15,
+    cache: bool = True,
 ) -> VisualSequence:
     """Convert a dialogue transcript into visual panels.
 
@@ -114,46 +489,18 @@ def adapt_transcript_to_panels(
         speaker_map: Map speaker names to character types {"Speaker 1": "samurai"}
         art_style: Default art style
         max_panels: Maximum panels
+        cache: Reuse a recent reply for an identical request
 
     Returns:
         VisualSequence
     """
-    speaker_info = ""
-    if speaker_map:
-        speaker_info = f"\nSpeaker mapping: {json.dumps(speaker_map)}"
-
-    prompt = f"""You are a manga/webtoon storyboard artist. Convert this dialogue transcript into visual panels.
-
-TRANSCRIPT:
-{transcript}
-{speaker_info}
-
-Create a visual sequence that:
-1. Shows the setting and characters
-2. Captures key emotional moments
-3. Visualizes the dialogue flow
-4. Uses panel variety (wide for setting, impact for key moments)
-
-OUTPUT: Return ONLY a JSON array of panels with these fields:
-- "id", "type", "scene_description", "mood", "effects", "dialogue", "dialogue_translation", "speaker", "character_expression", "duration_ms"
-
-Maximum {max_panels} panels. No markdown, just JSON."""
-
-    try:
-        response, _ = providers.invoke_google([
-            HumanMessage(content=[{"type": "text", "text": prompt}])
-        ])
-        raw = str(getattr(response, "content", response))
-    except Exception:
-        raw = providers.openai_chat([HumanMessage(content=prompt)])
-
-    panels = _parse_panels_json(raw, art_style)
-
-    return VisualSequence(
-        id=f"transcript_{hash(transcript) % 10000:04d}",
-        title="Dialogue Scene",
-        panels=panels,
-        default_style=art_style,
+    return _run(
+        _TRANSCRIPT_SPEC,
+        art_style=art_style,
+        cache=cache,
+        transcript=transcript,
+        speaker_map=speaker_map,
+        max_panels=max_panels,
     )
 
 
@@ -162,6 +509,7 @@ def adapt_scenario_to_panels(
     *,
     art_style: ArtStyle = ArtStyle.MANHWA,
     include_options: bool = True,
+    cache: bool = True,
 ) -> VisualSequence:
     """Convert a game scenario into visual panels.
 
@@ -169,116 +517,137 @@ def adapt_scenario_to_panels(
         scenario: Scenario dict with description, dialogue, options
         art_style: Art style
         include_options: Whether to show dialogue options
+        cache: Reuse a recent reply for an identical request
 
     Returns:
         VisualSequence for the scenario
     """
-    setting = scenario.get("setting", "")
-    description = scenario.get("description", "")
-    dialogue_jp = scenario.get("character_dialogue_jp", "")
-    dialogue_en = scenario.get("character_dialogue_en", "")
-    options = scenario.get("options", []) if include_options else []
+    return _run(
+        _SCENARIO_SPEC,
+        art_style=art_style,
+        cache=cache,
+        scenario=scenario,
+        include_options=include_options,
+    )
 
-    prompt = f"""Convert this language learning scenario into manga/webtoon panels.
 
-SCENARIO:
-Setting: {setting}
-Description: {description}
-NPC says (Japanese): {dialogue_jp}
-NPC says (English): {dialogue_en}
-Player options: {json.dumps([o.get('text', '') for o in options])}
+# Bounds how many storyboard calls the async variants keep in flight at once
+PROVIDER_CONCURRENCY = 8
+# One semaphore per event loop: an asyncio.Semaphore binds to the loop that first waits on it
+_provider_slots: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
 
-Create 3-5 panels that:
-1. Establish the setting (wide shot)
-2. Show the NPC speaking
-3. Create tension/engagement for the player's response
 
-OUTPUT: JSON array of panels with: id, type, scene_description, mood, effects, dialogue, dialogue_translation, speaker, character_expression, duration_ms
+def _loop_slots() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    slots = _provider_slots.get(loop)
+    if slots is None:
+        slots = _provider_slots[loop] = asyncio.Semaphore(PROVIDER_CONCURRENCY)
+    return slots
+
+
+async def _run_bounded(fn, *args, **kwargs) -> VisualSequence:
+    async with _loop_slots():
+        return await asyncio.to_thread(fn, *args, **kwargs)
+
+
+async def aadapt_story_to_panels(narrative: str, **kwargs) -> VisualSequence:
+    """Async `adapt_story_to_panels`; overlap several with `asyncio.gather`."""
+    return await _run_bounded(adapt_story_to_panels, narrative, **kwargs)
+
+
+async def aadapt_transcript_to_panels(transcript: str, **kwargs) -> VisualSequence:
+    """Async `adapt_transcript_to_panels`."""
+    return await _run_bounded(adapt_transcript_to_panels, transcript, **kwargs)
+
+
+async def aadapt_scenario_to_panels(scenario: dict, **kwargs) -> VisualSequence:
+    """Async `adapt_scenario_to_panels`."""
+    return await _run_bounded(adapt_scenario_to_panels, scenario, **kwargs)
 
-No markdown, just JSON."""
 
+async def aadapt_dialogue_to_panels(dialogue_key: str, dialogue_lines: List[dict], **kwargs) -> VisualSequence:
+    """Async `adapt_dialogue_to_panels`."""
+    return await _run_bounded(adapt_dialogue_to_panels, dialogue_key, dialogue_lines, **kwargs)
+
+
+def _load_panel_items(raw: str) -> Optional[Any]:
+    """Decode the first JSON array in an LLM reply (or the whole reply); None if unparseable."""
+    # JSON-mode replies are a bare array; only scan for one when that fails
     try:
-        response, _ = providers.invoke_google([
-            HumanMessage(content=[{"type": "text", "text": prompt}])
-        ])
-        raw = str(getattr(response, "content", response))
-    except Exception:
-        raw = providers.openai_chat([HumanMessage(content=prompt)])
+        data = llm_json.loads(raw)
+        if isinstance(data, list):
+            return data
+    except ValueError:
+        pass
+    try:
+        return llm_json.loads(llm_json.find_json_array(raw) or raw)
+    except ValueError:
+        return None
 
-    panels = _parse_panels_json(raw, art_style)
 
-    return VisualSequence(
-        id=f"scenario_{scenario.get('id', 0)}",
-        title=description[:50] if description else "Scene",
-        panels=panels,
-        default_style=art_style,
+def _load_panel_object(raw: str) -> Optional[dict]:
+    """Decode the JSON object in a batched reply; None if there isn't a parseable one."""
+    try:
+        data = llm_json.loads(raw)
+        if isinstance(data, dict):
+            return data
+    except ValueError:
+        pass
+    start, end = raw.find("{"), raw.rfind("}")
+    if start < 0 or end < start:
+        return None
+    try:
+        data = llm_json.loads(raw[start:end + 1])
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _panel_from_item(i: int, item: dict, default_style: ArtStyle) -> Panel:
+    """Build a Panel from one decoded storyboard item."""
+    return Panel(
+        id=item.get("id", f"panel_{i}"),
+        type=_PANEL_TYPE_MAP.get(str(item.get("type", "full")).lower(), PanelType.FULL),
+        scene_description=item.get("scene_description", ""),
+        dialogue=item.get("dialogue"),
+        dialogue_translation=item.get("dialogue_translation"),
+        speaker=item.get("speaker"),
+        art_style=default_style,
+        mood=_MOOD_MAP.get(str(item.get("mood", "warm")).lower(), Mood.WARM),
+        effects=_parse_effects(item.get("effects", [])),
+        character_expression=item.get("character_expression"),
+        duration_ms=int(item.get("duration_ms", 3000)),
+    )
+
+
+def _fallback_panel(default_style: ArtStyle) -> Panel:
+    """Single generic panel used when a reply has no usable panels."""
+    return Panel(
+        id="panel_fallback",
+        type=PanelType.FULL,
+        scene_description="Scene from the narrative",
+        art_style=default_style,
     )
 
 
 def _parse_panels_json(raw: str, default_style: ArtStyle) -> List[Panel]:
     """Parse LLM response into Panel objects."""
-    # Extract JSON array
-    try:
-        # Find JSON array in response
-        match = re.search(r'\[.*\]', raw, re.DOTALL)
-        if match:
-            data = json.loads(match.group(0))
-        else:
-            data = json.loads(raw)
-    except json.JSONDecodeError:
-        # Fallback: create a single default panel
-        return [Panel(
-            id="panel_fallback",
-            type=PanelType.FULL,
-            scene_description="Scene from the narrative",
-            art_style=default_style,
-        )]
-
-    panels = []
-    for i, item in enumerate(data):
-        if not isinstance(item, dict):
-            continue
+    data = _load_panel_items(raw)
+    if data is None:
+        return [_fallback_panel(default_style)]
 
-        # Parse panel type
-        panel_type = PanelType.FULL
-        type_str = str(item.get("type", "full")).lower()
-        try:
-            panel_type = PanelType(type_str)
-        except ValueError:
-            pass
-
-        # Parse mood
-        mood = Mood.WARM
-        mood_str = str(item.get("mood", "warm")).lower()
-        try:
-            mood = Mood(mood_str)
-        except ValueError:
-            pass
-
-        # Parse effects
-        effects = []
-        for eff in item.get("effects", []):
-            eff_str = str(eff).lower().replace(" ", "_")
-            try:
-                effects.append(VisualEffect(eff_str))
-            except ValueError:
-                pass
+    return [
+        _panel_from_item(i, item, default_style)
+        for i, item in enumerate(data)
+        if isinstance(item, dict)
+    ]
 
-        panels.append(Panel(
-            id=item.get("id", f"panel_{i}"),
-            type=panel_type,
-            scene_description=item.get("scene_description", ""),
-            dialogue=item.get("dialogue"),
-            dialogue_translation=item.get("dialogue_translation"),
-            speaker=item.get("speaker"),
-            art_style=default_style,
-            mood=mood,
-            effects=effects,
-            character_expression=item.get("character_expression"),
-            duration_ms=int(item.get("duration_ms", 3000)),
-        ))
 
-    return panels
+def _parse_panels_stream(chunks: Iterable[str], default_style: ArtStyle) -> Iterator[Panel]:
+    """Yield Panels from a streamed LLM reply as each array element completes."""
+    for i, item in enumerate(llm_json.iter_json_array_items(chunks)):
+        if isinstance(item, dict):
+            yield _panel_from_item(i, item, default_style)
 
 
 def sequence_to_dict(sequence: VisualSequence) -> dict:
@@ -310,6 +679,27 @@ def sequence_to_dict(sequence: VisualSequence) -> dict:
     }
 
 
+def _format_dialogue_lines(dialogue_lines: List[dict]) -> str:
+    """Numbered dialogue lines with translation and mood hints for the LLM."""
+    return "\n".join(
+        f"{i+1}. [{line.get('speaker', 'unknown')}] {line.get('text', '')}"
+        + (f" (Translation hint: {line['sub']})" if line.get("sub") else "")
+        + (f" [mood: {line['sentiment']}]" if line.get("sentiment") else "")
+        for i, line in enumerate(dialogue_lines)
+    )
+
+
+def _format_existing_panels(existing_panels: Optional[dict]) -> str:
+    """Pre-defined panel listing the LLM may reference (empty when there are none)."""
+    if not existing_panels:
+        return ""
+    panel_descs = "\n".join(
+        f"- {pid}: {pdata.get('scene_description', '')} (mood: {pdata.get('mood', '')})"
+        for pid, pdata in existing_panels.items()
+    )
+    return f"\n\nAvailable pre-defined panels (you can reference these):\n{panel_descs}"
+
+
 def adapt_dialogue_to_panels(
     dialogue_key: str,
     dialogue_lines: List[dict],
@@ -317,6 +707,7 @@ def adapt_dialogue_to_panels(
     story_context: str = "",
     aesthetic: str = "holographic",
     existing_panels: Optional[dict] = None,
+    cache: bool = True,
 ) -> VisualSequence:
     """Convert story dialogue lines into visual panels.
 
@@ -329,145 +720,102 @@ def adapt_dialogue_to_panels(
         story_context: Additional context about the story/setting
         aesthetic: "holographic" (tutorial) or "cinematic" (main story)
         existing_panels: Optional dict of pre-defined panels to reference
+        cache: Reuse a recent reply for an identical request
 
     Returns:
         VisualSequence with panels for each dialogue beat
     """
-    # Build art style from aesthetic
-    art_style = ArtStyle.MANHWA if aesthetic == "holographic" else ArtStyle.DRAMATIC
-
-    # Build dialogue text for LLM
-    dialogue_text = []
-    for i, line in enumerate(dialogue_lines):
-        speaker = line.get("speaker", "unknown")
-        text = line.get("text", "")
-        sentiment = line.get("sentiment", "")
-        sub = line.get("sub", "")
-
-        entry = f"{i+1}. [{speaker}] {text}"
-        if sub:
-            entry += f" (Translation hint: {sub})"
-        if sentiment:
-            entry += f" [mood: {sentiment}]"
-        dialogue_text.append(entry)
-
-    dialogue_str = "\n".join(dialogue_text)
-
-    # Include existing panel info if available
-    existing_info = ""
-    if existing_panels:
-        panel_descs = []
-        for pid, pdata in existing_panels.items():
-            desc = pdata.get("scene_description", "")
-            mood = pdata.get("mood", "")
-            panel_descs.append(f"- {pid}: {desc} (mood: {mood})")
-        existing_info = f"\n\nAvailable pre-defined panels (you can reference these):\n" + "\n".join(panel_descs)
-
-    # Aesthetic-specific guidance
-    if aesthetic == "holographic":
-        aesthetic_guide = """
-Aesthetic: HOLOGRAPHIC (Tutorial/Future Setting)
-- Blue/purple color palette, futuristic feel
-- Soft glows, particle effects, clean lines
-- Safe, simulation-like atmosphere
-- Bimbo appears as a friendly glowing orb"""
-    else:
-        aesthetic_guide = """
-Aesthetic: CINEMATIC (Main Story/Historical)
-- Earth tones, dramatic lighting, film grain feel
-- High tension, real stakes
-- Characters are solid, no holographic shimmer
-- Use vignette and rain effects for drama"""
-
-    prompt = f"""You are a visual storytelling expert. Convert this dialogue sequence into manga/webtoon panel descriptions.
-
-DIALOGUE KEY: {dialogue_key}
-{aesthetic_guide}
-
-STORY CONTEXT:
-{story_context}
-
-DIALOGUE LINES:
-{dialogue_str}
-{existing_info}
+    return _run(
+        _DIALOGUE_SPEC,
+        art_style=_aesthetic_style(aesthetic),
+        cache=cache,
+        dialogue_key=dialogue_key,
+        dialogue_lines=dialogue_lines,
+        story_context=story_context,
+        aesthetic=aesthetic,
+        existing_panels=existing_panels,
+    )
 
-Generate panel descriptions for this dialogue. Consider:
-1. Not every line needs its own panel - group related lines
-2. Add establishing shots before dialogue starts
-3. Create close-ups for emotional moments
-4. Transition panels for scene changes
-5. Match mood to speaker sentiment
 
-OUTPUT: Return a JSON array of panels with:
-- "id": unique identifier
-- "type": "full" | "wide" | "tall" | "impact" | "transition"
-- "scene_description": 30-50 word visual description for image generation
-- "mood": "warm" | "cold" | "tense" | "peaceful" | "mysterious" | "dramatic" | "hopeful"
-- "effects": array of "speed_lines" | "impact_burst" | "vignette" | "rain" | "frozen" | "particles"
-- "dialogue_indices": which dialogue line numbers (1-indexed) this panel covers
-- "speaker_focus": which speaker is featured (or "environment" for establishing)
-- "character_expression": emotion shown if character visible
-- "duration_ms": display time (2000-5000, longer for dialogue)
+def adapt_dialogues_batch(
+    items: List[Tuple[str, List[dict]]],
+    *,
+    story_context: str = "",
+    aesthetic: str = "holographic",
+    existing_panels: Optional[dict] = None,
+    cache: bool = True,
+) -> Dict[str, VisualSequence]:
+    """Convert several dialogue sequences into panels with a single LLM call.
 
-Generate 3-8 panels. Return ONLY valid JSON, no markdown."""
+    The reply is expected as one JSON object keyed by dialogue key. Keys the
+    reply leaves out (or the whole batch, if the reply can't be parsed) fall
+    back to `adapt_dialogue_to_panels`.
 
-    try:
-        response, _ = providers.invoke_google([
-            HumanMessage(content=[{"type": "text", "text": prompt}])
-        ])
-        raw = str(getattr(response, "content", response))
-    except Exception:
-        raw = providers.openai_chat([HumanMessage(content=prompt)])
+    Args:
+        items: (dialogue_key, dialogue_lines) pairs sharing one aesthetic
+        story_context: Additional context about the story/setting
+        aesthetic: "holographic" (tutorial) or "cinematic" (main story)
+        existing_panels: Optional dict of pre-defined panels to reference
+        cache: Reuse a recent reply for an identical request
 
-    panels = _parse_dialogue_panels_json(raw, art_style, dialogue_lines)
+    Returns:
+        {dialogue_key: VisualSequence} in the order of `items`
+    """
+    if not items:
+        return {}
+    art_style = _aesthetic_style(aesthetic)
 
-    return VisualSequence(
-        id=f"dialogue_{dialogue_key}",
-        title=dialogue_key.replace("_", " ").title(),
-        panels=panels,
-        default_style=art_style,
+    blocks = "\n\n".join(
+        f"DIALOGUE KEY: {key}\nDIALOGUE LINES:\n{_format_dialogue_lines(lines)}"
+        for key, lines in items
     )
+    payload = f"""STORY CONTEXT:
+{story_context}
+{_format_existing_panels(existing_panels)}
+
+{blocks}"""
+
+    raw = _complete(_dialogue_batch_system_prompt(aesthetic), payload, _DIALOGUE_BATCH_SCHEMA, cache=cache)
+    data = _load_panel_object(raw)
+
+    out: Dict[str, VisualSequence] = {}
+    for key, lines in items:
+        panel_items = data.get(key) if data else None
+        if not isinstance(panel_items, list):
+            out[key] = adapt_dialogue_to_panels(
+                key,
+                lines,
+                story_context=story_context,
+                aesthetic=aesthetic,
+                existing_panels=existing_panels,
+                cache=cache,
+            )
+            continue
+        out[key] = VisualSequence(
+            id=f"dialogue_{key}",
+            title=_dialogue_title(key),
+            panels=_dialogue_panels_from_items(panel_items, art_style, lines),
+            default_style=art_style,
+        )
+    return out
 
 
 def _parse_dialogue_panels_json(raw: str, default_style: ArtStyle, dialogue_lines: List[dict]) -> List[Panel]:
     """Parse LLM response for dialogue panels."""
-    try:
-        match = re.search(r'\[.*\]', raw, re.DOTALL)
-        if match:
-            data = json.loads(match.group(0))
-        else:
-            data = json.loads(raw)
-    except json.JSONDecodeError:
+    data = _load_panel_items(raw)
+    if data is None:
         # Fallback: create one panel per speaker change
         return _generate_fallback_panels(dialogue_lines, default_style)
+    return _dialogue_panels_from_items(data, default_style, dialogue_lines)
+
 
+def _dialogue_panels_from_items(data: Iterable[Any], default_style: ArtStyle, dialogue_lines: List[dict]) -> List[Panel]:
+    """Build Panels from decoded dialogue-storyboard items."""
     panels = []
     for i, item in enumerate(data):
         if not isinstance(item, dict):
             continue
 
-        panel_type = PanelType.FULL
-        type_str = str(item.get("type", "full")).lower()
-        try:
-            panel_type = PanelType(type_str)
-        except ValueError:
-            pass
-
-        mood = Mood.WARM
-        mood_str = str(item.get("mood", "warm")).lower()
-        try:
-            mood = Mood(mood_str)
-        except ValueError:
-            pass
-
-        effects = []
-        for eff in item.get("effects", []):
-            eff_str = str(eff).lower().replace(" ", "_")
-            try:
-                effects.append(VisualEffect(eff_str))
-            except ValueError:
-                pass
-
         # Extract dialogue for this panel based on indices
         dialogue_indices = item.get("dialogue_indices", [])
         dialogue_text = None
@@ -486,14 +834,14 @@ def _parse_dialogue_panels_json(raw: str, default_style: ArtStyle, dialogue_line
 
         panels.append(Panel(
             id=item.get("id", f"panel_{i}"),
-            type=panel_type,
+            type=_PANEL_TYPE_MAP.get(str(item.get("type", "full")).lower(), PanelType.FULL),
             scene_description=item.get("scene_description", ""),
             dialogue=dialogue_text,
             dialogue_translation=dialogue_translation,
             speaker=speaker,
             art_style=default_style,
-            mood=mood,
-            effects=effects,
+            mood=_MOOD_MAP.get(str(item.get("mood", "warm")).lower(), Mood.WARM),
+            effects=_parse_effects(item.get("effects", [])),
             character_expression=item.get("character_expression"),
             duration_ms=int(item.get("duration_ms", 3000)),
         ))
@@ -512,12 +860,6 @@ def _generate_fallback_panels(dialogue_lines: List[dict], default_style: ArtStyl
 
         # Create panel on speaker change or every 2 lines
         if speaker != prev_speaker or i % 2 == 0:
-            mood = Mood.WARM
-            if speaker == "samurai":
-                mood = Mood.TENSE
-            elif speaker == "narration":
-                mood = Mood.MYSTERIOUS
-
             panels.append(Panel(
                 id=f"panel_{i}",
                 type=PanelType.FULL,
@@ -526,7 +868,7 @@ def _generate_fallback_panels(dialogue_lines: List[dict], default_style: ArtStyl
                 dialogue_translation=line.get("sub"),
                 speaker=speaker,
                 art_style=default_style,
-                mood=mood,
+                mood=_SPEAKER_FALLBACK_MOOD.get(speaker, Mood.WARM),
                 duration_ms=3000,
             ))
 
@@ -0,0 +1,239 @@
+"""
+Story Types - Character, location and panel definitions shared by story manifests,
+plus the reference-file lookup they all use.
+
+Kept free of story data so manifests (story_shogun.py, story_template.py) and
+the panel tooling (story_manifest.py) can import them without cycles.
+"""
+
+import asyncio
+import hashlib
+import os
+import sys
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+# Fixed text around each description in reference-image prompts
+_CHARACTER_PROMPT_PRE = "Manhwa/Korean webtoon style character portrait.\n\n"
+_CHARACTER_PROMPT_POST = """
+
+Portrait shot, shoulders up, facing camera.
+Clean background. Professional character design reference quality.
+Expressive manhwa style, clean linework, soft cel-shading.
+
+NO TEXT IN IMAGE."""
+_LOCATION_PROMPT_PRE = "Manhwa/Korean webtoon style environment.\n\n"
+_LOCATION_PROMPT_POST = """
+
+Wide establishing shot. Rich detail.
+Clean manhwa aesthetic, soft lighting.
+
+NO TEXT IN IMAGE."""
+
+# Canonical Character per id, so stories that reuse a character share one object
+_CHARACTER_REGISTRY: dict[str, "Character"] = {}
+
+
+@dataclass(frozen=True, slots=True)
+class Character:
+    """Character definition with visual consistency info."""
+    id: str
+    name: str
+    description: str  # Detailed visual description for prompts
+    reference_path: Optional[str] = None
+    variants: Mapping[str, str] = field(default_factory=dict, hash=False)
+    _ref_lookup: Mapping = field(init=False, repr=False, compare=False, hash=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "id", sys.intern(self.id))
+        # Read-only view so shared manifest entries can't be edited in place
+        object.__setattr__(self, "variants", MappingProxyType(dict(self.variants)))
+        # Base reference under None so any variant resolves with one lookup
+        object.__setattr__(self, "_ref_lookup", {None: self.reference_path, **self.variants})
+
+    @classmethod
+    def make(cls, **fields) -> "Character":
+        """Return the registered character for this id, creating it on first use."""
+        candidate = cls(**fields)
+        existing = _CHARACTER_REGISTRY.setdefault(candidate.id, candidate)
+        if existing != candidate:
+            raise ValueError(f"Character {candidate.id!r} is already defined differently")
+        return existing
+
+    def ref_candidate(self, variant: str = None) -> Optional[str]:
+        """Reference path for a variant, whether or not it exists yet."""
+        return self._ref_lookup.get(variant, self.reference_path)
+
+    def get_ref_path(self, variant: str = None) -> Optional[str]:
+        path = self._ref_lookup.get(variant, self.reference_path)
+        return path if path and os.path.exists(path) else None
+
+    def reference_prompt(self) -> str:
+        """Prompt for generating this character's reference portrait."""
+        return _CHARACTER_PROMPT_PRE + self.description + _CHARACTER_PROMPT_POST
+
+    def prompt_description(self) -> str:
+        """Get description formatted for prompts."""
+        return f"{self.name}: {self.description}"
+
+
+@dataclass(frozen=True, slots=True)
+class Location:
+    """Location definition."""
+    id: str
+    name: str
+    description: str
+    reference_path: Optional[str] = None
+
+    def __post_init__(self):
+        object.__setattr__(self, "id", sys.intern(self.id))
+
+    def reference_prompt(self) -> str:
+        """Prompt for generating this location's reference image."""
+        return _LOCATION_PROMPT_PRE + self.description + _LOCATION_PROMPT_POST
+
+    def get_ref_path(self) -> Optional[str]:
+        return self.reference_path if self.reference_path and os.path.exists(self.reference_path) else None
+
+
+@dataclass(frozen=True, slots=True)
+class PanelSpec:
+    """Panel specification with character/location tracking."""
+    id: str
+    chapter: str
+    panel_type: str  # establishing, dialogue, action, time_freeze, emotional, pov
+    description: str  # Scene description
+    characters: tuple[str, ...] = ()  # Character IDs in this panel
+    location: str = None
+    speaker: str = None  # Who is speaking (for dialogue panels)
+    mood: str = None
+    is_time_freeze: bool = False
+    is_holographic: bool = False
+    additional_notes: str = None  # Extra prompt instructions
+
+    def __post_init__(self):
+        # Low-cardinality labels repeat across panels; keep one copy of each
+        for name in ("id", "chapter", "panel_type", "location", "speaker", "mood"):
+            value = getattr(self, name)
+            if value is not None:
+                object.__setattr__(self, name, sys.intern(value))
+        object.__setattr__(self, "characters", tuple(sys.intern(c) for c in self.characters))
+
+
+def existing_paths(paths) -> set[str]:
+    """Return the given paths that exist on disk, listing each directory once."""
+    listings: dict[str, set[str]] = {}
+    found = set()
+    for path in paths:
+        if not path:
+            continue
+        directory, name = os.path.split(path)
+        names = listings.get(directory)
+        if names is None:
+            try:
+                with os.scandir(directory) as entries:
+                    names = {e.name for e in entries}
+            except OSError:
+                names = set()
+            listings[directory] = names
+        if name in names:
+            found.add(path)
+    return found
+
+
+# Sidecar next to each generated reference holding the digest of its prompt
+PROMPT_SIDECAR_SUFFIX = ".prompt"
+
+
+def prompt_digest(prompt: str) -> str:
+    """Short content hash of a generation prompt."""
+    return hashlib.blake2b(prompt.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def prompt_changed(path: str, prompt: str) -> bool:
+    """True when the image at path was generated from a different prompt.
+
+    Images without a sidecar predate prompt tracking and are kept as-is.
+    """
+    try:
+        with open(path + PROMPT_SIDECAR_SUFFIX, encoding="utf-8") as f:
+            return f.read().strip() != prompt_digest(prompt)
+    except FileNotFoundError:
+        return False
+
+
+def owns_reference(item_id: str, path: Optional[str]) -> bool:
+    """True when path is the image generated for item_id ({id}.png).
+
+    References that reuse another item's image (village_path -> beach_dawn.png)
+    or a differently named file are not prompt-tracked: any sidecar next to
+    them belongs to some other prompt.
+    """
+    return bool(path) and os.path.basename(path) == f"{item_id}.png"
+
+
+def record_prompt(path: str, prompt: str) -> None:
+    """Store the prompt digest for a freshly generated image."""
+    with open(path + PROMPT_SIDECAR_SUFFIX, "w", encoding="utf-8") as f:
+        f.write(prompt_digest(prompt))
+
+
+def needs_reference(item_id: str, item, present: set[str]) -> bool:
+    """True when item's reference is missing or was made from an older prompt."""
+    path = item.reference_path
+    if path not in present:
+        return True
+    # Sidecars are read and written at reference_path, only for references this id owns
+    return owns_reference(item_id, path) and prompt_changed(path, item.reference_prompt())
+
+
+def missing_references(characters: Mapping, locations: Mapping, present: set[str]) -> dict:
+    """Ids of the characters and locations whose references need (re)generating."""
+    return {
+        "characters": [cid for cid, c in characters.items() if needs_reference(cid, c, present)],
+        "locations": [lid for lid, loc in locations.items() if needs_reference(lid, loc, present)],
+    }
+
+
+async def generate_references(
+    characters: Mapping, locations: Mapping, missing: dict, force=False, concurrency: int = 4
+) -> list[dict]:
+    """Generate the missing character and location references, a few at a time.
+
+    Returns one {"kind", "id", "path"} or {"kind", "id", "error"} dict per reference.
+    """
+    # Imported here so check/summary don't load the image client
+    from image_gen_google import generate_character_ref, generate_location_ref
+
+    sem = asyncio.Semaphore(concurrency)
+
+    async def _one(kind, ref_id, generate, item):
+        async with sem:
+            print(f"Generating {kind}: {ref_id}...")
+            try:
+                prompt = item.reference_prompt()
+                # A stale image is still on disk, so it has to be forced out
+                regenerate = force or os.path.exists(item.reference_path)
+                result = await generate(ref_id, prompt, force=regenerate)
+                if owns_reference(ref_id, item.reference_path):
+                    record_prompt(item.reference_path, prompt)
+            except Exception as e:
+                print(f"  {ref_id} -> ERROR: {e}")
+                return {"kind": kind, "id": ref_id, "error": str(e)}
+        print(f"  {ref_id} -> {result['path']}")
+        return {"kind": kind, "id": ref_id, "path": result["path"]}
+
+    jobs = [
+        _one("character", cid, generate_character_ref, characters[cid]) for cid in missing["characters"]
+    ]
+    jobs += [_one("location", lid, generate_location_ref, locations[lid]) for lid in missing["locations"]]
+    return list(await asyncio.gather(*jobs))
+
+
+def print_reference_report(results: list[dict]) -> None:
+    """Summarize what generate_references did."""
+    failed = [r["id"] for r in results if "error" in r]
+    print(f"\nGenerated {len(results) - len(failed)}/{len(results)} references")
+    if failed:
+        print(f"  Failed (panels will render without them): {failed}")
@@ -12,7 +12,9 @@ Usage:
 """
 
 from dataclasses import dataclass, field
-from typing import Optional
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Mapping, Optional
 
 # Available OpenAI TTS voices:
 # - alloy: neutral, versatile (good for narration)
@@ -23,7 +25,7 @@ from typing import Optional
 # - shimmer: female, soft (good for Bimbo)
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class CharacterVoice:
     """Voice configuration for a story character."""
     id: str                          # Character ID (matches panel speaker)
@@ -40,64 +42,75 @@ class CharacterVoice:
         return " ".join(parts) if parts else None
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class StoryVoiceConfig:
     """Voice configuration for an entire story."""
     story_id: str
     narrator_voice: str = "alloy"
     narrator_style: str = "Speak with calm authority, painting vivid scenes. Measured pace, clear enunciation."
-    characters: dict = field(default_factory=dict)  # id -> CharacterVoice
+    characters: Mapping[str, CharacterVoice] = field(default_factory=dict, hash=False)  # id -> CharacterVoice
+
+    def __post_init__(self):
+        # Read-only copy so a shared config can't be changed under other callers
+        object.__setattr__(self, "characters", MappingProxyType(dict(self.characters)))
 
     def get_character(self, speaker: str) -> Optional[CharacterVoice]:
         """Get voice config for a speaker."""
         return self.characters.get(speaker)
 
-    def get_voice_for_panel(self, panel: dict) -> dict:
+    def get_voice_for_panel(self, panel: dict) -> dict[str, Mapping[str, str]]:
         """Get complete voice config for a panel.
 
         Returns dict with:
         - narration_voice, narration_sentiment, narration_instructions
         - dialogue_voice, dialogue_sentiment, dialogue_instructions
+
+        The nested entries are shared, read-only mappings (not JSON-serializable
+        as-is); use get_panel_voice_config for plain dicts.
         """
         result = {}
-
-        # Narration config
         if panel.get("narration"):
-            result["narration"] = {
-                "voice": self.narrator_voice,
-                "role": "narrator",
-                "sentiment": "neutral",
-                "instructions": self.narrator_style,
-            }
-
-        # Dialogue config
+            result["narration"] = _narration_voice(self)
         if panel.get("dialogue") and panel.get("speaker"):
-            speaker = panel["speaker"]
-            char = self.get_character(speaker)
-            if char:
-                result["dialogue"] = {
-                    "voice": char.voice,
-                    "role": "npc",
-                    "sentiment": char.default_sentiment,
-                    "instructions": char.speaking_style,
-                    "character_id": char.id,
-                }
-            else:
-                # Fallback for unknown speakers
-                result["dialogue"] = {
-                    "voice": "alloy",
-                    "role": "npc",
-                    "sentiment": "neutral",
-                }
-
+            result["dialogue"] = _dialogue_voice(self, panel["speaker"])
         return result
 
 
+# Configs are frozen, so each story's entries are built once and shared read-only
+@lru_cache(maxsize=256)
+def _narration_voice(config: StoryVoiceConfig) -> Mapping[str, str]:
+    return MappingProxyType({
+        "voice": config.narrator_voice,
+        "role": "narrator",
+        "sentiment": "neutral",
+        "instructions": config.narrator_style,
+    })
+
+
+@lru_cache(maxsize=256)
+def _dialogue_voice(config: StoryVoiceConfig, speaker: str) -> Mapping[str, str]:
+    char = config.get_character(speaker)
+    if char:
+        return MappingProxyType({
+            "voice": char.voice,
+            "role": "npc",
+            "sentiment": char.default_sentiment,
+            "instructions": char.speaking_style,
+            "character_id": char.id,
+        })
+    # Fallback for unknown speakers
+    return MappingProxyType({
+        "voice": "alloy",
+        "role": "npc",
+        "sentiment": "neutral",
+    })
+
+
 # =============================================================================
 # SHOGUN TEST STORY VOICES
 # =============================================================================
 
-SHOGUN_CHARACTERS = {
+SHOGUN_CHARACTERS = MappingProxyType({
     # AI Companion - fairy-like guide
     "bimbo": CharacterVoice(
         id="bimbo",
@@ -158,7 +171,7 @@ SHOGUN_CHARACTERS = {
         speaking_style="Speak with aged wisdom and formality. "
                       "Slow, deliberate, respected voice of experience.",
     ),
-}
+})
 
 SHOGUN_VOICE_CONFIG = StoryVoiceConfig(
     story_id="shogun_test",
@@ -192,9 +205,9 @@ def get_character_voice(story_id: str, speaker: str) -> Optional[CharacterVoice]
     return None
 
 
-def get_panel_voice_config(story_id: str, panel: dict) -> dict:
-    """Get complete voice configuration for a panel."""
+def get_panel_voice_config(story_id: str, panel: dict) -> dict[str, dict[str, str]]:
+    """Get complete voice configuration for a panel, as plain (JSON-ready) dicts."""
     config = get_story_voice_config(story_id)
     if config:
-        return config.get_voice_for_panel(panel)
+        return {kind: dict(entry) for kind, entry in config.get_voice_for_panel(panel).items()}
     return {}
@@ -3,32 +3,70 @@ from __future__ import annotations
 import asyncio
 import hashlib
 import io
+import re
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
-from typing import Any, Dict, Optional
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional
 
 import logging
 
+try:  # xxhash is optional; its xxh3 is several times faster than hashlib digests
+    import xxhash as _xxhash
+except ImportError:  # pragma: no cover - depends on environment
+    _xxhash = None
+
+try:  # orjson is optional; it serializes event payloads several times faster than json
+    import orjson as _orjson
+except ImportError:  # pragma: no cover - depends on environment
+    _orjson = None
+
 import providers
 import config
 from language import detect_language_from_text, normalize_language_token
-from services import process_interaction, get_scenario_by_id
+from services import process_interaction, get_scenario_by_id, scenarios_version
 
 _session_counter = 0
 
 logger = logging.getLogger(__name__)
 
+# Anything that is not a word character: punctuation and (Unicode) whitespace in one pass
+_NORM_RE = re.compile(r"\W")
+
+
+def _new_audio_hasher(data=b""):
+    """Incremental, non-cryptographic fingerprint hasher for session audio."""
+    if _xxhash is not None:
+        return _xxhash.xxh3_64(data)
+    return hashlib.blake2b(data, digest_size=8)
+
+
+async def _send_event(websocket, payload: Dict[str, Any]) -> None:
+    """Send a JSON event, serialized with orjson when available.
+
+    Frames stay text so clients using receive_json/JSON.parse are unaffected.
+    """
+    send_text = getattr(websocket, "send_text", None)
+    if _orjson is not None and send_text is not None:
+        try:
+            text = _orjson.dumps(payload).decode("utf-8")
+        except TypeError:
+            pass  # e.g. non-str keys; the stdlib encoder below handles them
+        else:
+            await send_text(text)
+            return
+    await websocket.send_json(payload)
+
 
 def clamp_float(value: object, default: float = 0.0, lo: float = 0.0, hi: float = 1.0) -> float:
     try:
         v = float(value)
     except Exception:
         v = float(default)
-    if v < lo:
-        return float(lo)
-    if v > hi:
-        return float(hi)
-    return float(v)
+    return float(min(hi, max(lo, v)))
 
 
 MIN_PARTIAL_BYTES = 4000  # lower threshold allows quicker partial turns (~0.15s chunks)
@@ -38,55 +76,105 @@ LANGUAGE_MISMATCH_SCORE_PENALTY = 10
 SUCCESS_POINTS_DEFAULT = 10
 AUTO_FINALIZE_MIN_INTERVAL = 0.8
 
+# Provider calls from every session share this bounded pool rather than the loop's
+# default executor, so a burst of partials cannot spawn unbounded threads.
+_TRANSCRIBE_POOL = ThreadPoolExecutor(
+    max_workers=max(1, int(getattr(config, "STREAM_TRANSCRIBE_WORKERS", 8) or 8)),
+    thread_name_prefix="stream-transcribe",
+)
+
 
 def _quick_translate(text: str, source: str = "Japanese", target: str = "English") -> str:
     """Translate a short phrase using OpenAI. Best-effort, returns empty on failure."""
     if not text or not text.strip():
         return ""
+    if not config.OPENAI_API_KEY:
+        return ""
     try:
-        import config as cfg
-        if not cfg.OPENAI_API_KEY:
-            return ""
-        from openai import OpenAI
-        client = OpenAI(api_key=cfg.OPENAI_API_KEY)
-        resp = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": f"Translate this {source} text to literal {target}. Reply with ONLY the translation, nothing else. If the input is gibberish, translate it as literally as possible — the humor matters."},
-                {"role": "user", "content": text},
-            ],
-            max_tokens=60,
-            temperature=0,
-        )
-        return resp.choices[0].message.content.strip()
+        return _quick_translate_cached(text, source, target)
     except Exception as e:
         logger.debug("Quick translate failed: %s", e)
         return ""
 
 
+# OpenAI client for _quick_translate (initialized lazily). Reused so repeated
+# translations share one HTTP connection pool instead of reconnecting per call.
+_openai_client: Any = None
+_openai_client_lock = threading.Lock()
+
+
+def _get_openai_client():
+    """Get or create the OpenAI client; safe to call from pool threads."""
+    global _openai_client
+    client = _openai_client
+    if client is None:
+        with _openai_client_lock:
+            client = _openai_client
+            if client is None:
+                from openai import OpenAI
+                client = _openai_client = OpenAI(api_key=config.OPENAI_API_KEY)
+    return client
+
+
+@lru_cache(maxsize=512)
+def _quick_translate_cached(text: str, source: str, target: str) -> str:
+    """OpenAI call behind _quick_translate; the same attempt is often scored more than once.
+
+    Errors propagate so that failures are never cached.
+    """
+    resp = _get_openai_client().chat.completions.create(
+        model="gpt-4o-mini",
+        messages=[
+            {"role": "system", "content": f"Translate this {source} text to literal {target}. Reply with ONLY the translation, nothing else. If the input is gibberish, translate it as literally as possible — the humor matters."},
+            {"role": "user", "content": text},
+        ],
+        max_tokens=60,
+        temperature=0,
+    )
+    return resp.choices[0].message.content.strip()
+
+
+@lru_cache(maxsize=256)
+def _detect_language_cached(text: str) -> str:
+    """detect_language_from_text memoized: a turn scores the same transcript several times."""
+    return detect_language_from_text(text)
+
+
+def _normalize(s: str) -> str:
+    """Lowercase and strip punctuation and whitespace for vocab comparison."""
+    return _NORM_RE.sub("", s.lower())
+
+
 def _vocab_match_level(transcript: str, expected: str) -> float:
     """Calculate match level between transcript and expected phrase."""
-    import re
-
-    def normalize(s: str) -> str:
-        s = re.sub(r'[^\w\s]', '', s.lower().strip())
-        return ''.join(s.split())
+    return _vocab_match_level_pre(_normalize(transcript), _normalize(expected))
 
-    norm_transcript = normalize(transcript)
-    norm_expected = normalize(expected)
 
+def _vocab_match_level_pre(norm_transcript: str, norm_expected: str) -> float:
+    """Match level between two strings already passed through _normalize."""
     if not norm_transcript or not norm_expected:
         return 0.0
     if norm_transcript == norm_expected:
         return 1.0
     if norm_expected in norm_transcript or norm_transcript in norm_expected:
         return min(len(norm_transcript), len(norm_expected)) / max(len(norm_transcript), len(norm_expected))
-    common = sum(1 for c in norm_expected if c in norm_transcript)
+    # Character membership against a set: O(len) instead of a substring scan per char
+    heard_chars = set(norm_transcript)
+    common = sum(c in heard_chars for c in norm_expected)
     return common / max(len(norm_expected), 1)
 
 
-def compare_vocab_response(transcript: str, expected: str, tag: str = "", target_language: str = "japanese") -> Dict[str, Any]:
-    """Compare a transcript to an expected vocab phrase."""
+def compare_vocab_response(
+    transcript: str,
+    expected: str,
+    tag: str = "",
+    target_language: str = "japanese",
+    expected_norm: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Compare a transcript to an expected vocab phrase.
+
+    ``expected_norm`` is an optional precomputed ``_normalize(expected)``.
+    """
     if not transcript or not transcript.strip():
         logger.info("[%s] compare_vocab_response: no speech detected", tag)
         return {
@@ -99,9 +187,11 @@ def compare_vocab_response(transcript: str, expected: str, tag: str = "", target
             "detected_language": "unknown",
         }
 
-    match_level = _vocab_match_level(transcript, expected)
-    detected = detect_language_from_text(transcript)
-    tier = compute_outcome_tier(match_level, transcript, target_language)
+    if expected_norm is None:
+        expected_norm = _normalize(expected)
+    match_level = _vocab_match_level_pre(_normalize(transcript), expected_norm)
+    detected = _detect_language_cached(transcript)
+    tier = compute_outcome_tier(match_level, transcript, target_language, detected=detected)
     success = tier in ("perfect", "good")
     logger.info("[%s] compare_vocab: heard=%r expected=%r match=%.3f tier=%s detected=%s", tag, transcript[:80], expected[:80], match_level, tier, detected)
     heard_translation = "" if success else _quick_translate(transcript)
@@ -119,8 +209,18 @@ def compare_vocab_response(transcript: str, expected: str, tag: str = "", target
     }
 
 
-def compare_vocab_multi(transcript: str, expected_list: list, tag: str = "", target_language: str = "japanese") -> Dict[str, Any]:
-    """Compare a transcript against multiple expected phrases, return best match."""
+def compare_vocab_multi(
+    transcript: str,
+    expected_list: list,
+    tag: str = "",
+    target_language: str = "japanese",
+    expected_norm: Optional[list] = None,
+) -> Dict[str, Any]:
+    """Compare a transcript against multiple expected phrases, return best match.
+
+    ``expected_norm`` is an optional list of precomputed ``_normalize``d
+    phrases, parallel to ``expected_list``.
+    """
     if not transcript or not transcript.strip():
         logger.info("[%s] compare_vocab_multi: no speech detected", tag)
         return {
@@ -134,21 +234,31 @@ def compare_vocab_multi(transcript: str, expected_list: list, tag: str = "", tar
             "detected_language": "unknown",
         }
 
+    if expected_norm is None or len(expected_norm) != len(expected_list):
+        expected_norm = [_normalize(e) for e in expected_list]
+    norm_transcript = _normalize(transcript)
     best_level = 0.0
     best_index = 0
+    # The per-candidate breakdown only feeds the log line below
+    log_scores = logger.isEnabledFor(logging.INFO)
     scores = []
     for i, expected in enumerate(expected_list):
-        level = _vocab_match_level(transcript, expected)
-        scores.append((i, level, expected))
+        level = _vocab_match_level_pre(norm_transcript, expected_norm[i])
+        if log_scores:
+            scores.append((i, level, expected))
         if level > best_level:
             best_level = level
             best_index = i
+            if level >= 1.0:
+                # Nothing can beat an exact match, and ties keep the first index anyway
+                break
 
-    logger.info("[%s] compare_vocab_multi: heard=%r | scores=%s", tag, transcript[:80],
-                " | ".join(f"[{i}] {lvl:.3f} {exp[:30]}" for i, lvl, exp in scores))
+    if log_scores:
+        logger.info("[%s] compare_vocab_multi: heard=%r | scores=%s", tag, transcript[:80],
+                    " | ".join(f"[{i}] {lvl:.3f} {exp[:30]}" for i, lvl, exp in scores))
 
-    detected = detect_language_from_text(transcript)
-    tier = compute_outcome_tier(best_level, transcript, target_language)
+    detected = _detect_language_cached(transcript)
+    tier = compute_outcome_tier(best_level, transcript, target_language, detected=detected)
     success = tier in ("perfect", "good")
     logger.info("[%s] compare_vocab_multi: best_index=%d best_level=%.3f tier=%s detected=%s", tag, best_index, best_level, tier, detected)
 
@@ -167,15 +277,23 @@ def compare_vocab_multi(transcript: str, expected_list: list, tag: str = "", tar
     }
 
 
-def compute_outcome_tier(match_level: float, transcript: str, target_language: str) -> str:
+def compute_outcome_tier(
+    match_level: float,
+    transcript: str,
+    target_language: str,
+    detected: Optional[str] = None,
+) -> str:
     """Compute outcome tier from match level and detected language.
 
+    Pass ``detected`` when the caller already ran language detection.
+
     Returns: 'perfect', 'good', 'passable', 'fumble', or 'fail'
     """
     if not transcript or not transcript.strip():
         return "fail"
 
-    detected = detect_language_from_text(transcript)
+    if detected is None:
+        detected = _detect_language_cached(transcript)
     correct_lang = (detected == target_language) or detected == "unknown"
 
     if match_level >= 0.9:
@@ -189,8 +307,19 @@ def compute_outcome_tier(match_level: float, transcript: str, target_language: s
     return "fail"
 
 
-def _scenario_config(scenario_id: Optional[int]) -> Dict[str, Any]:
+def _scenario_config(scenario_id: Optional[int]) -> Mapping[str, Any]:
     """Return per-scenario streaming configuration (lives, penalties, messaging)."""
+    return _scenario_config_cached(scenario_id, scenarios_version())
+
+
+@lru_cache(maxsize=256)
+def _scenario_config_cached(scenario_id: Optional[int], version: int) -> Mapping[str, Any]:
+    """Parse a scenario's streaming settings once per scenario.
+
+    `version` is `scenarios_version()` so cached configs drop out when the
+    scenario set is reloaded. The result is read-only because it is shared
+    between sessions.
+    """
     scenario = get_scenario_by_id(scenario_id) if scenario_id else None
     lives = DEFAULT_LIVES
     penalty_points = LANGUAGE_MISMATCH_SCORE_PENALTY
@@ -242,7 +371,7 @@ def _scenario_config(scenario_id: Optional[int]) -> Dict[str, Any]:
                     incorrect_penalty_lives = max(1, abs(lives_val))
                 except Exception:
                     incorrect_penalty_lives = DEFAULT_PENALTY_LIVES
-    return {
+    return MappingProxyType({
         "lives": lives,
         "penalty_points": penalty_points,
         "penalty_message": penalty_message,
@@ -250,7 +379,7 @@ def _scenario_config(scenario_id: Optional[int]) -> Dict[str, Any]:
         "language_penalty_lives": language_penalty_lives,
         "incorrect_penalty_lives": incorrect_penalty_lives,
         "mode": mode,
-    }
+    })
 
 
 async def transcribe_audio(audio_bytes: bytes, language: Optional[str] = None) -> str:
@@ -270,12 +399,12 @@ async def transcribe_audio(audio_bytes: bytes, language: Optional[str] = None) -
                 context=providers.CONTEXT_STREAMING,
             )
             duration_ms = int((time.perf_counter() - start) * 1000)
-            print(f"[streaming/{result.provider}] Partial transcript len={len(audio_bytes)} bytes took {duration_ms}ms")
+            logger.info("[streaming/%s] Partial transcript len=%d bytes took %dms", result.provider, len(audio_bytes), duration_ms)
             return result.text
         except Exception:
             return ""
 
-    return await loop.run_in_executor(None, _call)
+    return await loop.run_in_executor(_TRANSCRIBE_POOL, _call)
 
 
 @dataclass
@@ -288,7 +417,7 @@ class StreamingSession:
     mode: str = "beginner"
     audio_buffer: bytearray = field(default_factory=bytearray)
     chunk_seq: int = 0
-    last_partial_ts: float = 0.0
+    last_partial_ts: float = 0.0  # time.monotonic()
     language_penalized: bool = False
     partial_task: Optional[asyncio.Task] = None
     closed: bool = False
@@ -302,14 +431,34 @@ class StreamingSession:
     incorrect_penalty_lives: int = DEFAULT_PENALTY_LIVES
     final_event_sent: bool = False
     auto_finalized: bool = False
-    last_auto_check: float = 0.0
+    last_auto_check: float = 0.0  # time.monotonic()
     judge_story_weight: float = 0.0
     session_tag: str = ""
     _audio_hash: str = ""
     _transcript_cache_hash: str = ""  # hash of audio when last transcription was done
     _transcript_cache_text: str = ""  # cached transcription result
+    # Running hash of every byte appended, fed only the new bytes of each chunk;
+    # with _trimmed (bytes dropped from the front) it pins down the retained window
+    _hasher: Any = field(default=None, init=False, repr=False, compare=False)
+    _hashed_len: int = field(default=0, init=False, repr=False, compare=False)
+    _trimmed: int = field(default=0, init=False, repr=False, compare=False)
+    # Last immutable copy of audio_buffer, reused while the buffer is unchanged
+    _snapshot_bytes: bytes = field(default=b"", init=False, repr=False, compare=False)
+    _snapshot_hash: str = field(default="", init=False, repr=False, compare=False)
+    # _normalize()d expected phrase(s); fixed for the session, so computed once
+    _expected_norm: list = field(default_factory=list, init=False, repr=False, compare=False)
+    # Scoring jobs by audio hash, so finalize can join an auto-finalize already running
+    _inflight: Dict[str, "asyncio.Future[Dict[str, Any]]"] = field(default_factory=dict, init=False, repr=False, compare=False)
+    _finalize_hash: str = field(default="", init=False, repr=False, compare=False)
+    _scenario_id_str: Optional[str] = field(default=None, init=False, repr=False, compare=False)
 
     def __post_init__(self):
+        self._reseed_hash()
+        self._scenario_id_str = str(self.scenario_id) if self.scenario_id is not None else None
+        if self.expected_response:
+            self._expected_norm = [_normalize(self.expected_response)]
+        elif self.expected_responses:
+            self._expected_norm = [_normalize(e) for e in self.expected_responses]
         global _session_counter
         _session_counter += 1
         self.session_tag = f"S{_session_counter}"
@@ -322,19 +471,56 @@ class StreamingSession:
             return
         self.chunk_seq += 1
         self.audio_buffer.extend(chunk)
-        # Compute hash of full buffer for detecting identical audio
-        self._audio_hash = hashlib.md5(self.audio_buffer).hexdigest()[:8]
-        logger.info("[%s] chunk #%d: +%d bytes, buffer=%d bytes, hash=%s",
-                     self.session_tag, self.chunk_seq, len(chunk), len(self.audio_buffer), self._audio_hash)
+        self._hasher.update(chunk)
+        self._hashed_len += len(chunk)
         try:
             max_buf = int(getattr(config, "STREAM_MAX_BUFFER_BYTES", 2_000_000) or 2_000_000)
         except Exception:
             max_buf = 2_000_000
         if max_buf > 0 and len(self.audio_buffer) > max_buf:
             # Keep the most recent audio; prevents unbounded memory growth.
-            self.audio_buffer = self.audio_buffer[-max_buf:]
+            # Truncate in place rather than allocating a sliced copy.
+            cut = len(self.audio_buffer) - max_buf
+            del self.audio_buffer[:cut]
+            # Once capped this runs on every chunk, so record the cut instead of rehashing
+            self._trimmed += cut
+            self._hashed_len -= cut
+        # Hash of the full buffer for detecting identical audio
+        self._audio_hash = self._buffer_hash()
+        logger.info("[%s] chunk #%d: +%d bytes, buffer=%d bytes, hash=%s",
+                     self.session_tag, self.chunk_seq, len(chunk), len(self.audio_buffer), self._audio_hash)
         await self._maybe_emit_partial(websocket)
 
+    def _reseed_hash(self) -> None:
+        # Hash the buffer in place; release the view so the bytearray can still resize
+        with memoryview(self.audio_buffer) as view:
+            self._hasher = _new_audio_hasher(view)
+        self._hashed_len = len(self.audio_buffer)
+        self._trimmed = 0
+
+    def _buffer_hash(self) -> str:
+        """Short fingerprint of audio_buffer from the running hash.
+
+        After truncation the stream hash plus the trimmed byte count identifies
+        the retained window: equal fingerprints still mean equal audio.
+        """
+        if self._hashed_len != len(self.audio_buffer):
+            # Buffer was changed outside append_chunk
+            self._reseed_hash()
+        digest = self._hasher.copy().hexdigest()
+        return f"{digest}-{self._trimmed}" if self._trimmed else digest
+
+    def _snapshot(self) -> bytes:
+        """bytes(audio_buffer), copied only when the buffer changed since the last call."""
+        audio_hash = self._buffer_hash()
+        if audio_hash != self._snapshot_hash or len(self._snapshot_bytes) != len(self.audio_buffer):
+            self._snapshot_bytes = bytes(self.audio_buffer)
+            self._snapshot_hash = audio_hash
+        return self._snapshot_bytes
+
+    def _is_vocab_mode(self) -> bool:
+        return bool(self.expected_response or self.expected_responses) and self.scenario_id is None
+
     async def apply_language_penalty(self, detected_language: str, websocket) -> None:
         if self.lives_remaining <= 0:
             return
@@ -349,21 +535,14 @@ class StreamingSession:
         else:
             detail = "Speech did not match the target language."
         message = self.penalty_message_template or detail
-        payload = {
-            "event": "penalty",
-            "type": "wrong_language",
-            "detected_language": detected_language,
-            "target_language": self.target_language,
-            "lives_delta": lives_delta,
-            "lives_remaining": self.lives_remaining,
-            "lives_total": self.lives_total,
-            "score": self.score,
-            "message": message,
-            "mode": self.mode,
-        }
-        if self.lives_remaining == 0:
-            payload["status"] = "exhausted"
-        await websocket.send_json(payload)
+        payload = self._penalty_payload(
+            "wrong_language",
+            lives_delta,
+            message,
+            detected_language=detected_language,
+            target_language=self.target_language,
+        )
+        await _send_event(websocket, payload)
 
     async def apply_incorrect_answer_penalty(
         self,
@@ -380,43 +559,56 @@ class StreamingSession:
         elif lives_delta == 0:
             lives_delta = -default_penalty
         self.lives_remaining = max(0, self.lives_remaining + lives_delta)
+        payload = self._penalty_payload("incorrect_answer", lives_delta, message or "Let's try that again.")
+        await _send_event(websocket, payload)
+
+    def _penalty_payload(self, ptype: str, lives_delta: int, message: str, **extra: Any) -> Dict[str, Any]:
+        """Build a penalty event; both penalty kinds share the lives/score fields."""
         payload: Dict[str, Any] = {
             "event": "penalty",
-            "type": "incorrect_answer",
+            "type": ptype,
+            **extra,
             "lives_delta": lives_delta,
             "lives_remaining": self.lives_remaining,
             "lives_total": self.lives_total,
             "score": self.score,
-            "message": message or "Let's try that again.",
+            "message": message,
             "mode": self.mode,
         }
         if self.lives_remaining == 0:
             payload["status"] = "exhausted"
-        await websocket.send_json(payload)
+        return payload
 
     async def _maybe_emit_partial(self, websocket) -> None:
-        now = time.time()
+        now = time.monotonic()
         if now - self.last_partial_ts < 0.4:
             return
         if self.partial_task and not self.partial_task.done():
             return
-        audio_bytes = bytes(self.audio_buffer)
-        if not audio_bytes:
+        if not self.audio_buffer:
             return
+        audio_bytes = self._snapshot()
         loop = asyncio.get_running_loop()
-        self.partial_task = loop.create_task(self._emit_partial(audio_bytes, websocket))
+        # Debounce from the start of the request, not only from when the last one returned
+        self.last_partial_ts = now
+        # The buffer keeps growing while this task runs; pin the hash of this snapshot
+        self.partial_task = loop.create_task(self._emit_partial(audio_bytes, self._audio_hash, websocket))
 
-    async def _emit_partial(self, audio_bytes: bytes, websocket) -> None:
+    async def _emit_partial(self, audio_bytes: bytes, partial_hash: str, websocket) -> None:
         logger.info("[%s] PARTIAL transcribing %d bytes...", self.session_tag, len(audio_bytes))
         t0 = time.perf_counter()
+        if self.closed:
+            return
         transcript = await transcribe_audio(audio_bytes, self.target_language)
+        if self.closed:
+            # finalize() owns the turn now; a late partial must not emit or penalise
+            return
         elapsed = int((time.perf_counter() - t0) * 1000)
-        self.last_partial_ts = time.time()
+        self.last_partial_ts = time.monotonic()
         # Cache transcript so auto-finalize/finalize can reuse if audio unchanged
-        partial_hash = hashlib.md5(audio_bytes).hexdigest()[:8]
         self._transcript_cache_hash = partial_hash
         self._transcript_cache_text = transcript
-        detected = detect_language_from_text(transcript)
+        detected = _detect_language_cached(transcript or "")
         logger.info("[%s] PARTIAL result (%dms): %r detected=%s hash=%s", self.session_tag, elapsed, (transcript or "")[:100], detected, partial_hash)
         payload: Dict[str, Any] = {
             "event": "partial",
@@ -425,7 +617,7 @@ class StreamingSession:
             "detected_language": detected,
             "target_language": self.target_language,
         }
-        await websocket.send_json(payload)
+        await _send_event(websocket, payload)
         # Penalise language mismatch once per mismatch window
         if (
             self.judge_story_weight < 0.66
@@ -440,19 +632,20 @@ class StreamingSession:
             # Reset when the learner comes back to the target language
             self.language_penalized = False
 
-        await self._maybe_auto_finalize(audio_bytes, websocket)
+        await self._maybe_auto_finalize(audio_bytes, partial_hash, websocket)
 
     async def finalize(self, websocket, precomputed_result: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         if self.final_event_sent:
             logger.warning("[%s] FINALIZE skipped — already sent final event (auto_finalized=%s)", self.session_tag, self.auto_finalized)
             return precomputed_result or {"error": "already_finalized"}
+        audio_hash = self._buffer_hash()
+        # Published before closing so a queued auto-finalize on this audio still runs and is shared
+        self._finalize_hash = audio_hash
         self.closed = True
         if self.partial_task:
             self.partial_task.cancel()
-        audio_bytes = bytes(self.audio_buffer)
-        audio_hash = hashlib.md5(audio_bytes).hexdigest()[:8]
         logger.info("[%s] FINALIZE start: precomputed=%s auto_finalized=%s buffer=%d bytes hash=%s",
-                     self.session_tag, precomputed_result is not None, self.auto_finalized, len(audio_bytes), audio_hash)
+                     self.session_tag, precomputed_result is not None, self.auto_finalized, len(self.audio_buffer), audio_hash)
 
         result: Dict[str, Any]
         if precomputed_result is not None:
@@ -461,57 +654,7 @@ class StreamingSession:
                          precomputed_result.get("match_level", 0), precomputed_result.get("success"))
             result = precomputed_result
         else:
-            tag = self.session_tag
-
-            # Check transcript cache before spawning executor
-            cached_transcript = None
-            if self._transcript_cache_hash == audio_hash and self._transcript_cache_text:
-                cached_transcript = self._transcript_cache_text
-                logger.info("[%s] FINALIZE reusing cached transcript (hash=%s): %r",
-                             tag, audio_hash, cached_transcript[:100])
-
-            def _call():
-                # Vocab mode: direct phrase comparison
-                if (self.expected_response or self.expected_responses) and self.scenario_id is None:
-                    # Reuse cached transcript if audio hasn't changed
-                    if cached_transcript is not None:
-                        transcript = cached_transcript
-                    else:
-                        try:
-                            logger.info("[%s] FINALIZE transcribing %d bytes (vocab mode)...", tag, len(audio_bytes))
-                            t0 = time.perf_counter()
-                            transcript_result = providers.transcribe_audio(
-                                audio_bytes,
-                                file_ext="webm",
-                                mime_type="audio/webm",
-                                language_hint=self.target_language,
-                                context=providers.CONTEXT_STREAMING,
-                            )
-                            transcript = transcript_result.text
-                            elapsed = int((time.perf_counter() - t0) * 1000)
-                            logger.info("[%s] FINALIZE transcription (%dms, provider=%s): %r",
-                                         tag, elapsed, transcript_result.provider, (transcript or "")[:100])
-                        except Exception as e:
-                            logger.error("[%s] FINALIZE vocab transcription failed: %s", tag, e)
-                            return {"error": "transcription_failed", "heard": "", "match_level": 0}
-                    if self.expected_response:
-                        return compare_vocab_response(transcript, self.expected_response, tag=tag, target_language=self.target_language or "japanese")
-                    return compare_vocab_multi(transcript, self.expected_responses, tag=tag, target_language=self.target_language or "japanese")
-
-                # Scenario mode: use process_interaction
-                if self.scenario_id is None:
-                    return {"error": "missing_scenario", "heard": "", "nextScenario": None}
-                audio_stream = io.BytesIO(audio_bytes)
-                audio_stream.seek(0)
-                return process_interaction(
-                    audio_stream,
-                    str(self.scenario_id),
-                    self.target_language,
-                    judge=self.judge_story_weight,
-                )
-
-            loop = asyncio.get_running_loop()
-            result = await loop.run_in_executor(None, _call)
+            result = await self._score(audio_hash, self.session_tag)
         tier = result.get("tier", "fail") if isinstance(result, dict) else "fail"
         if tier in ("perfect", "good", "passable"):
             score_delta = 0
@@ -541,7 +684,8 @@ class StreamingSession:
                      self.session_tag, (result.get("heard") or "")[:80],
                      result.get("match_level", 0), result.get("success"),
                      self.score, self.lives_remaining, self.lives_total)
-        await websocket.send_json(
+        await _send_event(
+            websocket,
             {
                 "event": "final",
                 "result": result,
@@ -555,10 +699,10 @@ class StreamingSession:
         self.final_event_sent = True
         return result
 
-    async def _maybe_auto_finalize(self, audio_bytes: bytes, websocket) -> None:
+    async def _maybe_auto_finalize(self, audio_bytes: bytes, audio_hash: str, websocket) -> None:
         if self.closed or self.auto_finalized:
             return
-        now = time.time()
+        now = time.monotonic()
         if self.last_auto_check and now - self.last_auto_check < AUTO_FINALIZE_MIN_INTERVAL:
             return
         if not audio_bytes:
@@ -566,58 +710,11 @@ class StreamingSession:
         self.last_auto_check = now
         tag = self.session_tag
 
-        audio_hash = hashlib.md5(audio_bytes).hexdigest()[:8]
         logger.info("[%s] AUTO-FINALIZE check: %d bytes hash=%s...", tag, len(audio_bytes), audio_hash)
-
-        # Reuse cached transcript if audio hasn't changed since partial emit
-        cached_transcript = None
-        if self._transcript_cache_hash == audio_hash and self._transcript_cache_text:
-            cached_transcript = self._transcript_cache_text
-            logger.info("[%s] AUTO-FINALIZE reusing cached transcript (hash=%s): %r", tag, audio_hash, cached_transcript[:100])
-
-        def _call():
-            # Vocab mode: direct phrase comparison
-            if (self.expected_response or self.expected_responses) and self.scenario_id is None:
-                if cached_transcript is not None:
-                    transcript = cached_transcript
-                else:
-                    try:
-                        t0 = time.perf_counter()
-                        transcript_result = providers.transcribe_audio(
-                            audio_bytes,
-                            file_ext="webm",
-                            mime_type="audio/webm",
-                            language_hint=self.target_language,
-                            context=providers.CONTEXT_STREAMING,
-                        )
-                        transcript = transcript_result.text
-                        elapsed = int((time.perf_counter() - t0) * 1000)
-                        logger.info("[%s] AUTO-FINALIZE transcription (%dms, provider=%s): %r",
-                                     tag, elapsed, transcript_result.provider, (transcript or "")[:100])
-                    except Exception as e:
-                        logger.error("[%s] AUTO-FINALIZE transcription failed: %s", tag, e)
-                        return {"error": "transcription_failed", "heard": "", "match_level": 0}
-                # Cache for finalize
-                self._transcript_cache_hash = audio_hash
-                self._transcript_cache_text = transcript
-                if self.expected_response:
-                    return compare_vocab_response(transcript, self.expected_response, tag=f"{tag}/auto", target_language=self.target_language or "japanese")
-                return compare_vocab_multi(transcript, self.expected_responses, tag=f"{tag}/auto", target_language=self.target_language or "japanese")
-
-            # Scenario mode
-            if self.scenario_id is None:
-                return {"error": "missing_scenario", "heard": "", "nextScenario": None}
-            audio_stream = io.BytesIO(audio_bytes)
-            audio_stream.seek(0)
-            return process_interaction(
-                audio_stream,
-                str(self.scenario_id),
-                self.target_language,
-                judge=self.judge_story_weight,
-            )
-
-        loop = asyncio.get_running_loop()
-        result = await loop.run_in_executor(None, _call)
+        result = await self._score(audio_hash, f"{tag}/auto", audio_bytes=audio_bytes, skip_if_closed=True)
+        if self.closed:
+            # A user finalize started meanwhile; it owns the final event
+            return
         should = self._should_auto_finalize(result)
         logger.info("[%s] AUTO-FINALIZE decision: should=%s heard=%r match=%.3f success=%s",
                      tag, should, (result.get("heard") or "")[:80],
@@ -627,6 +724,100 @@ class StreamingSession:
             logger.info("[%s] AUTO-FINALIZE triggering finalize (preempting stop signal)", tag)
             await self.finalize(websocket, precomputed_result=result)
 
+    async def _score(
+        self,
+        audio_hash: str,
+        tag: str,
+        *,
+        audio_bytes: Optional[bytes] = None,
+        skip_if_closed: bool = False,
+    ) -> Dict[str, Any]:
+        """Transcribe and score the audio fingerprinted by ``audio_hash``.
+
+        Concurrent callers for the same hash (auto-finalize racing a user
+        finalize) share one provider call instead of each making their own.
+        """
+        pending = self._inflight.get(audio_hash)
+        if pending is not None:
+            logger.info("[%s] joining in-flight scoring (hash=%s)", tag, audio_hash)
+            return await asyncio.shield(pending)
+
+        cached_transcript = None
+        if self._transcript_cache_hash == audio_hash and self._transcript_cache_text:
+            cached_transcript = self._transcript_cache_text
+            logger.info("[%s] reusing cached transcript (hash=%s): %r", tag, audio_hash, cached_transcript[:100])
+        if self._is_vocab_mode() and cached_transcript is not None:
+            audio_bytes = b""  # a cached vocab-mode transcript needs no audio at all
+        elif audio_bytes is None:
+            audio_bytes = self._snapshot()
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(
+            _TRANSCRIBE_POOL, self._transcribe_and_score, audio_bytes, audio_hash, tag, cached_transcript, skip_if_closed
+        )
+        self._inflight[audio_hash] = future
+        try:
+            # Shielded so a cancelled waiter (e.g. the partial task) does not cancel a shared job
+            return await asyncio.shield(future)
+        finally:
+            if self._inflight.get(audio_hash) is future:
+                del self._inflight[audio_hash]
+
+    def _transcribe_and_score(
+        self,
+        audio_bytes: bytes,
+        audio_hash: str,
+        tag: str,
+        cached_transcript: Optional[str],
+        skip_if_closed: bool,
+    ) -> Dict[str, Any]:
+        """Blocking half of _score; runs on _TRANSCRIBE_POOL."""
+        if skip_if_closed and self.closed and self._finalize_hash != audio_hash:
+            # finalize() started on different audio while this job was queued
+            return {"error": "session_closed", "heard": "", "match_level": 0}
+        # Vocab mode: direct phrase comparison
+        if self._is_vocab_mode():
+            if cached_transcript is not None:
+                transcript = cached_transcript
+            else:
+                try:
+                    logger.info("[%s] transcribing %d bytes (vocab mode)...", tag, len(audio_bytes))
+                    t0 = time.perf_counter()
+                    transcript_result = providers.transcribe_audio(
+                        audio_bytes,
+                        file_ext="webm",
+                        mime_type="audio/webm",
+                        language_hint=self.target_language,
+                        context=providers.CONTEXT_STREAMING,
+                    )
+                    transcript = transcript_result.text
+                    elapsed = int((time.perf_counter() - t0) * 1000)
+                    logger.info("[%s] transcription (%dms, provider=%s): %r",
+                                 tag, elapsed, transcript_result.provider, (transcript or "")[:100])
+                except Exception as e:
+                    logger.error("[%s] vocab transcription failed: %s", tag, e)
+                    return {"error": "transcription_failed", "heard": "", "match_level": 0}
+                # Cache for a later finalize on the same audio
+                self._transcript_cache_hash = audio_hash
+                self._transcript_cache_text = transcript
+            target_language = self.target_language or "japanese"
+            if self.expected_response:
+                return compare_vocab_response(transcript, self.expected_response, tag=tag, target_language=target_language,
+                                              expected_norm=self._expected_norm[0])
+            return compare_vocab_multi(transcript, self.expected_responses, tag=tag, target_language=target_language,
+                                       expected_norm=self._expected_norm)
+
+        # Scenario mode: use process_interaction
+        if self.scenario_id is None:
+            return {"error": "missing_scenario", "heard": "", "nextScenario": None}
+        # process_interaction reads a file-like object; a fresh BytesIO already starts at 0
+        return process_interaction(
+            io.BytesIO(audio_bytes),
+            self._scenario_id_str,
+            self.target_language,
+            judge=self.judge_story_weight,
+        )
+
     def _should_auto_finalize(self, result: Dict[str, Any]) -> bool:
         if not isinstance(result, dict):
             return False
@@ -1,8 +1,9 @@
 from __future__ import annotations
 
 import importlib
+import json
 from pathlib import Path
-from typing import Optional
+from typing import Any, Optional
 
 import pytest
 from _pytest.monkeypatch import MonkeyPatch
@@ -15,6 +16,42 @@ class _DummyResponse:
         self.content = content
 
 
+class _GeminiStub:
+    """Scripted stand-in for providers.invoke_google that records every call.
+
+    Replies are consumed in order and the last one repeats. A str is sent
+    as-is, an exception is raised, a callable gets the messages and its
+    result is used, anything else is JSON-encoded.
+    """
+
+    def __init__(self) -> None:
+        self.replies: list[Any] = ["stub response"]
+        self.calls: list[tuple[list, dict]] = []
+
+    def reply(self, *replies: Any) -> "_GeminiStub":
+        self.replies = list(replies)
+        return self
+
+    def __call__(self, messages, model=None, **kwargs):
+        self.calls.append((messages, kwargs))
+        reply = self.replies[min(len(self.calls), len(self.replies)) - 1]
+        if callable(reply):
+            reply = reply(messages)
+        if isinstance(reply, BaseException):
+            raise reply
+        if not isinstance(reply, str):
+            reply = json.dumps(reply, ensure_ascii=False)
+        return _DummyResponse(reply), 0
+
+
+@pytest.fixture
+def gemini(monkeypatch) -> _GeminiStub:
+    """Replace providers.invoke_google with a scripted, call-recording stub."""
+    stub = _GeminiStub()
+    monkeypatch.setattr(importlib.import_module("providers"), "invoke_google", stub, raising=False)
+    return stub
+
+
 @pytest.fixture(scope="session")
 def _isolated_paths(tmp_path_factory) -> dict[str, Path]:
     """Create isolated filesystem roots for media generated during tests."""
@@ -92,9 +129,15 @@ def stub_providers(monkeypatch):
     def fake_openai_chat(*args, **kwargs):
         return "stub narrative"
 
-    def fake_invoke_google(messages, model_override=None):
+    def fake_invoke_google(messages, model_override=None, **kwargs):
         return _DummyResponse("stub response"), 0
 
+    def fake_invoke_google_stream(messages, model=None):
+        return iter(["stub response"]), 0
+
+    def fake_openai_chat_stream(*args, **kwargs):
+        return iter(["stub narrative"])
+
     def fake_tts_with_openai(text: str, voice: str = "alloy", fmt: str = "mp3") -> bytes:
         return f"tts:{voice}:{fmt}:{text}".encode("utf-8")
 
@@ -108,6 +151,8 @@ def stub_providers(monkeypatch):
     monkeypatch.setattr(providers, "romanize", fake_romanize, raising=False)
     monkeypatch.setattr(providers, "openai_chat", fake_openai_chat, raising=False)
     monkeypatch.setattr(providers, "invoke_google", fake_invoke_google, raising=False)
+    monkeypatch.setattr(providers, "invoke_google_stream", fake_invoke_google_stream, raising=False)
+    monkeypatch.setattr(providers, "openai_chat_stream", fake_openai_chat_stream, raising=False)
     monkeypatch.setattr(providers, "tts_with_openai", fake_tts_with_openai, raising=False)
     monkeypatch.setattr(providers, "collect_google_api_keys", fake_collect_keys, raising=False)
 
@@ -0,0 +1,47 @@
+import json
+
+from llm_json import find_json_array
+
+
+def test_find_json_array_ignores_prose_and_fences():
+    text = 'Here is the "scenario" list:\n```json\n[{"id": 1, "options": []}]\n```\nEnjoy [really].'
+    assert json.loads(find_json_array(text)) == [{"id": 1, "options": []}]
+
+
+def test_find_json_array_skips_brackets_inside_strings():
+    text = '[{"text": "say ] or [ \\" ok"}, [1, 2]] trailing ]'
+    assert json.loads(find_json_array(text)) == [{"text": 'say ] or [ " ok'}, [1, 2]]
+
+
+def test_find_json_array_returns_none_when_unbalanced():
+    assert find_json_array('[{"id": 1}') is None
+    assert find_json_array("no json here") is None
+
+
+def test_iter_json_array_items_yields_elements_across_chunks():
+    from llm_json import iter_json_array_items
+
+    chunks = ['Sure: [{"id": 1, "t', 'ext": "a, [b]"}', ', {"id": 2}, bad', ', {"id": 3}] tail [9]']
+    assert list(iter_json_array_items(chunks)) == [{"id": 1, "text": "a, [b]"}, {"id": 2}, {"id": 3}]
+
+
+def test_objects_only_skips_bracketed_prose():
+    from llm_json import iter_json_array_items
+
+    text = 'Here are [3] scenarios:\n[{"id": 1}, {"id": 2}]'
+    assert json.loads(find_json_array(text, objects_only=True)) == [{"id": 1}, {"id": 2}]
+    chunks = [text[i:i + 4] for i in range(0, len(text), 4)]
+    assert list(iter_json_array_items(chunks, objects_only=True)) == [{"id": 1}, {"id": 2}]
+    assert list(iter_json_array_items(['[[ {"id": 1} ]]'], objects_only=True)) == [{"id": 1}]
+    assert find_json_array("only [3] here", objects_only=True) is None
+
+
+def test_strict_iteration_raises_instead_of_skipping():
+    import pytest
+    from llm_json import iter_json_array_items
+
+    with pytest.raises(ValueError):
+        list(iter_json_array_items(['[{"id": 1}, {"id": 2, bad}, {"id": 3}]'], strict=True))
+    with pytest.raises(ValueError):
+        list(iter_json_array_items(['[{"id": 1}, {"id": 2}'], strict=True))
+    assert list(iter_json_array_items(['no array'], strict=True)) == []
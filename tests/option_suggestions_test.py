@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+
+import config
+import providers
+from services import suggestions
+
+
+def test_suggestions_synthesize_missing_clips_in_order(tmp_path, monkeypatch, gemini):
+    monkeypatch.setattr(config, "EXAMPLES_AUDIO_DIR", str(tmp_path), raising=False)
+    payload = {
+        "options": [
+            ["はい", "はい、お願いします", "うん"],
+            ["いいえ", "結構です"],
+        ]
+    }
+    gemini.reply(payload)
+
+    calls: list[str] = []
+
+    def counting_tts(text: str, voice: str = "alloy", fmt: str = "mp3") -> bytes:
+        calls.append(text)
+        return f"tts:{text}".encode("utf-8")
+
+    monkeypatch.setattr(providers, "tts_with_openai", counting_tts, raising=False)
+
+    out = suggestions.generate_option_suggestions(1, n_per_option=3)
+
+    assert [len(o["examples"]) for o in out["options"][:2]] == [3, 2]
+    assert sorted(calls) == sorted(t for group in payload["options"] for t in group)
+    for opt in out["options"][:2]:
+        for ex in opt["examples"]:
+            assert ex["audio"].startswith("/examples/")
+            clip = Path(tmp_path) / ex["audio"].rsplit("/", 1)[-1]
+            assert clip.read_bytes() == f"tts:{ex['target']}".encode("utf-8")
+
+    calls.clear()
+    suggestions.generate_option_suggestions(1, n_per_option=3)
+    assert calls == []
+
+
+def test_suggestions_share_clip_for_identical_phrase(tmp_path, monkeypatch, gemini):
+    monkeypatch.setattr(config, "EXAMPLES_AUDIO_DIR", str(tmp_path), raising=False)
+    monkeypatch.setattr(suggestions.voice_select, "select_voice", lambda **_: "alloy", raising=True)
+    gemini.reply({"options": [["Yes please"], ["yes  please"]]})
+
+    calls: list[str] = []
+
+    def counting_tts(text: str, voice: str = "alloy", fmt: str = "mp3") -> bytes:
+        calls.append(text)
+        return b"clip"
+
+    monkeypatch.setattr(providers, "tts_with_openai", counting_tts, raising=False)
+
+    out = suggestions.generate_option_suggestions(1, n_per_option=1)
+
+    assert calls == ["Yes please"]
+    first, second = out["options"][0]["examples"][0], out["options"][1]["examples"][0]
+    assert first["audio"] == second["audio"]
+
+
+def test_hint_suggestions_hedge_slow_gemini_with_openai(tmp_path, monkeypatch, gemini):
+    monkeypatch.setattr(config, "EXAMPLES_AUDIO_DIR", str(tmp_path), raising=False)
+    monkeypatch.setattr(config, "OPENAI_API_KEY", "stub-key", raising=False)
+    monkeypatch.setattr(config, "OPTIONS_HEDGE_DELAY_S", 0.01, raising=False)
+    release = threading.Event()
+
+    def slow_gemini_reply(messages):
+        release.wait(2)
+        return {"options": [["gemini"]]}
+
+    def fast_openai_chat(messages, model=None, temperature=0.2):
+        return '{"options": [["openai"]]}'
+
+    gemini.reply(slow_gemini_reply)
+    monkeypatch.setattr(providers, "openai_chat", fast_openai_chat, raising=False)
+
+    try:
+        out = suggestions.generate_option_suggestions(1, n_per_option=1, stage="hints")
+    finally:
+        release.set()
+
+    assert out["options"][0]["examples"][0]["target"] == "openai"
+
+
+def test_suggestions_translate_missing_sides_in_one_batch(tmp_path, monkeypatch, gemini):
+    monkeypatch.setattr(config, "EXAMPLES_AUDIO_DIR", str(tmp_path), raising=False)
+    payload = {
+        "options": [
+            [{"native": "Yes", "target": ""}, {"native": "", "target": "うん"}],
+            [{"native": "No", "target": ""}],
+        ]
+    }
+    gemini.reply(payload)
+
+    batches: list[tuple[list[str], str]] = []
+
+    def fake_translate_batch(texts, to_language, from_language=None):
+        batches.append((list(texts), to_language))
+        return [f"{t}->{to_language}" for t in texts]
+
+    monkeypatch.setattr(providers, "translate_batch", fake_translate_batch, raising=False)
+
+    out = suggestions.generate_option_suggestions(
+        1, n_per_option=2, target_language="Japanese", native_language="English"
+    )
+
+    assert batches == [(["Yes", "No"], "Japanese"), (["うん"], "English")]
+    first = out["options"][0]["examples"]
+    assert first[0]["target"] == "Yes->Japanese"
+    assert first[1]["native"] == "うん->English"
+    assert out["options"][1]["examples"][0]["target"] == "No->Japanese"
+
+
+def test_failed_clip_write_leaves_no_partial_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "EXAMPLES_AUDIO_DIR", str(tmp_path), raising=False)
+    monkeypatch.setattr(providers, "tts_with_openai", lambda text, voice="alloy", fmt="mp3": b"clip", raising=False)
+
+    def failing_replace(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(suggestions.os, "replace", failing_replace)
+
+    assert suggestions._synthesize_example(("はい", "alloy", "ex-abc.mp3")) is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_textless_options_keep_skeleton_without_provider_call(monkeypatch, gemini):
+    scenario = {"id": 99, "options": [{"text": "", "next_scenario": 2}, {"next_scenario": 3}]}
+    monkeypatch.setattr(suggestions, "get_scenario_by_id", lambda _id: scenario)
+
+    out = suggestions.generate_option_suggestions(99)
+
+    assert gemini.calls == []
+    assert out["options"] == [
+        {"option_text": "", "examples": [], "next_scenario": 2},
+        {"option_text": "", "examples": [], "next_scenario": 3},
+    ]
+
+
+def test_batch_translation_accepts_fenced_reply(monkeypatch):
+    from types import SimpleNamespace
+
+    class FencedChat:
+        def __init__(self, **_kwargs):
+            pass
+
+        def invoke(self, _prompt):
+            return SimpleNamespace(content='Here you go:\n```json\n["hai", "iie"]\n```')
+
+    monkeypatch.setattr(config, "OPENAI_API_KEY", "test-key", raising=False)
+    monkeypatch.setattr(providers, "ChatOpenAI", FencedChat)
+
+    assert providers.translate_batch(["yes", "no"], to_language="Japanese") == ["hai", "iie"]
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import asyncio
+import sys
+import types
+
+import story_shogun
+from story_types import Location, record_prompt
+
+
+def _aliased_locations(tmp_path):
+    beach_png = str(tmp_path / "beach_dawn.png")
+    return {
+        "beach_dawn": Location(id="beach_dawn", name="Beach", description="Storm beach.", reference_path=beach_png),
+        "village_path": Location(id="village_path", name="Path", description="Sandy path.", reference_path=beach_png),
+    }
+
+
+def test_aliased_reference_converges_after_generation(tmp_path, monkeypatch):
+    locations = _aliased_locations(tmp_path)
+    monkeypatch.setattr(story_shogun, "CHARACTERS", {})
+    monkeypatch.setattr(story_shogun, "LOCATIONS", locations)
+    monkeypatch.setattr(story_shogun, "_present", None)
+    generated = []
+
+    async def fake_generate_location_ref(location_id, prompt, force=False):
+        generated.append(location_id)
+        path = tmp_path / f"{location_id}.png"
+        path.write_bytes(b"png")
+        return {"location_id": location_id, "path": str(path), "cached": False}
+
+    fake_module = types.SimpleNamespace(
+        generate_character_ref=None, generate_location_ref=fake_generate_location_ref
+    )
+    monkeypatch.setitem(sys.modules, "image_gen_google", fake_module)
+
+    asyncio.run(story_shogun.generate_references())
+    assert sorted(generated) == ["beach_dawn", "village_path"]
+    assert story_shogun.check_missing() == {"characters": [], "locations": []}
+
+    # The shared image's sidecar records beach_dawn's prompt; village_path must not chase it
+    record_prompt(locations["beach_dawn"].reference_path, locations["beach_dawn"].reference_prompt())
+    generated.clear()
+    asyncio.run(story_shogun.generate_references())
+    assert generated == []
+
+
+def test_reference_without_path_reports_error_instead_of_aborting(tmp_path, monkeypatch):
+    locations = {
+        "nowhere": Location(id="nowhere", name="Nowhere", description="Fog."),
+        "beach_dawn": Location(
+            id="beach_dawn", name="Beach", description="Storm beach.", reference_path=str(tmp_path / "beach_dawn.png")
+        ),
+    }
+    monkeypatch.setattr(story_shogun, "CHARACTERS", {})
+    monkeypatch.setattr(story_shogun, "LOCATIONS", locations)
+    monkeypatch.setattr(story_shogun, "_present", None)
+
+    async def fake_generate_location_ref(location_id, prompt, force=False):
+        path = tmp_path / f"{location_id}.png"
+        path.write_bytes(b"png")
+        return {"location_id": location_id, "path": str(path), "cached": False}
+
+    fake_module = types.SimpleNamespace(
+        generate_character_ref=None, generate_location_ref=fake_generate_location_ref
+    )
+    monkeypatch.setitem(sys.modules, "image_gen_google", fake_module)
+
+    results = {r["id"]: r for r in asyncio.run(story_shogun.generate_references())}
+    assert "error" in results["nowhere"]
+    assert results["beach_dawn"]["path"] == str(tmp_path / "beach_dawn.png")
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import asyncio
+
+import providers
+import story_to_panels
+
+
+def test_storyboard_prompt_keeps_static_prefix(gemini):
+    gemini.reply([{"id": "p1", "type": "wide", "mood": "tense"}])
+    story_to_panels.clear_response_cache()
+
+    story_to_panels.adapt_story_to_panels("A samurai at dawn.", max_panels=4)
+    seq = story_to_panels.adapt_story_to_panels("Rain on the village.", max_panels=9, target_language="Spanish")
+
+    (first, _), (second, _) = gemini.calls
+    assert first[0].content == second[0].content
+    assert "Rain on the village." not in second[0].content
+    assert "9 or fewer" in second[1].content and "Spanish" in second[1].content
+    assert [p.id for p in seq.panels] == ["p1"]
+
+
+def test_repeated_narrative_reuses_cached_reply(gemini):
+    gemini.reply([{"id": "p1"}])
+    story_to_panels.clear_response_cache()
+
+    story_to_panels.adapt_story_to_panels("Same scene.")
+    again = story_to_panels.adapt_story_to_panels("Same scene.")
+    assert len(gemini.calls) == 1
+    assert [p.id for p in again.panels] == ["p1"]
+
+    story_to_panels.adapt_story_to_panels("Same scene.", cache=False)
+    assert len(gemini.calls) == 2
+
+
+def test_async_adapters_run_together(gemini):
+    gemini.reply([{"id": "p1"}])
+
+    async def run():
+        return await asyncio.gather(
+            story_to_panels.aadapt_story_to_panels("Dawn.", cache=False),
+            story_to_panels.aadapt_scenario_to_panels({"id": 3, "description": "Gate"}, cache=False),
+        )
+
+    story, scenario = asyncio.run(run())
+    assert story.panels[0].id == "p1"
+    assert scenario.id == "scenario_3"
+
+
+def test_async_adapters_work_across_event_loops(gemini):
+    gemini.reply([{"id": "p1"}])
+    # More calls than slots, so some wait and bind the semaphore to the running loop
+    jobs = story_to_panels.PROVIDER_CONCURRENCY + 1
+
+    async def run():
+        return await asyncio.gather(
+            *(story_to_panels.aadapt_story_to_panels(f"Scene {i}.", cache=False) for i in range(jobs))
+        )
+
+    for _ in range(2):
+        assert [seq.panels[0].id for seq in asyncio.run(run())] == ["p1"] * jobs
+
+
+def test_panel_parsers_handle_brackets_in_strings_and_stream_items():
+    raw = 'Panels:\n[{"id": "a", "scene_description": "gate [left]"}, {"id": "b"}] done'
+    panels = story_to_panels._parse_panels_json(raw, story_to_panels.ArtStyle.MANHWA)
+    assert [p.id for p in panels] == ["a", "b"]
+    assert panels[0].scene_description == "gate [left]"
+
+    chunks = ['[{"id": "a", "mood": "te', 'nse"}, {"id"', ': "b"}]']
+    streamed = list(story_to_panels._parse_panels_stream(chunks, story_to_panels.ArtStyle.MANHWA))
+    assert [p.id for p in streamed] == ["a", "b"]
+    assert streamed[0].mood is story_to_panels.Mood.TENSE
+
+
+def test_dialogue_batch_splits_one_reply_and_backfills_missing_keys(gemini):
+    lines = [{"speaker": "samurai", "text": "Who are you?"}]
+    gemini.reply({"gate": [{"id": "g1", "dialogue_indices": [1]}]}, [{"id": "solo"}])
+
+    out = story_to_panels.adapt_dialogues_batch([("gate", lines), ("beach", lines)], cache=False)
+
+    assert list(out) == ["gate", "beach"]
+    assert out["gate"].panels[0].dialogue == "Who are you?"
+    assert [p.id for p in out["beach"].panels] == ["solo"]
+    assert len(gemini.calls) == 2 and "DIALOGUE KEY: beach" in gemini.calls[1][0][1].content
+
+
+def test_sequence_ids_are_content_digests():
+    # Fixed value: ids must not depend on per-process hash randomization
+    assert story_to_panels._stable_id("A samurai at dawn.") == "26f2a6065c2f"
+
+
+def test_gemini_is_asked_for_schema_constrained_json(gemini):
+    gemini.reply([{"id": "p1"}])
+
+    story_to_panels.adapt_dialogue_to_panels("gate", [{"speaker": "samurai", "text": "Halt."}], cache=False)
+
+    _, kwargs = gemini.calls[0]
+    assert kwargs["response_mime_type"] == "application/json"
+    assert kwargs["response_schema"] is story_to_panels.DIALOGUE_PANEL_ARRAY_SCHEMA
+
+
+def test_transient_gemini_error_is_retried_before_openai(gemini, monkeypatch):
+    monkeypatch.setattr(providers.time, "sleep", lambda _s: None)
+    gemini.reply(ConnectionError("connection reset"), [{"id": "retried"}])
+
+    def unexpected_openai(*args, **kwargs):
+        raise AssertionError("OpenAI fallback should not run")
+
+    monkeypatch.setattr(providers, "openai_chat", unexpected_openai, raising=False)
+
+    seq = story_to_panels.adapt_story_to_panels("Flaky network.", cache=False)
+
+    assert len(gemini.calls) == 2
+    assert seq.panels[0].id == "retried"
+
+
+def test_stream_panels_yields_before_reply_finishes(monkeypatch):
+    sent: list[str] = []
+
+    def fake_stream(messages, model=None):
+        def chunks():
+            yield '[{"id": "first", "type": "wide"}, '
+            sent.append("second chunk")
+            yield '{"id": "second"}]'
+        return chunks(), 0
+
+    monkeypatch.setattr(providers, "invoke_google_stream", fake_stream, raising=False)
+
+    panels = story_to_panels.stream_panels("Dawn at the gate.")
+    first = next(panels)
+    assert first.id == "first" and sent == []
+    assert [p.id for p in panels] == ["second"]
+
+    seq = story_to_panels.collect_panels("Dawn at the gate.", title="Gate")
+    assert seq.title == "Gate" and [p.id for p in seq.panels] == ["first", "second"]
@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+import story_voices
+
+
+def test_panel_voice_entries_are_shared_per_speaker():
+    config = story_voices.SHOGUN_VOICE_CONFIG
+    first = config.get_voice_for_panel({"dialogue": "待て", "speaker": "samurai", "narration": "Dawn."})
+    second = config.get_voice_for_panel({"dialogue": "誰だ", "speaker": "samurai"})
+
+    assert first["dialogue"]["voice"] == "onyx"
+    assert first["narration"]["role"] == "narrator"
+    assert "narration" not in second
+    assert second["dialogue"] is first["dialogue"]
+    assert story_voices.get_panel_voice_config("shogun_test", {"dialogue": "?", "speaker": "ghost"}) == {
+        "dialogue": {"voice": "alloy", "role": "npc", "sentiment": "neutral"}
+    }
+
+
+def test_panel_voice_config_is_json_serializable():
+    import json
+
+    panel = {"dialogue": "待て", "speaker": "samurai", "narration": "Dawn."}
+    config = story_voices.get_panel_voice_config("shogun_test", panel)
+    assert json.loads(json.dumps(config))["dialogue"]["voice"] == "onyx"
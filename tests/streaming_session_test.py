@@ -22,6 +22,8 @@ def session_env(monkeypatch):
         return scenarios.get(int(scenario_id)) if scenario_id is not None else None
 
     monkeypatch.setattr(streaming, "get_scenario_by_id", fake_get_scenario_by_id)
+    # Scenario configs are cached per (id, scenarios_version); these fakes reuse ids
+    streaming._scenario_config_cached.cache_clear()
 
     async def fake_transcribe_audio(data, language=None):
         await asyncio.sleep(0)
@@ -227,3 +229,110 @@ def test_partial_language_penalty_disabled_when_story_first(session_env, monkeyp
 
     assert session.lives_remaining == session.lives_total
     assert all(msg.get("event") != "penalty" for msg in ws.messages)
+
+
+def test_vocab_match_level_scores():
+    assert streaming._vocab_match_level("すみません。", "すみません") == 1.0
+    assert streaming._vocab_match_level("ありがとうございます", "ありがと") == 0.4
+    assert streaming._vocab_match_level("こんばんは", "こんにちは") == 0.6
+    assert streaming._vocab_match_level("xyz", "abc") == 0.0
+    assert streaming._vocab_match_level("", "a") == 0.0
+
+
+def test_session_precomputes_normalized_expected():
+    session = streaming.create_session({"expected_responses": ["はい、お願いします", "結構です。"]})
+    assert session._expected_norm == ["はいお願いします", "結構です"]
+
+
+def test_compare_vocab_multi_stops_at_exact_match(monkeypatch):
+    monkeypatch.setattr(streaming, "_quick_translate", lambda text, *a, **k: "")
+    seen = []
+    real = streaming._vocab_match_level_pre
+
+    def spy(norm_transcript, norm_expected):
+        seen.append(norm_expected)
+        return real(norm_transcript, norm_expected)
+
+    monkeypatch.setattr(streaming, "_vocab_match_level_pre", spy)
+    result = streaming.compare_vocab_multi("はい", ["いいえ", "はい", "はい、どうぞ"])
+    assert result["matched_index"] == 1
+    assert result["match_level"] == 1.0
+    assert seen == ["いいえ", "はい"]
+
+
+def test_snapshot_reused_until_buffer_changes():
+    session = streaming.create_session({"expected_response": "はい"})
+    session.audio_buffer.extend(b"abc")
+    first = session._snapshot()
+    assert first == b"abc"
+    assert session._snapshot() is first
+    session.audio_buffer.extend(b"d")
+    assert session._snapshot() == b"abcd"
+
+
+def test_concurrent_scoring_shares_one_transcription(monkeypatch):
+    import threading
+    from types import SimpleNamespace
+
+    monkeypatch.setattr(streaming, "_quick_translate", lambda text, *a, **k: "")
+    release = threading.Event()
+    calls = []
+
+    def fake_provider_transcribe(audio_bytes, **kwargs):
+        calls.append(len(audio_bytes))
+        release.wait(2)
+        return SimpleNamespace(text="はい", provider="stub")
+
+    monkeypatch.setattr(streaming.providers, "transcribe_audio", fake_provider_transcribe)
+    session = streaming.create_session({"expected_response": "はい"})
+    session.audio_buffer.extend(b"x" * 5000)
+    audio_hash = session._buffer_hash()
+
+    async def run():
+        first = asyncio.ensure_future(session._score(audio_hash, "auto"))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(session._score(audio_hash, "final"))
+        await asyncio.sleep(0)
+        release.set()
+        return await asyncio.gather(first, second)
+
+    first, second = asyncio.run(run())
+    assert calls == [5000]
+    assert first["match_level"] == second["match_level"] == 1.0
+    assert session._inflight == {}
+
+
+def test_send_event_prefers_text_frames():
+    import json
+
+    class TextWebSocket(DummyWebSocket):
+        async def send_text(self, text):
+            self.messages.append(json.loads(text))
+
+    text_ws, json_ws = TextWebSocket(), DummyWebSocket()
+    payload = {"event": "partial", "transcript": "はい", "score": 0.5}
+    asyncio.run(streaming._send_event(text_ws, payload))
+    asyncio.run(streaming._send_event(json_ws, payload))
+    assert text_ws.messages == json_ws.messages == [payload]
+
+
+def test_capped_buffer_keeps_fingerprint_without_rehashing(monkeypatch):
+    monkeypatch.setattr(streaming.config, "STREAM_MAX_BUFFER_BYTES", 8, raising=False)
+    session = streaming.create_session({"expected_response": "はい"})
+
+    async def no_partial(_ws):
+        return None
+
+    monkeypatch.setattr(session, "_maybe_emit_partial", no_partial)
+    monkeypatch.setattr(session, "_reseed_hash", lambda: pytest.fail("rehashed the whole buffer"))
+
+    async def feed():
+        hashes = []
+        for chunk in (b"abcdef", b"ghij", b"klmn", b"klmn"):
+            await session.append_chunk(chunk, DummyWebSocket())
+            hashes.append(session._buffer_hash())
+        return hashes
+
+    hashes = asyncio.run(feed())
+    assert session._snapshot() == b"klmnklmn"
+    assert len(set(hashes)) == len(hashes)
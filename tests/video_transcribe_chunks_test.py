@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import providers
+from services import video
+
+
+def test_chunk_ranges_cut_near_silences():
+    assert video._chunk_ranges(40.0, []) == [(0.0, None)]
+    assert video._chunk_ranges(125.0, [31.5, 58.0, 95.0]) == [
+        (0.0, 31.5),
+        (31.5, 58.0),
+        (58.0, 95.0),
+        (95.0, None),
+    ]
+    assert video._chunk_ranges(100.0, []) == [(0.0, 30.0), (30.0, 60.0), (60.0, None)]
+
+
+def test_long_audio_transcribed_in_ordered_chunks(monkeypatch):
+    monkeypatch.setattr(video, "_probe_silences", lambda _b: (100.0, []), raising=True)
+    monkeypatch.setattr(video, "_cut_audio", lambda _b, start, end: f"{start:.0f}".encode(), raising=True)
+
+    def fake_transcribe(audio_bytes, **kwargs):
+        return providers.TranscriptionResult(text=f"part{audio_bytes.decode()}", provider="openai", model="stub")
+
+    monkeypatch.setattr(providers, "transcribe_audio", fake_transcribe, raising=False)
+
+    assert video._transcribe_audio_bytes(b"audio", lang_hint="Japanese") == "part0 part30 part60"
+
+
+def test_failed_chunk_falls_back_to_whole_clip(monkeypatch):
+    monkeypatch.setattr(video, "_probe_silences", lambda _b: (100.0, []), raising=True)
+    monkeypatch.setattr(video, "_cut_audio", lambda _b, start, end: f"{start:.0f}".encode(), raising=True)
+    calls: list[bytes] = []
+
+    def flaky_transcribe(audio_bytes, **kwargs):
+        calls.append(audio_bytes)
+        if audio_bytes == b"30":
+            raise RuntimeError("provider error")
+        return providers.TranscriptionResult(text=f"text:{audio_bytes.decode()}", provider="openai", model="stub")
+
+    monkeypatch.setattr(providers, "transcribe_audio", flaky_transcribe, raising=False)
+
+    assert video._transcribe_audio_bytes(b"audio") == "text:audio"
+    assert calls[-1] == b"audio"
+
+
+def test_malformed_scene_never_yields_partial_graph(monkeypatch):
+    import providers
+
+    transcript = "A traveler asks the innkeeper for a room and a warm meal."
+    broken = '[{"id": 1, "options": [{"next_scenario": 2}]}, {"id": 2, oops}]'
+    monkeypatch.setattr(providers, "invoke_google_stream", lambda *_a, **_k: (iter([broken]), 0))
+    good = '[{"id": 1, "options": [{"next_scenario": 2}]}, {"id": 2, "options": []}]'
+    monkeypatch.setattr(providers, "openai_chat_stream", lambda *_a, **_k: iter([good]))
+    assert [s["id"] for s in video.generate_scenarios_from_transcript(transcript)] == [1, 2]
+
+    monkeypatch.setattr(providers, "openai_chat_stream", lambda *_a, **_k: iter([broken]))
+    assert video.generate_scenarios_from_transcript(transcript) == []